@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class FeedConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.feed' 
\ No newline at end of file
+    name = 'apps.feed'
+
+    def ready(self):
+        from . import signals  # noqa: F401
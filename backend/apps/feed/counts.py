@@ -0,0 +1,74 @@
+"""
+Totals for filtered feeds.
+
+Counting a search or tag filter is a COUNT(DISTINCT) over several joins, and
+the result barely changes while a user scrolls, so totals are cached per
+normalized filter for ``FEED_COUNTS['TTL']`` seconds. Counting also stops at
+``FEED_COUNTS['EXACT_LIMIT']`` rows: past that the planner's row estimate
+(PostgreSQL) or the limit itself (other databases) is returned instead,
+flagged with ``approximate: True``. When the paginator already holds the
+whole list, its length is the total and no query runs.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+DEFAULTS = {
+    'TTL': 60,
+    'EXACT_LIMIT': 10000,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'FEED_COUNTS', {})}
+
+def cache_key(filters):
+    """A cache key for ``filters``, ignoring key order, empty values and tag order."""
+    normalized = {}
+    for name, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(set(value))
+        if value:
+            normalized[name] = value
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    return f'feed_count:{digest}'
+
+def estimate(queryset):
+    """The planner's row estimate for ``queryset`` on PostgreSQL, else None."""
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError):
+        return None
+
+def feed_total(queryset, filters, known_total=None):
+    """
+    Return {'count': int, 'approximate': bool} for ``queryset``, whose
+    filters are described by ``filters`` (used only as the cache key).
+    ``known_total`` is an exact count the caller already has, e.g. from a
+    paginator that fetched the whole list.
+    """
+    config = get_config()
+    key = cache_key(filters)
+    if known_total is not None:
+        total = {'count': known_total, 'approximate': False}
+        cache.set(key, total, config['TTL'])
+        return total
+    total = cache.get(key)
+    if total is not None:
+        return total
+
+    limit = config['EXACT_LIMIT']
+    # Counting a sliced queryset stops scanning after limit + 1 rows
+    capped = queryset.order_by().values('pk')[:limit + 1].count()
+    if capped <= limit:
+        total = {'count': capped, 'approximate': False}
+    else:
+        total = {'count': max(estimate(queryset) or 0, limit), 'approximate': True}
+    cache.set(key, total, config['TTL'])
+    return total
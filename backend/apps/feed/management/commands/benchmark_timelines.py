@@ -0,0 +1,150 @@
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.feed import timelines
+from apps.posts.models import Post
+from apps.posts.pagination import PostPagination
+from apps.users.models import Follow
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = (
+        'Compares pure fan-out-on-write, hybrid fan-out and pull-on-read following feeds '
+        'on a synthetic power-law follow graph (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20_000, help='Number of synthetic users')
+        parser.add_argument('--follows', type=int, default=50, help='Accounts each user follows')
+        parser.add_argument('--exponent', type=float, default=1.0,
+                            help='Zipf exponent of account popularity; higher is more skewed')
+        parser.add_argument('--posts', type=int, default=2000, help='Posts written and fanned out')
+        parser.add_argument('--backlog', type=int, default=20, help='Older posts per followed account')
+        parser.add_argument('--threshold', type=int, default=None,
+                            help='Celebrity threshold of the hybrid mode (default: the TIMELINES setting)')
+        parser.add_argument('--readers', type=int, default=200, help='Following feeds read per mode')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the graph')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        threshold = options['threshold'] or timelines.get_config()['CELEBRITY_FOLLOWERS']
+
+        with transaction.atomic():
+            users = self.populate(rng, options)
+            counts = sorted((user.follower_count for user in users), reverse=True)
+            celebrities = sum(1 for count in counts if count >= threshold)
+            self.stdout.write(
+                f'Followers: max {counts[0]:,}, p99 {counts[len(counts) // 100]:,}, '
+                f'median {counts[len(counts) // 2]:,}; {celebrities} accounts at or above {threshold:,}'
+            )
+            # Posts are written by accounts in proportion to their audience
+            authors = rng.choices(users, weights=[user.follower_count + 1 for user in users], k=options['posts'])
+            now = timezone.now()
+            posts = Post.objects.bulk_create([
+                Post(id=uuid.uuid4(), author=author, title='Benchmark', content='...',
+                     created_at=now - timedelta(seconds=index))
+                for index, author in enumerate(authors)
+            ])
+
+            self.stdout.write(f'{"mode":<10}{"rows":>14}{"total":>12}{"p50/post":>12}{"max/post":>12}')
+            with transaction.atomic():
+                self.fan_out('push all', posts, threshold=len(users) + 1)
+                transaction.set_rollback(True)
+            self.fan_out('hybrid', posts, threshold=threshold)
+
+            readers = rng.sample(users, min(options['readers'], len(users)))
+            self.request = Request(APIRequestFactory().get('/'))
+            with override_settings(TIMELINES={**getattr(settings, 'TIMELINES', {}), 'CELEBRITY_FOLLOWERS': threshold}):
+                pull = self.time_reads(readers, self.pull_page)
+                hybrid = self.time_reads(readers, self.hybrid_page)
+            self.stdout.write(f'\n{"read":<10}{"p50":>12}{"p99":>12}')
+            for label, timings in (('pull', pull), ('hybrid', hybrid)):
+                self.stdout.write(f'{label:<10}{self.percentile(timings, 50):>10.2f}ms{self.percentile(timings, 99):>10.2f}ms')
+            # Nothing written here outlives the benchmark
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done; the synthetic graph was rolled back'))
+
+    def populate(self, rng, options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{index}', email=f'{prefix}-{index}@example.com', password='!')
+            for index in range(options['users'])
+        ])
+        # Zipf-ranked popularity gives a power-law follower distribution
+        weights = [1 / rank ** options['exponent'] for rank in range(1, len(users) + 1)]
+        ranked = rng.sample(users, len(users))
+        start = time.perf_counter()
+        follows = []
+        followers = Counter()
+        for user in users:
+            followees = {followee for followee in rng.choices(ranked, weights, k=options['follows']) if followee != user}
+            for followee in followees:
+                follows.append(Follow(follower=user, followee=followee))
+                followers[followee.pk] += 1
+            user.following_count = len(followees)
+        Follow.objects.bulk_create(follows, batch_size=5000)
+        for user in users:
+            user.follower_count = followers[user.pk]
+        User.objects.bulk_update(users, ['follower_count', 'following_count'], batch_size=2000)
+
+        # Older posts so that pulled feeds have history to sort through
+        now = timezone.now()
+        Post.objects.bulk_create([
+            Post(id=uuid.uuid4(), author=user, title='Backlog', content='...',
+                 created_at=now - timedelta(days=1, seconds=rng.randrange(86400 * 30)))
+            for user in users if followers[user.pk]
+            for _ in range(options['backlog'])
+        ], batch_size=5000)
+        self.stdout.write(
+            f'{len(users):,} users, {len(follows):,} follows ready in {time.perf_counter() - start:.0f}s'
+        )
+        return users
+
+    def fan_out(self, label, posts, threshold):
+        timings = []
+        rows = 0
+        with override_settings(TIMELINES={**getattr(settings, 'TIMELINES', {}), 'CELEBRITY_FOLLOWERS': threshold}):
+            for post in posts:
+                start = time.perf_counter()
+                rows += timelines.fan_out(post)
+                timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f'{label:<10}{rows:>14,}{sum(timings) / 1000:>11.1f}s'
+            f'{self.percentile(timings, 50):>10.2f}ms{max(timings):>10.2f}ms'
+        )
+
+    def pull_page(self, reader):
+        """The first page as a pull-on-read feed builds it: every followed author's posts."""
+        followees = Follow.objects.filter(follower=reader).values('followee_id')
+        return list(Post.objects.filter(author_id__in=followees).order_by('-created_at', '-id')[:21])
+
+    def hybrid_page(self, reader):
+        """The first page as FollowingFeedView builds it: the timeline merged with pulled celebrities."""
+        return PostPagination().paginate_querysets(
+            [source.order_by('-feed_at') for source in timelines.following_sources(reader)], self.request
+        )
+
+    def time_reads(self, readers, read):
+        timings = []
+        for reader in readers:
+            start = time.perf_counter()
+            read(reader)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    @staticmethod
+    def percentile(timings, percent):
+        return statistics.quantiles(timings, n=100)[percent - 1] if len(timings) > 1 else timings[0]
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.feed import timelines
+from apps.posts.models import Post
+
+class Command(BaseCommand):
+    help = 'Pushes recent posts of non-celebrity authors to their followers\' timelines again'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=48,
+            help='Re-push posts created in the last this many hours'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        posts = Post.objects.filter(created_at__gte=since).only('pk', 'author_id', 'created_at').order_by('created_at')
+        start = time.perf_counter()
+        count = 0
+        entries = 0
+        # Entries already in place are skipped by the inserts, so this can run any time
+        for post in posts.iterator(chunk_size=500):
+            entries += timelines.fan_out(post)
+            count += 1
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Pushed {count} posts to {entries} timelines in {elapsed:.1f}s'
+        ))
@@ -2,4 +2,31 @@
 Models for the feed app.
 """
 
-# TODO: Define Feed models here. 
\ No newline at end of file
+from django.conf import settings
+from django.db import models
+from apps.posts.models import Post
+
+class TimelineEntry(models.Model):
+    """
+    A post pushed into a follower's following feed when it was written, see
+    apps.feed.timelines. ``author`` and ``created_at`` are copied from the
+    post so unfollowing can drop an author's entries and the feed is read in
+    (user, created_at) index order without touching the posts table.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['user', 'author']),
+        ]
+        verbose_name_plural = 'timeline entries'
+
+    def __str__(self):
+        return f"{self.post_id} in the timeline of {self.user_id}"
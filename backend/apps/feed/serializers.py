@@ -3,7 +3,7 @@ Serializers for the feed app.
 """
 
 from rest_framework import serializers
-from apps.posts.models import Post, Tag
+from apps.posts.models import Post, Tag, Reaction
 from apps.posts.serializers import PostSerializer
 
 class FeedPostSerializer(PostSerializer):
@@ -11,7 +11,7 @@ class FeedPostSerializer(PostSerializer):
     Extended post serializer for feed with additional feed-specific fields.
     """
     is_trending = serializers.SerializerMethodField()
-    engagement_score = serializers.SerializerMethodField()
+    engagement_score = serializers.IntegerField(read_only=True)
     
     class Meta(PostSerializer.Meta):
         fields = PostSerializer.Meta.fields + ['is_trending', 'engagement_score']
@@ -22,14 +22,10 @@ class FeedPostSerializer(PostSerializer):
         from datetime import timedelta
         
         week_ago = timezone.now() - timedelta(days=7)
-        recent_reactions = obj.emoji_reactions.filter(created_at__gte=week_ago).count()
+        recent_reactions = obj.reactions.filter(
+            kind__in=Reaction.EMOJI_KINDS.values(), created_at__gte=week_ago
+        ).count()
         return recent_reactions > 5  # Consider trending if more than 5 recent reactions
-    
-    def get_engagement_score(self, obj):
-        """Calculate engagement score based on reactions and comments."""
-        total_reactions = obj.like_count + obj.hug_count + obj.relate_count + obj.emoji_reactions.count()
-        total_comments = obj.comments.count()
-        return total_reactions + (total_comments * 2)  # Comments weighted more
 
 class TrendingTagSerializer(serializers.ModelSerializer):
     """Serializer for trending tags in feed."""
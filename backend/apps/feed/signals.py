@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.posts.models import Post
+from apps.users.models import Follow
+from . import timelines
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timelines.schedule_fan_out(instance)
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    if created:
+        timelines.backfill(instance.follower_id, instance.followee_id)
+
+@receiver(post_delete, sender=Follow)
+def clear_unfollowed_author(sender, instance, **kwargs):
+    timelines.remove_author(instance.follower_id, instance.followee_id)
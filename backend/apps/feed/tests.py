@@ -2,9 +2,407 @@
 Tests for the feed app.
 """
 
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here. 
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.posts import ranking
+from apps.posts.models import Post, Tag
+from .counts import cache_key
+from .models import TimelineEntry
 
-def test_feed_placeholder():
-    assert True  # TODO: Replace with real tests 
\ No newline at end of file
+User = get_user_model()
+
+class FeedPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='scroller',
+            email='scroller@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        self.posts = []
+        for i in range(25):
+            post = Post.objects.create(
+                author=self.user, title=f'Post {i}', content='...', like_count=i % 4, engagement_score=i % 4
+            )
+            # Pairs of posts share a timestamp, so the id tie-breaker matters
+            Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(minutes=i // 2))
+            self.posts.append(post)
+
+    def scroll(self, url, params=None):
+        titles = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles.extend(post['title'] for post in response.data['results'])
+            if not response.data['next']:
+                return titles
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_cover_every_post_once(self):
+        titles = self.scroll('/api/feed/', {'page_size': 4})
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+
+    def test_ranked_sort_pages_on_score(self):
+        titles = self.scroll('/api/feed/', {'sort': 'popular', 'page_size': 5})
+        self.assertEqual(len(titles), 25)
+        self.assertEqual(len(set(titles)), 25)
+        likes = dict(Post.objects.values_list('title', 'like_count'))
+        self.assertEqual([likes[title] for title in titles], sorted(likes.values(), reverse=True))
+
+    def test_trending_pages_on_hot_score(self):
+        old = self.posts[0]
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=8), engagement_score=50)
+        ranking.recompute()
+        titles = self.scroll('/api/feed/trending/', {'page_size': 5})
+        self.assertNotIn(old.title, titles)
+        scores = dict(Post.objects.values_list('title', 'hot_score'))
+        self.assertTrue(all(scores[title] > 0 for title in titles))
+        self.assertEqual([scores[title] for title in titles], sorted(scores[title] for title in titles)[::-1])
+        self.assertEqual(len(titles), Post.objects.filter(hot_score__gt=0).count())
+
+    def test_new_posts_do_not_shift_later_pages(self):
+        first = self.client.get(f'/api/users/{self.user.id}/posts/', {'page_size': 5})
+        Post.objects.create(author=self.user, title='Fresh', content='Just posted.')
+        second = self.client.get(first.data['next'])
+        seen = {post['title'] for post in first.data['results']}
+        self.assertFalse(seen & {post['title'] for post in second.data['results']})
+        self.assertNotIn('Fresh', [post['title'] for post in second.data['results']])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        url = f'/api/users/{self.user.id}/posts/'
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(url, {'page_size': 5})
+        for _ in range(3):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(deep_page), len(first_page))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in deep_page.captured_queries))
+
+    def test_invalid_cursor_is_rejected(self):
+        for url in ('/api/feed/', '/api/feed/trending/'):
+            response = self.client.get(url, {'cursor': 'not-a-cursor'})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class FeedCountTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='counter',
+            email='counter@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        fails = Tag.objects.create(name='fails', slug='fails')
+        cats = Tag.objects.create(name='cats', slug='cats')
+        for i in range(6):
+            post = Post.objects.create(author=self.user, title=f'Fail {i}', content='Oops.')
+            post.tags.add(fails, cats)
+
+    def count_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/feed/', params)
+        return response.data['feed_info'], sum('COUNT(' in query['sql'] for query in queries.captured_queries)
+
+    def test_total_reuses_a_complete_first_page(self):
+        info, counts = self.count_queries({'tags': 'fails,cats'})
+        self.assertEqual((info['total_posts'], info['approximate']), (6, False))
+        self.assertEqual(counts, 0)
+
+    def test_total_is_cached_per_normalized_filter(self):
+        info, counts = self.count_queries({'tags': 'fails,cats', 'page_size': 2})
+        self.assertEqual((info['total_posts'], counts), (6, 1))
+        info, counts = self.count_queries({'tags': 'cats, fails', 'page_size': 2, 'sort': 'popular'})
+        self.assertEqual((info['total_posts'], counts), (6, 0))
+        self.assertEqual(cache_key({'tags': ['b', 'a'], 'search': ''}), cache_key({'tags': ['a', 'b']}))
+
+    @override_settings(FEED_COUNTS={'TTL': 60, 'EXACT_LIMIT': 3})
+    def test_large_totals_are_flagged_approximate(self):
+        info, _ = self.count_queries({'search': 'fail', 'page_size': 2})
+        self.assertTrue(info['approximate'])
+        self.assertGreaterEqual(info['total_posts'], 3)
+
+class FeedSearchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='searcher',
+            email='searcher@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_post(self, title, content, tags=()):
+        response = self.client.post(
+            '/api/posts/', {'title': title, 'content': content, 'tag_names': list(tags)}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def search(self, term, **params):
+        response = self.client.get('/api/feed/', {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, data):
+        return [post['id'] for post in data['results']]
+
+    def test_matches_title_content_and_tags_by_word_prefix(self):
+        titled = self.create_post('Startup failure', 'We ran out of money in a month.')
+        tagged = self.create_post('Cooking night', 'The oven caught fire again.', tags=['kitchen'])
+        mentioned = self.create_post('Plain day', 'Our startup demo crashed on stage.')
+
+        self.assertEqual(set(self.ids(self.search('start'))), {titled, mentioned})
+        self.assertEqual(self.ids(self.search('kitch')), [tagged])
+        self.assertEqual(self.ids(self.search('STARTUP crash')), [mentioned])
+        self.assertEqual(self.ids(self.search('"*) OR (')), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        in_title = self.create_post('Burnt cake', 'Nothing else to say here today.')
+        in_content = self.create_post('Plain day', 'A story about a burnt cake and more cake.')
+
+        data = self.search('burnt')
+        self.assertEqual(self.ids(data), [in_title, in_content])
+        self.assertEqual(data['feed_info']['sort_by'], 'relevance')
+        self.assertEqual(self.ids(self.search('burnt', sort='latest')), [in_content, in_title])
+
+        first = self.search('burnt', page_size=1)
+        second = self.client.get(first['next']).data
+        self.assertEqual(self.ids(first) + self.ids(second), [in_title, in_content])
+        self.assertIsNone(second['next'])
+
+    def test_search_without_words_does_not_fail(self):
+        post_id = self.create_post('Laughing', 'I could only reply with 😂 to that.')
+        self.create_post('Other', 'Nothing to see in this one.')
+
+        self.assertEqual(self.ids(self.search('😂')), [post_id])
+        self.assertEqual(self.ids(self.search('-')), [])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        self.create_post('Markup', 'I pasted <script> into prod and the deploy failed badly.')
+
+        post = self.search('deploy', snippets='1')['results'][0]
+        self.assertIn('<mark>deploy</mark>', post['search_snippet'])
+        self.assertIn('&lt;script&gt;', post['search_snippet'])
+        self.assertNotIn('search_snippet', self.search('deploy')['results'][0])
+
+    def test_index_follows_edits_and_deletes(self):
+        post_id = self.create_post('Garden', 'The tomatoes did not grow at all.', tags=['plants'])
+
+        response = self.client.patch(
+            f'/api/posts/{post_id}/', {'content': 'The cucumbers did not grow at all.', 'tag_names': ['veggies']},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(self.search('tomatoes')), [])
+        self.assertEqual(self.ids(self.search('plants')), [])
+        self.assertEqual(self.ids(self.search('cucumber veggies')), [post_id])
+
+        self.assertEqual(self.client.delete(f'/api/posts/{post_id}/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.ids(self.search('cucumber')), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM posts_post_search')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+@override_settings(TIMELINES={'CELEBRITY_FOLLOWERS': 3, 'BACKGROUND': False})
+class FollowingFeedTest(APITestCase):
+    def setUp(self):
+        self.reader = self.create_user('reader')
+        self.friend = self.create_user('friend')
+        self.star = self.create_user('star')
+        self.client.force_authenticate(user=self.reader)
+
+    def create_user(self, name):
+        return User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+
+    def follow(self, user, method='post'):
+        return getattr(self.client, method)(f'/api/users/{user.id}/follow/')
+
+    def make_celebrity(self):
+        for i in range(3):
+            fan = self.create_user(f'fan{i}')
+            self.client.force_authenticate(user=fan)
+            self.follow(self.star)
+        self.client.force_authenticate(user=self.reader)
+
+    def feed(self, **params):
+        response = self.client.get('/api/feed/following/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, data):
+        return [post['id'] for post in data['results']]
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        self.assertTrue(self.follow(self.friend).data['changed'])
+        response = self.follow(self.friend)
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(response.data['follower_count'], 1)
+        self.assertTrue(self.follow(self.friend, 'get').data['following'])
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 1)
+
+        self.assertTrue(self.follow(self.friend, 'delete').data['changed'])
+        response = self.follow(self.friend, 'delete')
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(response.data['follower_count'], 0)
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 0)
+
+        self.assertEqual(self.follow(self.reader).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post('/api/users/not-a-uuid/follow/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_followers_and_following_lists(self):
+        self.follow(self.friend)
+        self.follow(self.star)
+
+        following = self.client.get(f'/api/users/{self.reader.id}/following/').data
+        self.assertEqual([user['username'] for user in following['results']], ['star', 'friend'])
+        followers = self.client.get(f'/api/users/{self.star.id}/followers/').data
+        self.assertEqual([user['username'] for user in followers['results']], ['reader'])
+
+    def test_posts_are_pushed_to_followers(self):
+        self.follow(self.friend)
+        post = Post.objects.create(author=self.friend, title='Hello', content='...')
+        Post.objects.create(author=self.star, title='Not followed', content='...')
+
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(self.ids(self.feed()), [str(post.id)])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        old = Post.objects.create(author=self.friend, title='Before', content='...')
+        self.follow(self.friend)
+        self.assertEqual(self.ids(self.feed()), [str(old.id)])
+
+        self.follow(self.friend, 'delete')
+        self.assertEqual(self.ids(self.feed()), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+
+    def test_celebrity_posts_are_pulled_and_merged(self):
+        self.make_celebrity()
+        self.follow(self.friend)
+        self.follow(self.star)
+        now = timezone.now()
+        posts = []
+        for i in range(6):
+            author = self.star if i % 2 else self.friend
+            post = Post.objects.create(author=author, title=f'Post {i}', content='...')
+            Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(minutes=i))
+            TimelineEntry.objects.filter(post=post).update(created_at=now - timedelta(minutes=i))
+            posts.append(str(post.id))
+
+        # The celebrity's posts are never written to timelines
+        self.assertFalse(TimelineEntry.objects.filter(author=self.star).exists())
+        pages = [self.feed(page_size=4)]
+        pages.append(self.client.get(pages[0]['next']).data)
+        self.assertEqual(self.ids(pages[0]) + self.ids(pages[1]), posts)
+        self.assertIsNone(pages[1]['next'])
+
+    def test_feed_reads_are_index_ranges(self):
+        self.make_celebrity()
+        self.follow(self.friend)
+        self.follow(self.star)
+        Post.objects.create(author=self.friend, title='Pushed', content='...')
+        Post.objects.create(author=self.star, title='Pulled', content='...')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.feed()
+        selects = [query['sql'] for query in queries if 'AS "feed_at"' in query['sql']]
+        # One range of the reader's timeline and one of the followed celebrity's posts
+        self.assertEqual(len(selects), 2)
+        self.assertIn('"feed_timelineentry"."user_id" =', selects[0])
+        self.assertIn(f"\"posts_post\".\"author_id\" IN ('{self.star.id.hex}')", selects[1])
+        for sql in selects:
+            self.assertIn('LIMIT 21', sql)
+
+class TagFeedTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tagger', email='tagger@example.com', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.fails = Tag.objects.create(name='fails', slug='fails')
+        self.cats = Tag.objects.create(name='cats', slug='cats')
+        self.other = Tag.objects.create(name='other', slug='other')
+
+    def create_post(self, title, tags, minutes_ago):
+        response = self.client.post(
+            '/api/posts/', {'title': title, 'content': 'Tagged content.', 'tag_names': [tag.name for tag in tags]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(pk=response.data['id'])
+        created_at = timezone.now() - timedelta(minutes=minutes_ago)
+        Post.objects.filter(pk=post.pk).update(created_at=created_at)
+        post.post_tags.update(created_at=created_at)
+        return str(post.pk)
+
+    def feed(self, **params):
+        response = self.client.get('/api/feed/tags/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, data):
+        return [post['id'] for post in data['results']]
+
+    def test_follow_and_unfollow_tags(self):
+        self.assertTrue(self.client.post('/api/posts/tags/cats/follow/').data['changed'])
+        self.assertFalse(self.client.post('/api/posts/tags/cats/follow/').data['changed'])
+        self.client.post('/api/posts/tags/fails/follow/')
+        self.assertTrue(self.client.get('/api/posts/tags/cats/follow/').data['following'])
+
+        followed = self.client.get('/api/posts/tags/followed/').data
+        self.assertEqual([tag['slug'] for tag in followed], ['fails', 'cats'])
+
+        self.assertTrue(self.client.delete('/api/posts/tags/cats/follow/').data['changed'])
+        self.assertFalse(self.client.delete('/api/posts/tags/cats/follow/').data['changed'])
+        self.assertEqual([tag['slug'] for tag in self.client.get('/api/posts/tags/followed/').data], ['fails'])
+        self.assertEqual(self.client.post('/api/posts/tags/missing/follow/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_feed_merges_followed_tags_once_per_post(self):
+        self.assertEqual(self.ids(self.feed()), [])
+        self.client.post('/api/posts/tags/fails/follow/')
+        self.client.post('/api/posts/tags/cats/follow/')
+        expected = []
+        for i in range(7):
+            tags = [[self.fails], [self.cats], [self.fails, self.cats]][i % 3]
+            expected.append(self.create_post(f'Post {i}', tags, minutes_ago=i))
+        self.create_post('Unfollowed', [self.other], minutes_ago=0)
+
+        first = self.feed(page_size=4)
+        second = self.client.get(first['next']).data
+        self.assertEqual(self.ids(first) + self.ids(second), expected)
+        self.assertIsNone(second['next'])
+
+    def test_tags_added_later_keep_the_post_time(self):
+        self.client.post('/api/posts/tags/cats/follow/')
+        old = Post.objects.create(author=self.user, title='Old', content='...')
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=3))
+        old.refresh_from_db()
+        newer = self.create_post('Newer', [self.cats], minutes_ago=60)
+        old.tags.add(self.cats)
+
+        self.assertEqual(old.post_tags.get().created_at, old.created_at)
+        self.assertEqual(self.ids(self.feed()), [newer, str(old.pk)])
+
+    def test_each_tag_is_one_range_read(self):
+        for tag in (self.fails, self.cats, self.other):
+            self.client.post(f'/api/posts/tags/{tag.slug}/follow/')
+            self.create_post(tag.name, [tag], minutes_ago=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.feed(page_size=5)
+        selects = [query['sql'] for query in queries if 'AS "feed_at"' in query['sql']]
+        self.assertEqual(len(selects), 3)
+        for sql in selects:
+            self.assertNotIn('DISTINCT', sql)
+            self.assertIn('"posts_post_tags"."tag_id" =', sql)
+            self.assertIn('LIMIT 6', sql)
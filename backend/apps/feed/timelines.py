@@ -0,0 +1,150 @@
+"""
+Following feeds as materialized timelines with hybrid fan-out.
+
+When a post is written it is pushed into one TimelineEntry row per follower
+of its author (fan-out on write), so reading a following feed is a single
+range scan of the reader's (user, created_at) index instead of a query over
+every followed author. The push runs after the post commits, on a small
+process-wide thread pool, as batched inserts of ``BATCH_SIZE`` rows.
+
+Pushing does not scale for authors with huge audiences, where one post would
+write millions of rows. Posts of authors with at least
+``CELEBRITY_FOLLOWERS`` followers are therefore not pushed: the reader's
+followed celebrities are pulled at read time, each an index range on
+(author, created_at), and merged with the timeline by the paginator.
+
+Following someone copies their last ``BACKFILL_POSTS`` posts into the
+follower's timeline and unfollowing removes their entries. Pushes lost to a
+crash, or skipped while an author was above the threshold, are repaired by
+the rebuild_timelines command.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from apps.posts.models import Post
+from apps.users.models import Follow, User
+from .models import TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CELEBRITY_FOLLOWERS': 10000,
+    'BATCH_SIZE': 1000,
+    'BACKFILL_POSTS': 50,
+    'WORKERS': 2,
+    'BACKGROUND': True,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TIMELINES', {})}
+
+def push(post, follower_ids):
+    """Insert ``post`` into the timelines of ``follower_ids``, skipping existing entries."""
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follower_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+            for follower_id in follower_ids
+        ],
+        batch_size=get_config()['BATCH_SIZE'],
+        ignore_conflicts=True
+    )
+
+def fan_out(post):
+    """
+    Push ``post`` to every follower of its author, one batch of followers at
+    a time. Returns the number of followers it was pushed to; 0 when the
+    author's posts are pulled at read time instead.
+    """
+    config = get_config()
+    follower_count = User.objects.filter(pk=post.author_id).values_list('follower_count', flat=True).first()
+    if follower_count is None or follower_count >= config['CELEBRITY_FOLLOWERS']:
+        return 0
+    pushed = 0
+    last_pk = None
+    while True:
+        follows = Follow.objects.filter(followee_id=post.author_id).order_by('pk')
+        if last_pk is not None:
+            follows = follows.filter(pk__gt=last_pk)
+        batch = list(follows.values_list('pk', 'follower_id')[:config['BATCH_SIZE']])
+        if not batch:
+            return pushed
+        last_pk = batch[-1][0]
+        push(post, [follower_id for _, follower_id in batch])
+        pushed += len(batch)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config()['WORKERS'], thread_name_prefix='timeline-fan-out'
+                )
+    return _executor
+
+def schedule_fan_out(post):
+    """Fan ``post`` out once the current transaction commits, or right away with BACKGROUND off."""
+    if not get_config()['BACKGROUND']:
+        fan_out(post)
+        return
+    transaction.on_commit(lambda: _submit(post))
+
+def _submit(post):
+    try:
+        get_executor().submit(_run, post)
+    except Exception:
+        # rebuild_timelines picks the post up later
+        logger.exception("Could not queue timeline fan-out for post %s", post.pk)
+
+def _run(post):
+    try:
+        fan_out(post)
+    except Exception:
+        logger.exception("Failed to fan out post %s", post.pk)
+    finally:
+        connection.close()
+
+def backfill(follower_id, followee_id):
+    """Copy the followee's recent posts into a new follower's timeline."""
+    config = get_config()
+    follower_count = User.objects.filter(pk=followee_id).values_list('follower_count', flat=True).first()
+    if follower_count is None or follower_count >= config['CELEBRITY_FOLLOWERS']:
+        return
+    posts = Post.objects.filter(author_id=followee_id).order_by('-created_at').only('pk', 'author_id', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follower_id, post_id=post.pk, author_id=post.author_id, created_at=post.created_at)
+            for post in posts[:config['BACKFILL_POSTS']]
+        ],
+        ignore_conflicts=True
+    )
+
+def remove_author(follower_id, followee_id):
+    """Drop a followee's posts from a former follower's timeline."""
+    TimelineEntry.objects.filter(user_id=follower_id, author_id=followee_id).delete()
+
+def following_sources(user):
+    """
+    The Post querysets whose union is ``user``'s following feed, each
+    annotated with ``feed_at`` for the paginator to order and merge on: the
+    materialized timeline, plus the posts of followed celebrities if any.
+    """
+    timeline = Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_at=F('timeline_entries__created_at')
+    )
+    celebrities = list(
+        Follow.objects.filter(
+            follower=user, followee__follower_count__gte=get_config()['CELEBRITY_FOLLOWERS']
+        ).values_list('followee_id', flat=True)
+    )
+    if not celebrities:
+        return [timeline]
+    return [timeline, Post.objects.filter(author_id__in=celebrities).annotate(feed_at=F('created_at'))]
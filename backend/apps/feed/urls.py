@@ -10,5 +10,6 @@ urlpatterns = [
     path('', views.FeedView.as_view(), name='feed'),
     path('trending/', views.TrendingFeedView.as_view(), name='trending_feed'),
     path('following/', views.FollowingFeedView.as_view(), name='following_feed'),
+    path('tags/', views.TagFeedView.as_view(), name='tag_feed'),
     path('stats/', views.feed_stats, name='feed_stats'),
 ] 
\ No newline at end of file
@@ -5,11 +5,14 @@ Views for the feed app.
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Q, Count
-from django.core.cache import cache
+from rest_framework.exceptions import APIException
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from datetime import timedelta
-from apps.posts.models import Post, Tag
+from apps.posts import search as post_search, tags as post_tags, trending
+from . import timelines
+from .counts import feed_total
+from apps.posts.models import Post
 from apps.posts.serializers import PostSerializer
 from apps.posts.pagination import PostPagination
 from apps.users.models import User
@@ -30,23 +33,19 @@ class FeedView(generics.ListAPIView):
         """
         Get posts for the feed with various filtering options.
         """
-        queryset = Post.objects.all().select_related('author').prefetch_related(
-            'tags', 'likes', 'hugs', 'relates', 'emoji_reactions'
-        )
+        queryset = Post.objects.all().select_related('author').prefetch_related('tags', 'media__blob')
         
         # Get query parameters
         search = self.request.query_params.get('search', None)
         tags = self.request.query_params.get('tags', None)
-        sort_by = self.request.query_params.get('sort', 'latest')  # latest, popular, trending
+        sort_by = self.get_sort()  # relevance, latest, popular, trending
         author_id = self.request.query_params.get('author', None)
         
-        # Filter by search term
+        # Filter by search term through the full-text index
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(tags__name__icontains=search)
-            ).distinct()
+            queryset = post_search.search_posts(
+                queryset, search, snippets=self.request.query_params.get('snippets') in ('1', 'true')
+            )
         
         # Filter by tags
         if tags:
@@ -59,23 +58,37 @@ class FeedView(generics.ListAPIView):
             queryset = queryset.filter(author_id=author_id)
         
         # Apply sorting
-        if sort_by == 'popular':
-            # Sort by total reactions (likes + hugs + relates + emoji reactions)
-            queryset = queryset.annotate(
-                total_reactions=Count('likes') + Count('hugs') + Count('relates') + Count('emoji_reactions')
-            ).order_by('-total_reactions', '-created_at')
+        if sort_by == 'relevance':
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        elif sort_by == 'popular':
+            # Stored reactions + weighted comments, an index scan on engagement_score
+            queryset = queryset.order_by('-engagement_score', '-created_at')
         elif sort_by == 'trending':
-            # Sort by recent activity (posts with recent reactions)
-            week_ago = timezone.now() - timedelta(days=7)
-            queryset = queryset.annotate(
-                recent_reactions=Count('emoji_reactions', filter=Q(emoji_reactions__created_at__gte=week_ago))
-            ).order_by('-recent_reactions', '-created_at')
+            # Stored time-decayed score, see apps.posts.ranking
+            queryset = queryset.order_by('-hot_score', '-created_at')
         else:
             # Default: sort by latest
             queryset = queryset.order_by('-created_at')
         
         return queryset
 
+    def get_sort(self):
+        """Search results are ranked by relevance unless another sort is asked for."""
+        params = self.request.query_params
+        sort_by = params.get('sort') or ('relevance' if params.get('search') else 'latest')
+        # Relevance needs a search term to rank by
+        return 'latest' if sort_by == 'relevance' and not params.get('search') else sort_by
+
+    def get_count_filters(self):
+        """The query parameters that change which posts are counted, normalized."""
+        params = self.request.query_params
+        tags = params.get('tags') or ''
+        return {
+            'search': (params.get('search') or '').lower(),
+            'tags': [tag.strip() for tag in tags.split(',') if tag.strip()],
+            'author': params.get('author') or '',
+        }
+
     def get(self, request, *args, **kwargs):
         """
         Get feed posts with additional metadata.
@@ -89,12 +102,14 @@ class FeedView(generics.ListAPIView):
                 serializer = self.get_serializer(page, many=True)
                 response_data = self.get_paginated_response(serializer.data)
                 
-                # Add feed metadata
+                # Add feed metadata; the total is cached and capped, see counts.py
+                total = feed_total(queryset, self.get_count_filters(), self.paginator.known_total)
                 response_data.data['feed_info'] = {
-                    'total_posts': queryset.count(),
+                    'total_posts': total['count'],
+                    'approximate': total['approximate'],
                     'search_applied': bool(request.query_params.get('search')),
                     'tags_applied': bool(request.query_params.get('tags')),
-                    'sort_by': request.query_params.get('sort', 'latest')
+                    'sort_by': self.get_sort()
                 }
                 
                 return response_data
@@ -102,6 +117,8 @@ class FeedView(generics.ListAPIView):
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
             
+        except APIException:
+            raise
         except Exception as e:
             logger.error(f"Error in feed view: {str(e)}")
             return Response(
@@ -111,7 +128,7 @@ class FeedView(generics.ListAPIView):
 
 class TrendingFeedView(generics.ListAPIView):
     """
-    Trending feed that shows posts with high engagement in the last 7 days.
+    Trending feed ranked by engagement decayed by post age.
     """
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -119,42 +136,49 @@ class TrendingFeedView(generics.ListAPIView):
 
     def get_queryset(self):
         """
-        Get trending posts based on recent engagement.
+        Get trending posts by their time-decayed hot score.
         """
-        # Get posts from the last 7 days with high engagement
-        week_ago = timezone.now() - timedelta(days=7)
-        
-        queryset = Post.objects.filter(
-            created_at__gte=week_ago
-        ).select_related('author').prefetch_related(
-            'tags', 'likes', 'hugs', 'relates', 'emoji_reactions'
-        ).annotate(
-            total_reactions=Count('likes') + Count('hugs') + Count('relates') + Count('emoji_reactions')
-        ).filter(
-            total_reactions__gt=0  # Only posts with reactions
-        ).order_by('-total_reactions', '-created_at')
-        
-        return queryset
+        # Scores are recomputed by recompute_hot_scores and are 0 outside
+        # the active window, so this is a range scan on the hot_score index
+        return Post.objects.filter(
+            hot_score__gt=0
+        ).select_related('author').prefetch_related('tags', 'media__blob').order_by('-hot_score', '-created_at')
 
 class FollowingFeedView(generics.ListAPIView):
     """
-    Feed showing posts from users that the current user follows.
-    Note: This requires implementing a following system.
+    Feed of posts from the users the current user follows: their
+    materialized timeline merged with the posts of followed celebrities,
+    see apps.feed.timelines.
     """
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = PostPagination
 
+    def get_sources(self):
+        return timelines.following_sources(self.request.user)
+
+    def get_querysets(self):
+        return [source.select_related('author').order_by('-feed_at') for source in self.get_sources()]
+
     def get_queryset(self):
-        """
-        Get posts from followed users.
-        For now, return recent posts from all users (placeholder for following system).
-        """
-        # TODO: Implement following system
-        # For now, return recent posts from all users
-        return Post.objects.all().select_related('author').prefetch_related(
-            'tags', 'likes', 'hugs', 'relates', 'emoji_reactions'
-        ).order_by('-created_at')
+        return self.get_querysets()[0]
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginator.paginate_querysets(self.get_querysets(), request, view=self)
+        # Prefetched once for the merged page rather than for every source
+        prefetch_related_objects(page, 'tags', 'media__blob')
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class TagFeedView(FollowingFeedView):
+    """
+    Feed of posts carrying any of the tags the current user follows: one
+    time-ordered range per tag, merged by the paginator, so a page costs
+    page size x followed tags rows whatever the size of the tag table.
+    """
+
+    def get_sources(self):
+        return post_tags.followed_tag_sources(self.request.user)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -170,18 +194,16 @@ def feed_stats(request):
         week_ago = timezone.now() - timedelta(days=7)
         recent_posts = Post.objects.filter(created_at__gte=week_ago).count()
         
-        # Get trending tags
-        trending_tags = Tag.objects.annotate(
-            post_count=Count('posts', filter=Q(posts__created_at__gte=week_ago))
-        ).filter(post_count__gt=0).order_by('-post_count')[:5]
+        # Get trending tags from the hourly activity buckets
+        top_tags = trending.trending_tags('7d', limit=5)
         
         stats = {
             'total_posts': total_posts,
             'total_users': total_users,
             'recent_posts': recent_posts,
             'trending_tags': [
-                {'name': tag.name, 'post_count': tag.post_count}
-                for tag in trending_tags
+                {'name': entry['tag'].name, 'post_count': entry['posts']}
+                for entry in top_tags
             ]
         }
         
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Tag, TrendingTag, PostMedia
+from .models import Post, Tag, TrendingTag, PostMedia, MediaBlob, UploadSession
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -25,4 +25,16 @@ class TrendingTagAdmin(admin.ModelAdmin):
 class PostMediaAdmin(admin.ModelAdmin):
     list_display = ('post', 'file', 'uploaded_at')
     search_fields = ('post__title', 'file')
-    list_filter = ('uploaded_at',) 
\ No newline at end of file
+    list_filter = ('uploaded_at',) 
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'file', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'file')
+    list_filter = ('created_at',)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'offset', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'updated_at')
+    search_fields = ('filename', 'user__username')
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.posts' 
\ No newline at end of file
+    name = 'apps.posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -6,6 +6,11 @@ class InvalidEmojiException(APIException):
     default_detail = 'Invalid emoji provided'
     default_code = 'invalid_emoji'
 
+class InvalidReactionKind(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Invalid reaction kind'
+    default_code = 'invalid_reaction_kind'
+
 class InvalidParentCommentException(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = 'Parent comment must belong to the same post'
@@ -14,4 +19,22 @@ class InvalidParentCommentException(APIException):
 class PostNotFound(APIException):
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = 'Post not found'
-    default_code = 'post_not_found' 
\ No newline at end of file
+    default_code = 'post_not_found' 
+
+class UploadOffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the current upload offset'
+    default_code = 'upload_offset_mismatch'
+
+    def __init__(self, offset, detail=None, code=None):
+        super().__init__(detail, code)
+        self.offset = offset
+
+class UploadIncomplete(UploadOffsetMismatch):
+    default_detail = 'Upload has not received all of its bytes'
+    default_code = 'upload_incomplete'
+
+class UploadInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another request is writing to this upload'
+    default_code = 'upload_in_progress'
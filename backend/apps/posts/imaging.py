@@ -0,0 +1,159 @@
+"""
+Pillow helpers for media derivatives.
+
+Nothing here imports Django, so these functions can run in worker processes
+of a ProcessPoolExecutor: they take a path or bytes and return encoded bytes,
+and the caller stores the result.
+
+Every derivative is written in its base format (JPEG or PNG) plus the modern
+formats Pillow can encode (AVIF with the pillow-avif-plugin installed, WebP
+otherwise always). Images are rotated according to their EXIF orientation
+and then encoded without any EXIF, XMP or embedded thumbnail. Originals are
+stripped the same way by strip_metadata before they are stored, so the
+fallback served before (or instead of) the derivatives carries no GPS
+position either.
+"""
+
+import io
+
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # noqa: F401  registers the AVIF plugin on Pillow < 11
+except ImportError:
+    pass
+
+# Formats we re-encode derivatives in; anything else (e.g. BMP, TIFF) becomes JPEG
+BASE_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+# Alternates in order of preference: (Pillow format, extension, MIME type)
+ALTERNATE_FORMATS = [
+    ('AVIF', '.avif', 'image/avif'),
+    ('WEBP', '.webp', 'image/webp'),
+]
+JPEG_QUALITY = 82
+# Originals are re-encoded only to drop metadata, so close to losslessly
+ORIGINAL_JPEG_QUALITY = 95
+# Image.info keys holding metadata; ICC profiles are kept
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+def available_alternates():
+    """The entries of ALTERNATE_FORMATS this Pillow build can encode."""
+    Image.init()
+    return [entry for entry in ALTERNATE_FORMATS if entry[0] in Image.SAVE]
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+def encode(image, format):
+    """Encode ``image`` as ``format`` without metadata and return the bytes."""
+    buffer = io.BytesIO()
+    if format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, format, quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif format == 'PNG':
+        image.save(buffer, format, optimize=True)
+    elif format == 'WEBP':
+        image.save(buffer, format, quality=WEBP_QUALITY, method=4)
+    elif format == 'AVIF':
+        image.save(buffer, format, quality=AVIF_QUALITY)
+    else:
+        image.save(buffer, format)
+    return buffer.getvalue()
+
+def encode_all(image, base_format):
+    """Return {extension: bytes} for the base format and every available alternate."""
+    encoded = {BASE_FORMATS[base_format]: encode(image, base_format)}
+    for format, extension, _ in available_alternates():
+        if extension not in encoded:
+            encoded[extension] = encode(image, format)
+    return encoded
+
+def normalize(image):
+    """Apply the EXIF orientation and return (image, base format to encode it in)."""
+    format = image.format if image.format in BASE_FORMATS else 'JPEG'
+    return ImageOps.exif_transpose(image), format
+
+def render_variants(source, widths):
+    """
+    Downscale an image to each width in ``widths`` that is smaller than the
+    original, plus a full-size copy with metadata stripped. Returns
+    {'width', 'height', 'variants': [(width, height, {extension: bytes})]}
+    where the first extension is the base format, or None if ``source`` is
+    not an image Pillow can read. Animated images keep their original only.
+    """
+    try:
+        with _open(source) as image:
+            image.load()
+            if getattr(image, 'is_animated', False):
+                return {'width': image.width, 'height': image.height, 'variants': []}
+            image, format = normalize(image)
+
+            variants = []
+            for width in sorted(set(widths)):
+                if width >= image.width:
+                    break
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+                variants.append((width, height, encode_all(resized, format)))
+            variants.append((image.width, image.height, encode_all(image, format)))
+            return {'width': image.width, 'height': image.height, 'variants': variants}
+    except (OSError, Image.DecompressionBombError, ValueError):
+        return None
+
+def render_square_ladder(source, sizes):
+    """
+    Center-crop an image to a square and render it at each of ``sizes``.
+    Returns [(size, {extension: bytes})] from smallest to largest, where the
+    first extension is the base format, or None if ``source`` is not an image
+    Pillow can read. Animated images use their first frame.
+    """
+    try:
+        with _open(source) as image:
+            image.load()
+            image, format = normalize(image)
+            if image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            if image.mode == 'RGBA' and format == 'JPEG':
+                format = 'PNG'
+            return [
+                (size, encode_all(ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS), format))
+                for size in sorted(set(sizes))
+            ]
+    except (OSError, Image.DecompressionBombError, ValueError):
+        return None
+
+def strip_metadata(path):
+    """
+    Re-encode the image at ``path`` in place without EXIF, XMP or comments,
+    applying its EXIF orientation first. Returns True if the file was
+    rewritten; files without metadata, animations and anything Pillow cannot
+    read are left alone.
+    """
+    try:
+        with Image.open(path) as image:
+            if image.format not in BASE_FORMATS or getattr(image, 'is_animated', False):
+                return False
+            if not any(key in image.info for key in METADATA_KEYS) and not image.getexif():
+                return False
+            image.load()
+            icc_profile = image.info.get('icc_profile')
+            image, format = normalize(image)
+            options = {'icc_profile': icc_profile} if icc_profile else {}
+            if format == 'JPEG':
+                if image.mode not in ('RGB', 'L', 'CMYK'):
+                    image = image.convert('RGB')
+                options.update(quality=ORIGINAL_JPEG_QUALITY, subsampling=0)
+            elif format == 'WEBP':
+                options.update(lossless=image.info.get('lossless', False), quality=ORIGINAL_JPEG_QUALITY)
+            buffer = io.BytesIO()
+            image.save(buffer, format, **options)
+    except (OSError, Image.DecompressionBombError, ValueError):
+        return False
+    with open(path, 'wb') as target:
+        target.write(buffer.getvalue())
+    return True
@@ -0,0 +1,84 @@
+import io
+import os
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw, ImageFilter
+from apps.posts.imaging import available_alternates, encode, normalize
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+def synthetic_photo(seed, width=1600, height=1200):
+    """A JPEG with gradients, shapes, noise and EXIF, roughly like a phone photo."""
+    rng = random.Random(seed)
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(20, 300)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+    image = image.filter(ImageFilter.GaussianBlur(3))
+    noise = Image.effect_noise((width, height), 24).convert('RGB')
+    image = Image.blend(image, noise, 0.15)
+    exif = Image.Exif()
+    exif[0x010F] = 'Benchmark Camera'  # Make
+    exif[0x0112] = 1  # Orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif)
+    return buffer.getvalue()
+
+class Command(BaseCommand):
+    help = 'Reports byte savings and encode time of WebP/AVIF re-encoding over a sample corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Directory of sample images; a synthetic corpus is generated if omitted'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=20,
+            help='Number of synthetic images to generate when --path is not given'
+        )
+
+    def handle(self, *args, **options):
+        corpus = self.load_corpus(options)
+        if not corpus:
+            raise CommandError('No images found in the corpus')
+
+        # 'stripped' is the upload re-encoded in its own format (JPEG/PNG) without metadata
+        formats = ['stripped'] + [format for format, _, _ in available_alternates()]
+        sizes = defaultdict(int)
+        timings = defaultdict(float)
+        original_bytes = sum(len(data) for _, data in corpus)
+
+        for _, data in corpus:
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                image, base_format = normalize(image)
+                for label in formats:
+                    start = time.perf_counter()
+                    encoded = encode(image, base_format if label == 'stripped' else label)
+                    timings[label] += time.perf_counter() - start
+                    sizes[label] += len(encoded)
+
+        self.stdout.write(f'{len(corpus)} images, {original_bytes / 1024:,.0f} KB of originals')
+        self.stdout.write(f'{"format":<10}{"KB":>12}{"saved":>10}{"ms/image":>12}')
+        for label in formats:
+            saved = 100 * (1 - sizes[label] / original_bytes)
+            per_image = 1000 * timings[label] / len(corpus)
+            self.stdout.write(f'{label:<10}{sizes[label] / 1024:>12,.0f}{saved:>9.1f}%{per_image:>12.1f}')
+
+    def load_corpus(self, options):
+        if not options['path']:
+            self.stdout.write(f'Generating {options["samples"]} synthetic photos...')
+            return [(f'synthetic-{i}.jpg', synthetic_photo(i)) for i in range(options['samples'])]
+        corpus = []
+        for root, _, names in os.walk(options['path']):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    with open(os.path.join(root, name), 'rb') as source:
+                        corpus.append((name, source.read()))
+        return corpus
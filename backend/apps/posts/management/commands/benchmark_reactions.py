@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from apps.posts import reactions
+from apps.posts.models import Post, Reaction
+from apps.posts.reaction_buffer import ReactionBuffer
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Compares synchronous and write-behind reaction throughput on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of synthetic users')
+        parser.add_argument('--posts', type=int, default=20, help='Number of synthetic posts')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--operations', type=int, default=500, help='Reactions per thread')
+        parser.add_argument(
+            '--flush-interval', type=float, default=0.5,
+            help='Flush interval of the write-behind buffer in seconds'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows per flush transaction of the write-behind buffer'
+        )
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        self.stdout.write(f'Creating {options["users"]} users and {options["posts"]} posts...')
+        User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com')
+            for i in range(options['users'])
+        ])
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+        posts = Post.objects.bulk_create([
+            Post(author_id=user_ids[0], title=f'Benchmark {i}', content='Benchmark post content')
+            for i in range(options['posts'])
+        ])
+        post_ids = [post.pk for post in posts]
+
+        try:
+            sync_rate, sync_errors = self.run(
+                options, user_ids, post_ids, lambda *args: reactions.toggle_reaction(*args)
+            )
+            buffer = ReactionBuffer(options['flush_interval'], options['batch_size'])
+            buffered_rate, buffered_errors = self.run(
+                options, user_ids, post_ids,
+                lambda *args: buffer.apply(*args, 'toggle'),
+                finish=buffer.stop
+            )
+        finally:
+            Reaction.objects.filter(post_id__in=post_ids).delete()
+            Post.objects.filter(pk__in=post_ids).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(f'Synchronous:  {sync_rate:,.0f} reactions/sec ({sync_errors} lock errors)')
+        self.stdout.write(f'Write-behind: {buffered_rate:,.0f} reactions/sec ({buffered_errors} lock errors)')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {buffered_rate / max(sync_rate, 1):.1f}x'))
+
+    def run(self, options, user_ids, post_ids, react, finish=None):
+        """Run every thread to completion and return (reactions/sec, lock errors)."""
+        errors = []
+        barrier = threading.Barrier(options['threads'])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            failed = 0
+            try:
+                barrier.wait()
+                for _ in range(options['operations']):
+                    kind = rng.choice([Reaction.LIKE, Reaction.HUG, Reaction.FIRE])
+                    try:
+                        react(rng.choice(post_ids), rng.choice(user_ids), kind)
+                    except OperationalError:
+                        failed += 1
+            finally:
+                errors.append(failed)
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if finish is not None:
+            finish()
+        elapsed = time.perf_counter() - start
+
+        total = options['threads'] * options['operations']
+        return total / elapsed, sum(errors)
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from apps.posts import search
+from apps.posts.models import Post
+
+User = get_user_model()
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'do', 'fe', 'gu', 'hi', 'ja', 'bo']
+
+class Command(BaseCommand):
+    help = 'Compares icontains search with the full-text index on a synthetic corpus (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000, help='Number of synthetic posts')
+        parser.add_argument('--words', type=int, default=60, help='Average words of content per post')
+        parser.add_argument('--vocabulary', type=int, default=20_000, help='Number of distinct words')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Posts inserted and indexed per batch')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query, the median is reported')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the corpus')
+
+    def handle(self, *args, **options):
+        if not search.supported():
+            raise CommandError('Full-text search needs SQLite or PostgreSQL')
+        rng = random.Random(options['seed'])
+        vocabulary = self.vocabulary(rng, options['vocabulary'])
+        # Zipf-like word frequencies, so queries range from very common to rare words
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+        with transaction.atomic():
+            self.populate(rng, vocabulary, weights, options)
+            queries = {
+                'common word': vocabulary[0],
+                'medium word': vocabulary[len(vocabulary) // 100],
+                'rare word': vocabulary[-1],
+                'prefix': vocabulary[len(vocabulary) // 10][:3],
+                'two words': f'{vocabulary[1]} {vocabulary[len(vocabulary) // 50]}',
+            }
+            # Ranking by relevance scores every match; sort=latest stops after a page
+            self.stdout.write(f'{"query":<14}{"icontains":>14}{"fts latest":>14}{"fts ranked":>14}')
+            for label, term in queries.items():
+                timings = [
+                    self.time(lambda: self.icontains_page(term), options['repeat']),
+                    self.time(lambda: self.indexed_page(term, '-created_at'), options['repeat']),
+                    self.time(lambda: self.indexed_page(term, '-search_rank', '-created_at'), options['repeat']),
+                ]
+                self.stdout.write(f'{label:<14}' + ''.join(f'{timing * 1000:>12.1f}ms' for timing in timings))
+            # Nothing written here outlives the benchmark
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done; the synthetic corpus was rolled back'))
+
+    def vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+        return sorted(words, key=lambda word: rng.random())
+
+    def populate(self, rng, vocabulary, weights, options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        author = User.objects.create_user(username=prefix, email=f'{prefix}@example.com')
+        total = options['posts']
+        start = time.perf_counter()
+        for offset in range(0, total, options['batch_size']):
+            count = min(options['batch_size'], total - offset)
+            posts = []
+            for _ in range(count):
+                length = max(3, int(rng.gauss(options['words'], options['words'] / 3)))
+                words = rng.choices(vocabulary, weights, k=length + 5)
+                posts.append(Post(
+                    id=uuid.uuid4(), author=author,
+                    title=' '.join(words[:5]).capitalize(), content=' '.join(words[5:])
+                ))
+            # bulk_create sends no signals, so the index rows are written here
+            Post.objects.bulk_create(posts)
+            search.index_rows([(post.pk, post.title, post.content, []) for post in posts])
+            self.stdout.write(f'\rCreated {offset + count:,}/{total:,} posts', ending='')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'\nCorpus ready in {elapsed:.0f}s ({total / elapsed:,.0f} posts/sec)')
+
+    def icontains_page(self, term):
+        """The first feed page as the feed searched before the full-text index."""
+        queryset = Post.objects.filter(
+            Q(title__icontains=term) | Q(content__icontains=term) | Q(tags__name__icontains=term)
+        ).distinct().order_by('-created_at', '-id')
+        return list(queryset.values_list('pk', flat=True)[:21])
+
+    def indexed_page(self, term, *ordering):
+        queryset = search.search_posts(Post.objects.all(), term).order_by(*ordering, '-id')
+        return list(queryset.values_list('pk', flat=True)[:21])
+
+    def time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
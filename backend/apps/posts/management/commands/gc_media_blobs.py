@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from apps.posts.models import MediaBlob, PostMedia
+from apps.posts.variants import variant_names
+
+class Command(BaseCommand):
+    help = 'Repairs media blob reference counts and deletes blobs no post refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of blobs processed per transaction'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Only delete blobs older than this many minutes, so in-flight uploads are kept'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would change without writing or deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        repaired = self.repair_ref_counts(chunk_size, dry_run)
+
+        cutoff = timezone.now() - timedelta(minutes=options['min_age'])
+        orphans = MediaBlob.objects.filter(ref_count=0, created_at__lt=cutoff).exclude(
+            Exists(PostMedia.objects.filter(blob_id=OuterRef('pk')))
+        )
+        deleted = freed = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                blobs = list(
+                    orphans.filter(pk__gt=last_pk).order_by('pk').select_for_update()[:chunk_size]
+                )
+                if not blobs:
+                    break
+                last_pk = blobs[-1].pk
+                if not dry_run:
+                    # Re-check under the lock: an upload may have taken a
+                    # reference since the query (or, without row locks, still can)
+                    orphaned = set(
+                        MediaBlob.objects.filter(pk__in=[blob.pk for blob in blobs], ref_count=0)
+                        .values_list('pk', flat=True)
+                    )
+                    blobs = [blob for blob in blobs if blob.pk in orphaned]
+                deleted += len(blobs)
+                freed += sum(blob.size for blob in blobs)
+                if dry_run or not blobs:
+                    continue
+                files = {blob.sha256: [blob.file.name, *variant_names(blob)] for blob in blobs}
+                MediaBlob.objects.filter(pk__in=[blob.pk for blob in blobs], ref_count=0).delete()
+                # Files go only once the rows are gone for good
+                transaction.on_commit(lambda files=files: self.delete_files(files))
+
+        action = 'would be' if dry_run else 'were'
+        self.stdout.write(self.style.SUCCESS(
+            f'{repaired} reference counts {action} repaired, '
+            f'{deleted} orphaned blobs ({freed / (1024 * 1024):.1f} MB) {action} deleted'
+        ))
+
+    def repair_ref_counts(self, chunk_size, dry_run):
+        """Recompute ref_count from PostMedia and fix any drift. Returns the number fixed."""
+        repaired = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                blobs = list(
+                    MediaBlob.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .only('pk', 'ref_count').select_for_update()[:chunk_size]
+                )
+                if not blobs:
+                    return repaired
+                last_pk = blobs[-1].pk
+                counts = dict(
+                    PostMedia.objects.filter(blob_id__in=[blob.pk for blob in blobs])
+                    .values('blob_id').annotate(total=Count('id')).values_list('blob_id', 'total')
+                    .order_by()
+                )
+                drifted = []
+                for blob in blobs:
+                    expected = counts.get(blob.pk, 0)
+                    if blob.ref_count != expected:
+                        blob.ref_count = expected
+                        drifted.append(blob)
+                if drifted and not dry_run:
+                    MediaBlob.objects.bulk_update(drifted, ['ref_count'])
+                repaired += len(drifted)
+
+    def delete_files(self, files):
+        """Delete the files of each digest in ``files``, unless it was uploaded again meanwhile."""
+        recreated = set(MediaBlob.objects.filter(sha256__in=files).values_list('sha256', flat=True))
+        for digest, names in files.items():
+            if digest in recreated:
+                continue
+            for name in names:
+                if name and default_storage.exists(name):
+                    default_storage.delete(name)
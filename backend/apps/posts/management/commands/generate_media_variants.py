@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from apps.posts.imaging import render_variants
+from apps.posts.models import MediaBlob
+from apps.posts.variants import get_config, read_source, save_variants
+
+class Command(BaseCommand):
+    help = 'Renders responsive width variants for image blobs that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=get_config()['WORKERS'],
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=50,
+            help='Number of blobs handed to the pool at a time'
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also retry blobs whose previous rendering failed'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for new blobs instead of exiting when done'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to sleep between polls with --loop'
+        )
+
+    def handle(self, *args, **options):
+        statuses = [MediaBlob.VARIANTS_PENDING]
+        if options['retry_failed']:
+            statuses.append(MediaBlob.VARIANTS_FAILED)
+        widths = get_config()['WIDTHS']
+
+        rendered = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                last_pk = 0
+                while True:
+                    blobs = list(
+                        MediaBlob.objects.filter(
+                            pk__gt=last_pk, variants_status__in=statuses, content_type__startswith='image/'
+                        ).order_by('pk')[:options['chunk_size']]
+                    )
+                    if not blobs:
+                        break
+                    last_pk = blobs[-1].pk
+                    results = executor.map(
+                        render_variants, [read_source(blob) for blob in blobs], [widths] * len(blobs)
+                    )
+                    for blob, result in zip(blobs, results):
+                        save_variants(blob, result)
+                        if result is None:
+                            failed += 1
+                        else:
+                            rendered += 1
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered variants for {rendered} blobs, {failed} failed'))
@@ -0,0 +1,60 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from apps.posts.exceptions import UploadInProgress
+from apps.posts.models import UploadSession
+from apps.posts.uploads import discard, get_config, stale_sessions
+
+class Command(BaseCommand):
+    help = 'Deletes resumable upload sessions (and their part files) that stopped receiving bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=get_config()['EXPIRY_HOURS'],
+            help='Reap sessions not written to for this many hours'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be deleted without deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        reaped = busy = freed = 0
+        for session in stale_sessions(max_age=options['max_age']).iterator():
+            if session.status == UploadSession.STATUS_ACTIVE:
+                freed += session.offset
+            reaped += 1
+            if dry_run:
+                continue
+            try:
+                discard(session)
+            except UploadInProgress:
+                # A chunk is being written right now, so it is not stale after all
+                busy += 1
+                reaped -= 1
+
+        orphans = 0 if dry_run else self.remove_orphaned_parts(options['max_age'])
+
+        action = 'would be' if dry_run else 'were'
+        self.stdout.write(self.style.SUCCESS(
+            f'{reaped} stale upload sessions ({freed / (1024 * 1024):.1f} MB) {action} deleted, '
+            f'{busy} skipped as in progress, {orphans} orphaned part files removed'
+        ))
+
+    def remove_orphaned_parts(self, max_age):
+        """Remove part files with no session row, e.g. left behind by a crash."""
+        directory = get_config()['DIR']
+        if not os.path.isdir(directory):
+            return 0
+        cutoff = time.time() - max_age * 3600
+        known = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+        removed = 0
+        for entry in os.scandir(directory):
+            session_id, extension = os.path.splitext(entry.name)
+            if extension != '.part' or session_id in known or entry.stat().st_mtime >= cutoff:
+                continue
+            os.unlink(entry.path)
+            removed += 1
+        return removed
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.posts import search
+from apps.posts.models import Post
+
+class Command(BaseCommand):
+    help = 'Rewrites the full-text search index row of every post and drops rows of deleted posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of posts read and indexed per round trip'
+        )
+
+    def handle(self, *args, **options):
+        if not search.supported():
+            raise CommandError('Full-text search needs SQLite or PostgreSQL')
+        start = time.perf_counter()
+        indexed = search.index_all(Post, chunk_size=options['chunk_size'])
+        pruned = search.prune()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} posts in {elapsed:.1f}s, removed {pruned} stale index rows'
+        ))
@@ -0,0 +1,194 @@
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from apps.posts import trending
+from apps.posts.models import PostTag, Reaction, Tag, TagActivityBucket, TrendingTag
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds TrendingTag.post_count and the hourly TagActivityBucket counts '
+        'from the post/tag relations and reactions to repair drift'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of rows fetched per round trip and TrendingTag/TagActivityBucket rows written per batch'
+        )
+        parser.add_argument(
+            '--since',
+            help='Only recount tags used by posts created or edited since this date/datetime '
+                 '(ISO 8601), and activity buckets from that hour on. Tags whose posts were '
+                 'deleted are only caught by a full rebuild.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Print the counts that would change without writing them'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        since = self.parse_since(options['since']) if options['since'] else None
+        self.rebuild_trending_tags(since, chunk_size, options['dry_run'])
+        self.rebuild_activity_buckets(since, chunk_size, options['dry_run'])
+
+    def rebuild_trending_tags(self, since, chunk_size, dry_run):
+        rows = PostTag.objects.order_by()
+        tag_ids = None
+        if since is not None:
+            tag_ids = set(
+                PostTag.objects.filter(post__updated_at__gte=since)
+                .values_list('tag_id', flat=True).distinct().order_by()
+            )
+            rows = rows.filter(tag_id__in=tag_ids)
+
+        # Only one integer per tag is kept in memory, however many rows stream past
+        start = time.perf_counter()
+        counts = Counter()
+        streamed = 0
+        for tag_id in rows.values_list('tag_id', flat=True).iterator(chunk_size=chunk_size):
+            counts[tag_id] += 1
+            streamed += 1
+        elapsed = time.perf_counter() - start
+
+        existing = TrendingTag.objects.all()
+        if tag_ids is not None:
+            existing = existing.filter(tag_id__in=tag_ids)
+
+        changed = []
+        seen = set()
+        for trending_tag in existing.only('id', 'tag_id', 'post_count').iterator(chunk_size=chunk_size):
+            seen.add(trending_tag.tag_id)
+            expected = counts.get(trending_tag.tag_id, 0)
+            if trending_tag.post_count != expected:
+                changed.append((trending_tag, trending_tag.post_count, expected))
+                trending_tag.post_count = expected
+        created = [
+            TrendingTag(tag_id=tag_id, post_count=count)
+            for tag_id, count in counts.items()
+            if tag_id not in seen
+        ]
+
+        if dry_run:
+            self.report(changed, created)
+        else:
+            with transaction.atomic():
+                now = timezone.now()
+                for trending_tag, _, _ in changed:
+                    trending_tag.last_updated = now
+                TrendingTag.objects.bulk_update(
+                    [trending_tag for trending_tag, _, _ in changed],
+                    ['post_count', 'last_updated'],
+                    batch_size=chunk_size
+                )
+                TrendingTag.objects.bulk_create(created, batch_size=chunk_size, ignore_conflicts=True)
+
+        rate = streamed / elapsed if elapsed else streamed
+        action = 'would be updated' if dry_run else 'updated'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Streamed {streamed} post/tag rows ({rate:,.0f} rows/sec) for {len(counts)} tags; '
+                f'{len(changed)} {action}, {len(created)} missing'
+            )
+        )
+
+    def rebuild_activity_buckets(self, since, chunk_size, dry_run):
+        post_rows = PostTag.objects.order_by()
+        reaction_rows = Reaction.objects.filter(post__post_tags__isnull=False).order_by()
+        existing = TagActivityBucket.objects.all()
+        if since is not None:
+            start = trending.bucket_hour(since)
+            post_rows = post_rows.filter(created_at__gte=start)
+            reaction_rows = reaction_rows.filter(created_at__gte=start)
+            existing = existing.filter(hour__gte=start)
+
+        # One pair of integers per tag and hour, however many rows stream past
+        start_time = time.perf_counter()
+        posts, reactions = Counter(), Counter()
+        streamed = 0
+        for tag_id, created_at in post_rows.values_list('tag_id', 'created_at').iterator(chunk_size=chunk_size):
+            posts[tag_id, trending.bucket_hour(created_at)] += 1
+            streamed += 1
+        reaction_rows = reaction_rows.values_list('post__post_tags__tag_id', 'created_at')
+        for tag_id, created_at in reaction_rows.iterator(chunk_size=chunk_size):
+            reactions[tag_id, trending.bucket_hour(created_at)] += 1
+            streamed += 1
+        elapsed = time.perf_counter() - start_time
+
+        expected = set(posts) | set(reactions)
+        changed = []
+        seen = set()
+        fields = ('id', 'tag_id', 'hour', 'posts', 'reactions')
+        for bucket in existing.only(*fields).iterator(chunk_size=chunk_size):
+            key = (bucket.tag_id, bucket.hour)
+            seen.add(key)
+            counts = (posts.get(key, 0), reactions.get(key, 0))
+            if (bucket.posts, bucket.reactions) != counts:
+                changed.append((bucket, (bucket.posts, bucket.reactions), counts))
+                bucket.posts, bucket.reactions = counts
+        created = [
+            TagActivityBucket(tag_id=tag_id, hour=hour, posts=posts[tag_id, hour], reactions=reactions[tag_id, hour])
+            for tag_id, hour in expected
+            if (tag_id, hour) not in seen
+        ]
+
+        if dry_run:
+            self.report_buckets(changed, created)
+        else:
+            with transaction.atomic():
+                TagActivityBucket.objects.bulk_update(
+                    [bucket for bucket, _, _ in changed],
+                    ['posts', 'reactions'],
+                    batch_size=chunk_size
+                )
+                TagActivityBucket.objects.bulk_create(created, batch_size=chunk_size, ignore_conflicts=True)
+
+        rate = streamed / elapsed if elapsed else streamed
+        action = 'would be updated' if dry_run else 'updated'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Streamed {streamed} post/tag and reaction rows ({rate:,.0f} rows/sec) '
+                f'for {len(expected)} activity buckets; {len(changed)} {action}, {len(created)} missing'
+            )
+        )
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f'Invalid --since value: {value}')
+            since = datetime.combine(date, datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def report(self, changed, created):
+        names = Tag.objects.in_bulk(
+            [trending_tag.tag_id for trending_tag, _, _ in changed] +
+            [trending_tag.tag_id for trending_tag in created]
+        )
+        for trending_tag, old, new in changed:
+            self.stdout.write(f'  {names[trending_tag.tag_id].name}: {old} -> {new}')
+        for trending_tag in created:
+            self.stdout.write(f'  {names[trending_tag.tag_id].name}: (missing) -> {trending_tag.post_count}')
+
+    def report_buckets(self, changed, created):
+        names = Tag.objects.in_bulk(
+            [bucket.tag_id for bucket, _, _ in changed] + [bucket.tag_id for bucket in created]
+        )
+        for bucket, old, new in changed:
+            self.stdout.write(
+                f'  {names[bucket.tag_id].name} @ {bucket.hour:%Y-%m-%d %H:00}: '
+                f'posts {old[0]} -> {new[0]}, reactions {old[1]} -> {new[1]}'
+            )
+        for bucket in created:
+            self.stdout.write(
+                f'  {names[bucket.tag_id].name} @ {bucket.hour:%Y-%m-%d %H:00}: (missing) -> '
+                f'posts {bucket.posts}, reactions {bucket.reactions}'
+            )
@@ -0,0 +1,26 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from apps.posts import ranking
+
+class Command(BaseCommand):
+    help = 'Recomputes the time-decayed hot score of every post in the active window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Number of posts scored and written per batch'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=min(4, os.cpu_count() or 1),
+            help='Processes scoring batches in parallel; 1 scores them in this process'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        scored, expired = ranking.recompute(batch_size=options['batch_size'], workers=options['workers'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} active posts in {elapsed:.1f}s, {expired} left the window'
+        ))
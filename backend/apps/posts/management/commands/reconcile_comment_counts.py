@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from apps.posts.models import Comment, Post
+
+def repair(model, field, group_by, chunk_size, dry_run):
+    """
+    Recompute ``field`` on ``model`` from the Comment rows grouped by
+    ``group_by``, one chunk of rows per transaction. Returns (scanned, repaired).
+    """
+    scanned = repaired = 0
+    last_pk = None
+    while True:
+        with transaction.atomic():
+            queryset = model.objects.order_by('pk').only('pk', field)
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            rows = list(queryset.select_for_update()[:chunk_size])
+            if not rows:
+                return scanned, repaired
+            last_pk = rows[-1].pk
+
+            expected = dict(
+                Comment.objects.filter(**{f'{group_by}__in': [row.pk for row in rows]})
+                .values(group_by).annotate(total=Count('id')).values_list(group_by, 'total')
+                .order_by()
+            )
+            drifted = []
+            for row in rows:
+                value = expected.get(row.pk, 0)
+                if getattr(row, field) != value:
+                    setattr(row, field, value)
+                    drifted.append(row)
+            if drifted and not dry_run:
+                model.objects.bulk_update(drifted, [field])
+                if model is Post:
+                    Post.refresh_engagement([row.pk for row in drifted])
+
+        scanned += len(rows)
+        repaired += len(drifted)
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored comment counts on Post and reply counts on Comment to repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows to reconcile per transaction'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted rows without writing any changes'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        action = 'would be repaired' if dry_run else 'repaired'
+
+        scanned, repaired = repair(Post, 'comment_count', 'post', chunk_size, dry_run)
+        self.stdout.write(self.style.SUCCESS(f'Scanned {scanned} posts, {repaired} {action}'))
+        scanned, repaired = repair(Comment, 'reply_count', 'parent', chunk_size, dry_run)
+        self.stdout.write(self.style.SUCCESS(f'Scanned {scanned} comments, {repaired} {action}'))
@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from apps.posts.models import Post, Reaction
+
+COUNTER_FIELDS = [
+    'like_count', 'hug_count', 'relate_count',
+    'laugh_count', 'fire_count', 'check_count',
+]
+
+def count_reactions(post_ids):
+    """Return {post_id: {counter_field: value}} computed from the Reaction table."""
+    counts = defaultdict(dict)
+    rows = (
+        Reaction.objects.filter(post_id__in=post_ids)
+        .values('post_id', 'kind').annotate(total=Count('id')).order_by()
+    )
+    for row in rows:
+        counts[row['post_id']][Reaction.COUNT_FIELDS[row['kind']]] = row['total']
+    return counts
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized reaction counters and engagement scores on Post to repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of posts to reconcile per transaction'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted posts without writing any changes'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        scanned = repaired = 0
+        last_pk = None
+
+        while True:
+            with transaction.atomic():
+                queryset = Post.objects.order_by('pk').only(
+                    'pk', 'comment_count', 'engagement_score', *COUNTER_FIELDS
+                )
+                if last_pk is not None:
+                    queryset = queryset.filter(pk__gt=last_pk)
+                posts = list(queryset.select_for_update()[:chunk_size])
+                if not posts:
+                    break
+                last_pk = posts[-1].pk
+
+                expected = count_reactions([post.pk for post in posts])
+                drifted = []
+                for post in posts:
+                    counts = expected.get(post.pk, {})
+                    changed = False
+                    for field in COUNTER_FIELDS:
+                        value = counts.get(field, 0)
+                        if getattr(post, field) != value:
+                            setattr(post, field, value)
+                            changed = True
+                    score = sum(
+                        getattr(post, field) * weight for field, weight in Post.ENGAGEMENT_WEIGHTS.items()
+                    )
+                    if post.engagement_score != score:
+                        post.engagement_score = score
+                        changed = True
+                    if changed:
+                        drifted.append(post)
+
+                if drifted and not dry_run:
+                    Post.objects.bulk_update(drifted, COUNTER_FIELDS + ['engagement_score'])
+
+            scanned += len(posts)
+            repaired += len(drifted)
+
+        action = 'would be repaired' if dry_run else 'repaired'
+        self.stdout.write(
+            self.style.SUCCESS(f'Scanned {scanned} posts, {repaired} {action}')
+        )
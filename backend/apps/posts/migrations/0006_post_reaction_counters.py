@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:03
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_reaction_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    EmojiReaction = apps.get_model('posts', 'EmojiReaction')
+
+    relation_fields = {'likes': 'like_count', 'hugs': 'hug_count', 'relates': 'relate_count'}
+    emoji_fields = {'😂': 'laugh_count', '🔥': 'fire_count', '✅': 'check_count'}
+
+    for relation, field in relation_fields.items():
+        through = Post._meta.get_field(relation).remote_field.through
+        rows = through.objects.values('post_id').annotate(total=Count('id')).order_by()
+        for row in rows.iterator(chunk_size=1000):
+            Post.objects.filter(pk=row['post_id']).update(**{field: row['total']})
+
+    rows = EmojiReaction.objects.values('post_id', 'emoji').annotate(total=Count('id')).order_by()
+    for row in rows.iterator(chunk_size=1000):
+        field = emoji_fields.get(row['emoji'])
+        if field:
+            Post.objects.filter(pk=row['post_id']).update(**{field: row['total']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_postmedia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='check_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='fire_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hug_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='laugh_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='relate_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reaction_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Streams the legacy likes/hugs/relates M2M tables and EmojiReaction into the
+# unified Reaction table in fixed-size batches, so memory use stays flat no
+# matter how many reactions exist.
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+RELATION_KINDS = {'likes': 1, 'hugs': 2, 'relates': 3}
+EMOJI_KINDS = {'😂': 4, '🔥': 5, '✅': 6}
+
+
+def _stream_into(Reaction, rows, build):
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(build(row))
+        if len(batch) >= BATCH_SIZE:
+            Reaction.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Reaction.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_reactions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    EmojiReaction = apps.get_model('posts', 'EmojiReaction')
+    Reaction = apps.get_model('posts', 'Reaction')
+
+    for relation, kind in RELATION_KINDS.items():
+        through = Post._meta.get_field(relation).remote_field.through
+        # The M2M tables never recorded when a reaction happened; the post's
+        # creation time is the closest lower bound available.
+        rows = through.objects.order_by('id').values_list('post_id', 'user_id', 'post__created_at')
+        _stream_into(Reaction, rows, lambda row, kind=kind: Reaction(
+            post_id=row[0], user_id=row[1], kind=kind, created_at=row[2],
+        ))
+
+    rows = (
+        EmojiReaction.objects.filter(emoji__in=EMOJI_KINDS)
+        .order_by('id').values_list('post_id', 'user_id', 'emoji', 'created_at')
+    )
+    _stream_into(Reaction, rows, lambda row: Reaction(
+        post_id=row[0], user_id=row[1], kind=EMOJI_KINDS[row[2]], created_at=row[3],
+    ))
+
+
+def restore_legacy_reactions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    EmojiReaction = apps.get_model('posts', 'EmojiReaction')
+    Reaction = apps.get_model('posts', 'Reaction')
+
+    for relation, kind in RELATION_KINDS.items():
+        through = Post._meta.get_field(relation).remote_field.through
+        rows = Reaction.objects.filter(kind=kind).order_by('id').values_list('post_id', 'user_id')
+        _stream_into(through, rows, lambda row: through(post_id=row[0], user_id=row[1]))
+
+    emojis = {kind: emoji for emoji, kind in EMOJI_KINDS.items()}
+    rows = (
+        Reaction.objects.filter(kind__in=emojis)
+        .order_by('id').values_list('post_id', 'user_id', 'kind', 'created_at')
+    )
+    _stream_into(EmojiReaction, rows, lambda row: EmojiReaction(
+        post_id=row[0], user_id=row[1], emoji=emojis[row[2]], created_at=row[3],
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_reaction'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_reactions, restore_legacy_reactions),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_backfill_reactions'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='hugs',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='likes',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='relates',
+        ),
+        migrations.DeleteModel(
+            name='EmojiReaction',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:14
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def merge_duplicate_trending_tags(apps, schema_editor):
+    TrendingTag = apps.get_model('posts', 'TrendingTag')
+    duplicates = (
+        TrendingTag.objects.values('tag_id')
+        .annotate(rows=Count('id'), post_count=Max('post_count'))
+        .filter(rows__gt=1).order_by()
+    )
+    for row in duplicates:
+        rows = TrendingTag.objects.filter(tag_id=row['tag_id']).order_by('id')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        TrendingTag.objects.filter(pk=keep.pk).update(post_count=row['post_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_remove_legacy_reactions'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_trending_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trendingtag',
+            constraint=models.UniqueConstraint(fields=('tag',), name='unique_trending_tag'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:15
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def backfill_last_week(apps, schema_editor):
+    """Seed buckets from the posts and reactions of the last 7 days."""
+    Post = apps.get_model('posts', 'Post')
+    Reaction = apps.get_model('posts', 'Reaction')
+    TagActivityBucket = apps.get_model('posts', 'TagActivityBucket')
+    PostTag = Post.tags.through
+    since = timezone.now() - datetime.timedelta(days=7)
+
+    buckets = {}
+
+    def bucket(row):
+        key = (row['tag_id'], row['hour'])
+        if key not in buckets:
+            buckets[key] = TagActivityBucket(tag_id=row['tag_id'], hour=row['hour'])
+        return buckets[key]
+
+    posts = (
+        PostTag.objects.filter(post__created_at__gte=since)
+        .values('tag_id', hour=TruncHour('post__created_at', tzinfo=datetime.timezone.utc))
+        .annotate(total=Count('id')).order_by()
+    )
+    for row in posts.iterator(chunk_size=2000):
+        bucket(row).posts = row['total']
+
+    reactions = (
+        Reaction.objects.filter(created_at__gte=since, post__tags__isnull=False)
+        .values(tag_id=models.F('post__tags'), hour=TruncHour('created_at', tzinfo=datetime.timezone.utc))
+        .annotate(total=Count('id')).order_by()
+    )
+    for row in reactions.iterator(chunk_size=2000):
+        bucket(row).reactions = row['total']
+
+    TagActivityBucket.objects.bulk_create(buckets.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_trendingtag_unique_tag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('posts', models.IntegerField(default=0)),
+                ('reactions', models.IntegerField(default=0)),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='posts.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='posts_tagac_hour_bd0d67_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tagactivitybucket',
+            constraint=models.UniqueConstraint(fields=('tag', 'hour'), name='unique_tag_activity_hour'),
+        ),
+        migrations.RunPython(backfill_last_week, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_tagactivitybucket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postmedia',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='post_media/'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('size', models.PositiveBigIntegerField()),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count'], name='posts_media_ref_cou_34b7bc_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='references', to='posts.mediablob'),
+        ),
+    ]
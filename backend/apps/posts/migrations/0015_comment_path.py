@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations, models
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def segment(comment):
+    micros = (comment.created_at - EPOCH) // timedelta(microseconds=1)
+    return f'{micros:014x}{uuid.UUID(str(comment.pk)).hex[:6]}'
+
+
+def backfill_paths(apps, schema_editor):
+    """Walk existing parent chains level by level, so every parent's path is known first."""
+    Comment = apps.get_model('posts', 'Comment')
+    parents = None  # {pk: path} of the previous level
+    depth = 0
+    while parents is None or parents:
+        if parents is None:
+            querysets = [Comment.objects.filter(parent__isnull=True)]
+        else:
+            ids = list(parents)
+            querysets = [Comment.objects.filter(parent_id__in=ids[i:i + 500]) for i in range(0, len(ids), 500)]
+        current = {}
+        for queryset in querysets:
+            batch = []
+            for comment in queryset.only('pk', 'parent_id', 'created_at').iterator(chunk_size=2000):
+                comment.path = (parents[comment.parent_id] if parents else '') + segment(comment)
+                comment.depth = depth
+                current[comment.pk] = comment.path
+                batch.append(comment)
+            Comment.objects.bulk_update(batch, ['path', 'depth'], batch_size=500)
+        parents = current
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1000),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='posts_comme_post_id_abd11d_idx'),
+        ),
+    ]
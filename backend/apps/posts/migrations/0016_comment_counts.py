@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+
+    def total(**filters):
+        counts = Comment.objects.filter(**filters).values(*filters).annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(counts[:1]), 0)
+
+    Post.objects.update(comment_count=total(post=OuterRef('pk')))
+    Comment.objects.update(reply_count=total(parent=OuterRef('pk')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations, models
+import apps.posts.search
+import django.db.models.deletion
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+    "post_id UNINDEXED, title, content, tags, tokenize = 'porter unicode61 remove_diacritics 2')",
+]
+POSTGRESQL_CREATE = [
+    "CREATE TABLE posts_post_search ("
+    "post_id uuid PRIMARY KEY REFERENCES posts_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX posts_post_search_document ON posts_post_search USING GIN (document)",
+]
+# Frozen copies of the statements in apps.posts.search at the time of this migration
+SQLITE_INSERT = (
+    "INSERT INTO posts_post_search (rowid, post_id, title, content, tags) VALUES (%s, %s, %s, %s, %s)"
+)
+POSTGRESQL_INSERT = (
+    "INSERT INTO posts_post_search (post_id, document) VALUES (%s, "
+    "setweight(to_tsvector('english', %s), 'A') || "
+    "setweight(to_tsvector('english', %s), 'B') || "
+    "setweight(to_tsvector('english', %s), 'C'))"
+)
+CHUNK_SIZE = 1000
+
+
+def index_posts(Post, connection):
+    """Index every existing post, CHUNK_SIZE posts per round trip."""
+    post_tags = Post.tags.through
+    last_pk = None
+    while True:
+        posts = Post.objects.using(connection.alias).order_by('pk').only('pk', 'title', 'content')
+        if last_pk is not None:
+            posts = posts.filter(pk__gt=last_pk)
+        posts = list(posts[:CHUNK_SIZE])
+        if not posts:
+            return
+        last_pk = posts[-1].pk
+        tags = {}
+        rows = post_tags.objects.using(connection.alias).filter(post__in=posts).values_list('post_id', 'tag__name')
+        for post_id, name in rows:
+            tags.setdefault(post_id, []).append(name)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.executemany(SQLITE_INSERT, [
+                    # rowid: the low 63 bits of the post's UUID
+                    (post.pk.int & (2 ** 63 - 1), post.pk.hex, post.title, post.content, ' '.join(tags.get(post.pk, [])))
+                    for post in posts
+                ])
+            else:
+                cursor.executemany(POSTGRESQL_INSERT, [
+                    (str(post.pk), post.title, ' '.join(tags.get(post.pk, [])), post.content)
+                    for post in posts
+                ])
+
+
+def create_search_index(apps, schema_editor):
+    """Create the index table for this database vendor and index every existing post."""
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRESQL_CREATE,
+    }.get(schema_editor.connection.vendor)
+    if statements is None:
+        return  # Searched with icontains filters instead
+    for statement in statements:
+        schema_editor.execute(statement)
+
+    index_posts(apps.get_model('posts', 'Post'), schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchEntry',
+            fields=[
+                ('post', models.OneToOneField(db_column='post_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.post')),
+                ('document', apps.posts.search.SearchDocumentField()),
+            ],
+            options={
+                'db_table': 'posts_post_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
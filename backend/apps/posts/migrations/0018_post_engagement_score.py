@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_scores(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    reactions = (
+        F('like_count') + F('hug_count') + F('relate_count') +
+        F('laugh_count') + F('fire_count') + F('check_count')
+    )
+    Post.objects.update(engagement_score=reactions + F('comment_count') * 2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='engagement_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['engagement_score', 'created_at'], name='posts_post_engagem_571d6d_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_engagement_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['hot_score', 'created_at'], name='posts_post_hot_sco_19087c_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-17 04:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_post_created_at(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostTag = apps.get_model('posts', 'PostTag')
+    PostTag.objects.using(schema_editor.connection.alias).update(
+        created_at=Subquery(Post.objects.filter(pk=OuterRef('post_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_hot_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # posts_post_tags already exists as the auto-created through table;
+        # only the migration state learns about the explicit model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PostTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.post')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.tag')),
+                    ],
+                    options={
+                        'db_table': 'posts_post_tags',
+                        'unique_together': {('post', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='tags',
+                    field=models.ManyToManyField(related_name='posts', through='posts.PostTag', to='posts.tag'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_post_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', 'created_at'], name='posts_post__tag_id_960955_idx'),
+        ),
+        migrations.CreateModel(
+            name='TagFollow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follows', to='posts.tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_follows', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tagfollow',
+            index=models.Index(fields=['user', 'created_at'], name='posts_tagfo_user_id_690b3f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagfollow',
+            constraint=models.UniqueConstraint(fields=('user', 'tag'), name='unique_tag_follow'),
+        ),
+    ]
@@ -1,8 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.conf import settings
 import uuid
 from django.core.exceptions import ValidationError
 import mimetypes
+from .search import SearchDocumentField
+from .threads import PATH_MAX_LENGTH, child_path
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True, db_index=True)
@@ -26,12 +31,36 @@ class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts', db_index=True)
     title = models.CharField(max_length=200)
     content = models.TextField()
-    tags = models.ManyToManyField(Tag, related_name='posts')
-    likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
-    hugs = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='hugged_posts', blank=True)
-    relates = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='related_posts', blank=True)
+    tags = models.ManyToManyField(Tag, related_name='posts', through='PostTag')
+    # Denormalized reaction counters, kept in sync by the reaction actions
+    # and repaired by the reconcile_reaction_counts command.
+    like_count = models.PositiveIntegerField(default=0)
+    hug_count = models.PositiveIntegerField(default=0)
+    relate_count = models.PositiveIntegerField(default=0)
+    laugh_count = models.PositiveIntegerField(default=0)
+    fire_count = models.PositiveIntegerField(default=0)
+    check_count = models.PositiveIntegerField(default=0)
+    # Comments at any depth, kept in sync by Comment.save()/delete() and
+    # repaired by the reconcile_comment_counts command.
+    comment_count = models.PositiveIntegerField(default=0)
+    # Weighted sum of the counters above (see ENGAGEMENT_WEIGHTS), shifted in
+    # the same UPDATE as each counter so popular and trending feeds can sort
+    # on an index instead of an expression.
+    engagement_score = models.PositiveIntegerField(default=0)
+    # Engagement decayed by age, recomputed periodically; see apps.posts.ranking
+    hot_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    ENGAGEMENT_WEIGHTS = {
+        'like_count': 1,
+        'hug_count': 1,
+        'relate_count': 1,
+        'laugh_count': 1,
+        'fire_count': 1,
+        'check_count': 1,
+        'comment_count': 2,
+    }
     
     class Meta:
         ordering = ['-created_at']
@@ -39,62 +68,118 @@ class Post(models.Model):
             models.Index(fields=['author']),
             models.Index(fields=['created_at']),
             models.Index(fields=['author', 'created_at']),
+            models.Index(fields=['engagement_score', 'created_at']),
+            models.Index(fields=['hot_score', 'created_at']),
         ]
-    
+
+    @classmethod
+    def counter_updates(cls, deltas):
+        """
+        UPDATE keyword arguments shifting each counter in ``deltas``
+        ({field: delta}) and engagement_score by their weighted sum.
+        Decrements are floored at 0 so a drifted counter cannot break its
+        unsigned column; the reconcile commands repair the drift.
+        """
+        updates = {
+            field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items() if delta
+        }
+        score = sum(cls.ENGAGEMENT_WEIGHTS.get(field, 0) * delta for field, delta in deltas.items())
+        if score > 0:
+            updates['engagement_score'] = F('engagement_score') + score
+        elif score < 0:
+            updates['engagement_score'] = Greatest(F('engagement_score') + score, 0)
+        return updates
+
+    @classmethod
+    def adjust_counter(cls, post_id, field, delta):
+        """Shift a counter column in a single UPDATE using an F() expression."""
+        return cls.objects.filter(pk=post_id).update(**cls.counter_updates({field: delta}))
+
+    @classmethod
+    def refresh_engagement(cls, post_ids):
+        """Recompute engagement_score from the counters, e.g. after they were repaired."""
+        score = sum(F(field) * weight for field, weight in cls.ENGAGEMENT_WEIGHTS.items())
+        return cls.objects.filter(pk__in=post_ids).update(engagement_score=score)
+
     def __str__(self):
         return self.title
-    
-    @property
-    def like_count(self):
-        return self.likes.count()
-    
-    @property
-    def hug_count(self):
-        return self.hugs.count()
-    
-    @property
-    def relate_count(self):
-        return self.relates.count()
-    
-    @property
-    def laugh_count(self):
-        return self.emoji_reactions.filter(emoji='😂').count()
-    
-    @property
-    def fire_count(self):
-        return self.emoji_reactions.filter(emoji='🔥').count()
-    
-    @property
-    def check_count(self):
-        return self.emoji_reactions.filter(emoji='✅').count()
-
-class EmojiReaction(models.Model):
-    EMOJI_CHOICES = [
-        ('😂', 'Laugh'),
-        ('🔥', 'Fire'),
-        ('✅', 'Check'),
+
+class PostSearchEntry(models.Model):
+    """
+    The full-text index row of a post, see apps.posts.search. Its table is an
+    FTS5 table on SQLite and a tsvector table on PostgreSQL, created by the
+    migrations per database vendor, so Django does not manage it.
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.DO_NOTHING, primary_key=True, db_constraint=False,
+        db_column='post_id', related_name='search_entry'
+    )
+    document = SearchDocumentField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_search'
+
+class Reaction(models.Model):
+    """
+    A single reaction of a user to a post. One compact table holds every
+    reaction kind, replacing the former likes/hugs/relates M2M tables and the
+    EmojiReaction model.
+    """
+    LIKE = 1
+    HUG = 2
+    RELATE = 3
+    LAUGH = 4
+    FIRE = 5
+    CHECK = 6
+    KIND_CHOICES = [
+        (LIKE, 'Like'),
+        (HUG, 'Hug'),
+        (RELATE, 'Relate'),
+        (LAUGH, 'Laugh'),
+        (FIRE, 'Fire'),
+        (CHECK, 'Check'),
     ]
-    
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='emoji_reactions', db_index=True)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='emoji_reactions', db_index=True)
-    emoji = models.CharField(max_length=2, choices=EMOJI_CHOICES)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
-    
+    # Emoji reactions as exposed by the API, keyed by emoji character.
+    EMOJI_KINDS = {
+        '😂': LAUGH,
+        '🔥': FIRE,
+        '✅': CHECK,
+    }
+    KIND_EMOJIS = {kind: emoji for emoji, kind in EMOJI_KINDS.items()}
+    # Maps each kind to its counter column on Post.
+    COUNT_FIELDS = {
+        LIKE: 'like_count',
+        HUG: 'hug_count',
+        RELATE: 'relate_count',
+        LAUGH: 'laugh_count',
+        FIRE: 'fire_count',
+        CHECK: 'check_count',
+    }
+
+    # The composite indexes below lead with post and user, so the single
+    # column foreign key indexes would be redundant.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='reactions', db_index=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reactions', db_index=False)
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
     class Meta:
-        unique_together = ('post', 'user', 'emoji')
+        unique_together = ('post', 'user', 'kind')
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['post']),
-            models.Index(fields=['user']),
-            models.Index(fields=['emoji']),
-            models.Index(fields=['post', 'user']),
-            models.Index(fields=['post', 'emoji']),
+            models.Index(fields=['post', 'kind']),
+            models.Index(fields=['user', 'created_at']),
         ]
-    
+
     def __str__(self):
-        return f"{self.user.username} reacted with {self.emoji} to {self.post.title}"
+        return f"{self.user.username} reacted with {self.get_kind_display()} to {self.post.title}"
 
 class TrendingTag(models.Model):
+    # All-time post count per tag, shown in the admin only. Post writes do not
+    # touch it; run rebuild_trending_tags to refresh it. Trending is served
+    # from TagActivityBucket.
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='trending_stats', db_index=True)
     post_count = models.IntegerField(default=0, db_index=True)
     last_updated = models.DateTimeField(auto_now=True, db_index=True)
@@ -106,16 +191,77 @@ class TrendingTag(models.Model):
             models.Index(fields=['post_count']),
             models.Index(fields=['last_updated']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['tag'], name='unique_trending_tag'),
+        ]
     
     def __str__(self):
         return f"{self.tag.name} ({self.post_count} posts)"
 
+class TagActivityBucket(models.Model):
+    """Posts and reactions per tag per hour, read by apps.posts.trending."""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='activity_buckets', db_index=False)
+    hour = models.DateTimeField()
+    posts = models.IntegerField(default=0)
+    reactions = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'hour'], name='unique_tag_activity_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.tag.name} @ {self.hour:%Y-%m-%d %H:00}"
+
+class PostTag(models.Model):
+    """
+    A tag on a post. created_at copies the post's, so each tag's posts are
+    an index range on (tag, created_at), see TagFeedView.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'posts_post_tags'
+        unique_together = [('post', 'tag')]
+        indexes = [
+            models.Index(fields=['tag', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.tag.name} on {self.post_id}"
+
+class TagFollow(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tag_follows')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='follows')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tag'], name='unique_tag_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} follows {self.tag.name}"
+
 class Comment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments', db_index=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments', db_index=True)
     content = models.TextField()
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies', db_index=True)
+    # Materialized path of the thread, set on first save; see apps.posts.threads
+    path = models.CharField(max_length=PATH_MAX_LENGTH, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Direct replies, maintained like Post.comment_count
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -127,30 +273,158 @@ class Comment(models.Model):
             models.Index(fields=['parent']),
             models.Index(fields=['created_at']),
             models.Index(fields=['post', 'parent']),
+            models.Index(fields=['post', 'path']),
         ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post.title}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not self.path:
+            self.path, self.depth = child_path(self.parent, self.pk, timezone.now())
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Post.adjust_counter(self.post_id, 'comment_count', 1)
+                if self.parent_id:
+                    Comment.objects.filter(pk=self.parent_id).update(reply_count=F('reply_count') + 1)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the comment with its replies and take them all off the stored
+        counts. Bulk queryset deletes skip this; reconcile_comment_counts
+        repairs the counts after those.
+        """
+        with transaction.atomic():
+            deleted, per_model = super().delete(*args, **kwargs)
+            removed = per_model.get(self._meta.label, 0)
+            Post.objects.filter(pk=self.post_id).update(
+                comment_count=Greatest(F('comment_count') - removed, 0),
+                engagement_score=Greatest(
+                    F('engagement_score') - removed * Post.ENGAGEMENT_WEIGHTS['comment_count'], 0
+                )
+            )
+            if self.parent_id:
+                Comment.objects.filter(pk=self.parent_id).update(
+                    reply_count=Greatest(F('reply_count') - 1, 0)
+                )
+        return deleted, per_model
+
     @property
     def has_children(self):
-        return self.replies.exists()
+        return self.reply_count > 0
+
+class MediaBlob(models.Model):
+    """
+    A stored file, named by the SHA-256 of its content. Identical uploads share
+    one blob; ``ref_count`` is the number of PostMedia rows pointing at it.
+    Images get downscaled ``variants`` ({width: {'name', 'width', 'height',
+    'size'}}) rendered in the background, see apps.posts.variants.
+    """
+    VARIANTS_PENDING = 'pending'
+    VARIANTS_READY = 'ready'
+    VARIANTS_SKIPPED = 'skipped'
+    VARIANTS_FAILED = 'failed'
+    VARIANTS_STATUS_CHOICES = [
+        (VARIANTS_PENDING, 'Pending'),
+        (VARIANTS_READY, 'Ready'),
+        (VARIANTS_SKIPPED, 'Skipped'),
+        (VARIANTS_FAILED, 'Failed'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)
+    variants_status = models.CharField(max_length=10, choices=VARIANTS_STATUS_CHOICES, default=VARIANTS_PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count']),
+            models.Index(fields=['variants_status']),
+        ]
+
+    @property
+    def is_image(self):
+        return self.content_type.startswith('image/')
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+class PostMediaManager(models.Manager):
+    def create_from_upload(self, post, uploaded_file):
+        """Store ``uploaded_file`` (deduplicated) and attach it to ``post``."""
+        from .storage import store_upload
+
+        return self.attach_blob(post, store_upload(uploaded_file))
+
+    def attach_blob(self, post, blob):
+        """Attach an already stored (and referenced) blob to ``post``."""
+        from .variants import schedule_variants
+
+        media = self.create(post=post, blob=blob, file=blob.file.name)
+        schedule_variants(blob)
+        return media
 
 class PostMedia(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='media')
-    file = models.FileField(upload_to='post_media/')
+    # Media uploaded before content-addressed storage has no blob
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='references', null=True, blank=True)
+    file = models.FileField(upload_to='post_media/', max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PostMediaManager()
+
+    ALLOWED_TYPES = [
+        'image/jpeg', 'image/png', 'image/gif',
+        'video/mp4', 'video/webm', 'video/ogg',
+    ]
+    MAX_SIZE = 10 * 1024 * 1024  # 10MB limit
+
     def clean(self):
-        allowed_types = [
-            'image/jpeg', 'image/png', 'image/gif',
-            'video/mp4', 'video/webm', 'video/ogg',
-        ]
         mime_type, _ = mimetypes.guess_type(self.file.name)
-        if mime_type not in allowed_types:
+        if mime_type not in self.ALLOWED_TYPES:
             raise ValidationError('Unsupported file type.')
-        if self.file.size > 10 * 1024 * 1024:  # 10MB limit
+        if self.file.size > self.MAX_SIZE:
             raise ValidationError('File too large (max 10MB).')
 
     def __str__(self):
-        return f"Media for {self.post.title} ({self.file.name})" 
\ No newline at end of file
+        return f"Media for {self.post.title} ({self.file.name})"
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress. The bytes received so far live in a part
+    file outside MEDIA_ROOT until the session is finalized into a PostMedia,
+    see apps.posts.uploads.
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    media = models.ForeignKey(PostMedia, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes, {self.status})"
@@ -1,11 +1,189 @@
-from rest_framework.pagination import PageNumberPagination
+"""
+Keyset (cursor) pagination.
 
-class CommentPagination(PageNumberPagination):
-    page_size = 10
+Pages are addressed by an opaque cursor holding the sort key of the last row
+served, e.g. (created_at, id), and the next page is the rows strictly after
+it in that order. Every page is an index range scan of page_size + 1 rows,
+so page 50 costs the same as page 1, no COUNT(*) runs, and posts created
+while a user scrolls cannot push rows onto the next page twice.
+"""
+
+import base64
+import binascii
+import functools
+import heapq
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates on the queryset's own ordering (or the model's default one),
+    with the primary key appended as a tie-breaker so the key is unique.
+    Ordering fields must be plain field or annotation names, e.g.
+    ('-engagement_score', '-created_at', '-id') or an annotated score such as
+    ('-recent_reactions', '-id').
+    """
+    page_size = 20
     page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Paginate the union of querysets of one model that share an ordering,
+        e.g. a materialized timeline and posts pulled at read time. Each is
+        read as its own keyset range of page_size + 1 rows and the results
+        are merged in order; a row found in several is kept once.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(querysets[0])
+
+        position = self.decode_cursor(request, querysets[0].model)
+        sources = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(self.after(position))
+            sources.append(list(queryset[:self.page_size + 1]))
+
+        rows = sources[0] if len(sources) == 1 else self.merge(sources, limit=self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        # A first page with nothing after it holds the whole list
+        self.known_total = len(rows) if position is None and not self.has_next else None
+        self.next_position = [self.key_value(rows[-1], field) for field in self.ordering] if self.has_next else None
+        return rows
+
+    def merge(self, sources, limit=None):
+        """
+        Merge lists already sorted in ``self.ordering``, dropping repeated
+        rows and stopping after ``limit`` rows.
+        """
+        def compare(a, b):
+            for field in self.ordering:
+                x, y = self.key_value(a, field), self.key_value(b, field)
+                if x != y:
+                    result = -1 if x < y else 1
+                    return -result if field.startswith('-') else result
+            return 0
+
+        rows = []
+        seen = set()
+        for row in heapq.merge(*sources, key=functools.cmp_to_key(compare)):
+            if row.pk in seen:
+                continue
+            seen.add(row.pk)
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        if not ordering or ordering[-1].lstrip('-') not in ('id', 'pk'):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    @staticmethod
+    def key_value(row, field):
+        return getattr(row, field.lstrip('-'))
+
+    def after(self, position):
+        """
+        Rows strictly after ``position`` in ``self.ordering``:
+        (a > x) OR (a = x AND b > y) OR ..., with each comparison flipped for
+        descending fields. The leading field is also bounded on its own so
+        the database can start an index range scan there.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first = self.ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & condition
+
+    def encode_cursor(self, position):
+        # str() keeps datetimes at full microsecond precision and UUIDs as text
+        data = json.dumps(position, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(model, field, value) for field, value in zip(self.ordering, position)]
+        except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_python(model, field, value):
+        name = field.lstrip('-')
+        try:
+            model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value  # an annotation such as a score; JSON already restored it
+        try:
+            return model_field.to_python(value)
+        except ValidationError:
+            raise ValueError(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+class CommentPagination(KeysetPagination):
+    page_size = 10
     max_page_size = 50
 
-class PostPagination(PageNumberPagination):
+class PostPagination(KeysetPagination):
     page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100 
\ No newline at end of file
+    max_page_size = 100
+
+class UserPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
@@ -0,0 +1,143 @@
+"""
+Time-decayed "hot" ranking of posts.
+
+A post's hot score is its engagement (Post.engagement_score: reactions plus
+weighted comments), boosted by the engagement it gained in the last
+``VELOCITY_HOURS``, divided by a power of its age, as on Hacker News:
+
+    hot = (engagement + VELOCITY_WEIGHT * recent) / (age_hours + OFFSET_HOURS) ** GRAVITY
+
+The recent term rewards posts that are being reacted to and discussed right
+now over ones that collected the same totals earlier.
+
+A post has to keep gaining reactions and comments faster than it ages to
+stay near the top, and old posts fade out gradually instead of dropping off
+at a cutoff. The score changes with time alone, so it is stored in
+Post.hot_score and recomputed in batches by the recompute_hot_scores command
+(run it from cron every few minutes); the trending feed is then an index
+scan on that column. Posts older than ``WINDOW_HOURS`` are zeroed once and
+then left alone. Batches are scored by a process pool with a bounded number
+in flight, so memory stays at a few batches however large the window is.
+Settings can be overridden with the HOT_RANKING setting.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Comment, Post, Reaction
+
+DEFAULTS = {
+    'GRAVITY': 1.8,
+    'OFFSET_HOURS': 2,
+    'WINDOW_HOURS': 7 * 24,
+    'VELOCITY_HOURS': 6,
+    'VELOCITY_WEIGHT': 3,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'HOT_RANKING', {})}
+
+def hot_scores(engagement, created, now, gravity, offset_hours, recent=None, velocity_weight=0):
+    """
+    Hot scores for arrays of engagement, creation times (POSIX seconds) and
+    optionally recent engagement at ``now`` (POSIX seconds), as a float64 array.
+    """
+    engagement = np.asarray(engagement, dtype=np.float64)
+    if recent is not None:
+        engagement = engagement + velocity_weight * np.asarray(recent, dtype=np.float64)
+    age_hours = np.maximum(now - np.asarray(created, dtype=np.float64), 0) / 3600
+    return engagement / np.power(age_hours + offset_hours, gravity)
+
+def _score_batch(batch):
+    # Runs in a worker process, so it only sees plain arrays
+    ids, engagement, recent, created, now, config = batch
+    scores = hot_scores(
+        engagement, created, now, config['GRAVITY'], config['OFFSET_HOURS'],
+        recent=recent, velocity_weight=config['VELOCITY_WEIGHT']
+    )
+    return ids, scores.tolist()
+
+def recent_engagement(post_ids, since):
+    """Reactions plus weighted comments each post got since ``since``, as {post_id: amount}."""
+    weights = Post.ENGAGEMENT_WEIGHTS
+    recent = dict.fromkeys(post_ids, 0)
+    reactions = (
+        Reaction.objects.filter(post_id__in=post_ids, created_at__gte=since)
+        .order_by().values('post_id', 'kind').annotate(amount=Count('pk'))
+        .values_list('post_id', 'kind', 'amount')
+    )
+    for post_id, kind, amount in reactions:
+        recent[post_id] += weights.get(Reaction.COUNT_FIELDS[kind], 0) * amount
+    comments = (
+        Comment.objects.filter(post_id__in=post_ids, created_at__gte=since)
+        .order_by().values('post_id').annotate(amount=Count('pk')).values_list('post_id', 'amount')
+    )
+    for post_id, amount in comments:
+        recent[post_id] += weights['comment_count'] * amount
+    return recent
+
+def _batches(now, since, batch_size, config):
+    """Yield the active posts ``batch_size`` at a time in primary key order."""
+    last_pk = None
+    while True:
+        rows = Post.objects.filter(created_at__gte=since).order_by('pk')
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        rows = list(rows.values_list('pk', 'engagement_score', 'created_at')[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        ids, engagement, created = zip(*rows)
+        recent = recent_engagement(ids, now - timedelta(hours=config['VELOCITY_HOURS']))
+        yield (
+            ids,
+            np.fromiter(engagement, dtype=np.float64, count=len(rows)),
+            np.fromiter((recent[pk] for pk in ids), dtype=np.float64, count=len(rows)),
+            np.fromiter((moment.timestamp() for moment in created), dtype=np.float64, count=len(rows)),
+            now.timestamp(),
+            config,
+        )
+
+def recompute(now=None, batch_size=2000, workers=1):
+    """
+    Recompute hot_score for every post inside the window and zero the ones
+    that just left it. Batches are scored by ``workers`` processes (inline
+    when 1) and written with one bulk_update per batch.
+    Returns (posts scored, posts expired).
+    """
+    config = get_config()
+    now = now or timezone.now()
+    since = now - timedelta(hours=config['WINDOW_HOURS'])
+    expired = Post.objects.filter(created_at__lt=since, hot_score__gt=0).update(hot_score=0)
+
+    batches = _batches(now, since, batch_size, config)
+    scored = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # At most two batches per worker are read ahead of the writes
+            in_flight = set()
+            for batch in batches:
+                in_flight.add(executor.submit(_score_batch, batch))
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        scored += _write(*future.result())
+            for future in wait(in_flight).done:
+                scored += _write(*future.result())
+    else:
+        for ids, scores in map(_score_batch, batches):
+            scored += _write(ids, scores)
+    return scored, expired
+
+def _write(ids, scores):
+    with transaction.atomic():
+        Post.objects.bulk_update(
+            [Post(pk=pk, hot_score=score) for pk, score in zip(ids, scores)],
+            ['hot_score'], batch_size=500
+        )
+    return len(ids)
@@ -0,0 +1,219 @@
+"""
+Optional write-behind buffer for reaction writes.
+
+With SQLite every reaction toggle takes the single database writer lock, so a
+viral post makes toggles queue behind each other. When
+``REACTION_WRITE_BEHIND['ENABLED']`` is set, reaction intents are instead
+recorded in an in-process buffer that keeps only the desired final state per
+(post, user, kind). A background flusher thread applies the net changes every
+``FLUSH_INTERVAL`` seconds in transactions of up to ``BATCH_SIZE`` rows, using
+the same conditional INSERT/DELETE statements as the synchronous path.
+
+Reads overlay the pending state, so a user sees their own change immediately
+when served by the same worker process; other workers see it after the next
+flush. A batch that fails to write, e.g. on "database is locked", goes back
+into the buffer and is retried on the next tick. Intents still buffered when
+the process exits are flushed by an atexit hook; a hard crash loses at most
+one flush interval of reactions.
+"""
+
+import atexit
+import itertools
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from .models import Post, Reaction
+
+logger = logging.getLogger(__name__)
+
+class ReactionBuffer:
+    def __init__(self, flush_interval=0.5, batch_size=500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # (post_id, user_id, kind) -> [state in the database, desired state]
+        self._pending = {}
+        # Entries taken by a flush that has not committed yet
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def apply(self, post_id, user_id, kind, action):
+        """
+        Record an 'add', 'remove' or 'toggle' intent.
+        Returns (reacted before, reacted after) as seen by the user.
+        Raises Post.DoesNotExist if the post does not exist.
+        """
+        key = (post_id, user_id, kind)
+        with self._lock:
+            known = key in self._pending or key in self._inflight
+        baseline = None if known else self._load_state(post_id, user_id, kind)
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    baseline = inflight[1]
+                elif baseline is None:
+                    baseline = self._load_state(post_id, user_id, kind)
+                entry = self._pending[key] = [baseline, baseline]
+            before = entry[1]
+            if action == 'add':
+                entry[1] = True
+            elif action == 'remove':
+                entry[1] = False
+            else:
+                entry[1] = not before
+            after = entry[1]
+
+        self._ensure_flusher()
+        return before, after
+
+    def _load_state(self, post_id, user_id, kind):
+        reacted = Post.objects.filter(pk=post_id).annotate(
+            reacted=Exists(Reaction.objects.filter(post_id=OuterRef('pk'), user_id=user_id, kind=kind))
+        ).values_list('reacted', flat=True).first()
+        if reacted is None:
+            raise Post.DoesNotExist()
+        return reacted
+
+    def _entries(self):
+        # Pending entries shadow in-flight ones for the same key
+        return {**self._inflight, **self._pending}
+
+    def pending_for_user(self, user_id, post_ids):
+        """Return {(post_id, kind): desired state} of the user's buffered intents."""
+        post_ids = set(post_ids)
+        with self._lock:
+            return {
+                (post_id, kind): desired
+                for (post_id, entry_user, kind), (baseline, desired) in self._entries().items()
+                if entry_user == user_id and post_id in post_ids
+            }
+
+    def pending_deltas(self, post_ids):
+        """Return {post_id: {counter_field: delta}} not yet written to the database."""
+        post_ids = set(post_ids)
+        deltas = defaultdict(Counter)
+        with self._lock:
+            for (post_id, user_id, kind), (baseline, desired) in self._entries().items():
+                if post_id in post_ids and baseline != desired:
+                    deltas[post_id][Reaction.COUNT_FIELDS[kind]] += 1 if desired else -1
+        return deltas
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write every pending intent to the database. Returns the number of rows changed."""
+        changed = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    keys = list(itertools.islice(self._pending, self.batch_size))
+                    batch = {key: self._pending.pop(key) for key in keys}
+                    self._inflight.update(batch)
+                try:
+                    changed += self._write(batch)
+                except Exception:
+                    logger.exception("Failed to flush %d buffered reactions, retrying next tick", len(batch))
+                    self._requeue(batch)
+                    break
+        return changed
+
+    def _settle(self, batch):
+        # Called right after the batch committed: its deltas are in the counters now
+        with self._lock:
+            for key in batch:
+                self._inflight.pop(key, None)
+
+    def _requeue(self, batch):
+        """Put a batch that failed to write back in front of the pending intents."""
+        with self._lock:
+            for key, entry in batch.items():
+                self._inflight.pop(key, None)
+                newer = self._pending.get(key)
+                if newer is not None:
+                    # The newer intent was based on this one landing; it did not
+                    newer[0] = entry[0]
+                else:
+                    self._pending[key] = entry
+
+    def _write(self, batch):
+        from . import reactions
+
+        adds = []
+        removes = []
+        for key, (baseline, desired) in batch.items():
+            if desired != baseline:
+                (adds if desired else removes).append(key)
+
+        with transaction.atomic():
+            # Skip intents for posts deleted since they were buffered
+            alive = set(
+                Post.objects.filter(pk__in={post_id for post_id, _, _ in adds})
+                .values_list('pk', flat=True)
+            )
+            added = reactions.insert_reaction_rows([key for key in adds if key[0] in alive])
+            removed = reactions.delete_reaction_rows(removes)
+
+            deltas = defaultdict(Counter)
+            for post_id, kind in added:
+                deltas[post_id][Reaction.COUNT_FIELDS[kind]] += 1
+            for post_id, kind in removed:
+                deltas[post_id][Reaction.COUNT_FIELDS[kind]] -= 1
+            reactions.apply_counter_deltas(deltas)
+        self._settle(batch)
+        return len(added) + len(removed)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='reaction-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        """Stop the flusher thread and write out anything still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_buffer():
+    """Return the process-wide reaction buffer, or None when write-behind is disabled."""
+    global _buffer
+    config = getattr(settings, 'REACTION_WRITE_BEHIND', {})
+    if not config.get('ENABLED'):
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ReactionBuffer(
+                    flush_interval=config.get('FLUSH_INTERVAL', 0.5),
+                    batch_size=config.get('BATCH_SIZE', 500),
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
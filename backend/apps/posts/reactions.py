@@ -0,0 +1,276 @@
+"""
+Race-free reaction writes.
+
+Every change is one conditional statement against the Reaction table:
+``INSERT ... ON CONFLICT DO NOTHING RETURNING`` to add and
+``DELETE ... RETURNING`` to remove. The returned rows tell us exactly which
+reactions changed, so the counters on Post are shifted only for real changes
+and concurrent taps can neither raise IntegrityError nor double count.
+Both statements are supported by SQLite (3.35+) and PostgreSQL.
+
+When write-behind is enabled (see reaction_buffer), add/remove/toggle record
+the intent in the buffer instead and the statements run on the next flush.
+"""
+
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+from . import trending
+from .models import Post, Reaction
+from .reaction_buffer import get_buffer
+
+# URL/API names for each reaction kind, e.g. {'like': Reaction.LIKE}.
+KIND_BY_NAME = {label.lower(): kind for kind, label in Reaction.KIND_CHOICES}
+NAME_BY_KIND = {kind: name for name, kind in KIND_BY_NAME.items()}
+
+COUNT_FIELDS = list(Reaction.COUNT_FIELDS.values())
+
+def _column(name):
+    return connection.ops.quote_name(Reaction._meta.get_field(name).column)
+
+def _prep(field_name, value):
+    return Reaction._meta.get_field(field_name).get_db_prep_save(value, connection)
+
+def _table():
+    return connection.ops.quote_name(Reaction._meta.db_table)
+
+def _to_keys(rows):
+    return [(Post._meta.pk.to_python(post_id), kind) for post_id, kind in rows]
+
+def _to_moment(value):
+    # Raw cursors return SQLite datetimes as naive UTC strings
+    moment = Reaction._meta.get_field('created_at').to_python(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+def insert_reaction_rows(rows):
+    """
+    Insert ``(post_id, user_id, kind)`` rows, skipping ones that already exist,
+    and count the new ones towards trending tags.
+    Returns the (post_id, kind) pairs that were actually inserted.
+    """
+    if not rows:
+        return []
+    now = _prep('created_at', timezone.now())
+    params = []
+    for post_id, user_id, kind in rows:
+        params.extend([_prep('post', post_id), _prep('user', user_id), kind, now])
+    sql = (
+        f"INSERT INTO {_table()} "
+        f"({_column('post')}, {_column('user')}, {_column('kind')}, {_column('created_at')}) "
+        f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(rows))} "
+        f"ON CONFLICT DO NOTHING RETURNING {_column('post')}, {_column('kind')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        inserted = _to_keys(cursor.fetchall())
+    trending.record_reactions([post_id for post_id, _ in inserted])
+    return inserted
+
+def delete_reaction_rows(rows):
+    """
+    Delete ``(post_id, user_id, kind)`` rows that exist and take them back
+    out of trending tags. Returns the (post_id, kind) pairs that were
+    actually deleted.
+    """
+    if not rows:
+        return []
+    params = []
+    for post_id, user_id, kind in rows:
+        params.extend([_prep('post', post_id), _prep('user', user_id), kind])
+    sql = (
+        f"DELETE FROM {_table()} "
+        f"WHERE ({_column('post')}, {_column('user')}, {_column('kind')}) "
+        f"IN ({', '.join(['(%s, %s, %s)'] * len(rows))}) "
+        f"RETURNING {_column('post')}, {_column('kind')}, {_column('created_at')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    deleted = _to_keys([(post_id, kind) for post_id, kind, _ in rows])
+    by_hour = defaultdict(list)
+    for (post_id, _), (_, _, created_at) in zip(deleted, rows):
+        by_hour[trending.bucket_hour(_to_moment(created_at))].append(post_id)
+    for hour, post_ids in by_hour.items():
+        trending.record_reactions(post_ids, amount=-1, at=hour)
+    return deleted
+
+def insert_reactions(user_id, kind, post_ids):
+    """Insert missing reactions and return the post IDs that were actually added."""
+    rows = [(post_id, user_id, kind) for post_id in post_ids]
+    return [post_id for post_id, _ in insert_reaction_rows(rows)]
+
+def delete_reactions(user_id, kind, post_ids):
+    """Delete existing reactions and return the post IDs that were actually removed."""
+    rows = [(post_id, user_id, kind) for post_id in post_ids]
+    return [post_id for post_id, _ in delete_reaction_rows(rows)]
+
+def shift_counters(kind, post_ids, delta):
+    """Shift the counter for ``kind`` on every post in ``post_ids`` by ``delta``."""
+    if not post_ids:
+        return 0
+    updates = Post.counter_updates({Reaction.COUNT_FIELDS[kind]: delta})
+    return Post.objects.filter(pk__in=post_ids).update(**updates)
+
+def apply_counter_deltas(deltas):
+    """Apply {post_id: {counter_field: delta}} with one UPDATE per post."""
+    for post_id, fields in deltas.items():
+        updates = Post.counter_updates(fields)
+        if updates:
+            Post.objects.filter(pk=post_id).update(**updates)
+
+def overlay_pending(counts):
+    """Add buffered, not yet flushed changes to {post_id: counters} in place."""
+    buffer = get_buffer()
+    if buffer is None or not counts:
+        return counts
+    for post_id, fields in buffer.pending_deltas(counts.keys()).items():
+        for field, delta in fields.items():
+            counts[post_id][field] += delta
+    return counts
+
+def get_counts(post_id):
+    """Return the reaction counters of a post, or None if it does not exist."""
+    counts = Post.objects.filter(pk=post_id).values('pk', *COUNT_FIELDS).first()
+    if counts is None:
+        return None
+    post_id = counts.pop('pk')
+    return overlay_pending({post_id: counts})[post_id]
+
+def add_reaction(post_id, user_id, kind):
+    """
+    Idempotently add a reaction. Returns True if a new row was inserted.
+    With write-behind enabled, raises Post.DoesNotExist for a missing post.
+    """
+    buffer = get_buffer()
+    if buffer is not None:
+        before, after = buffer.apply(post_id, user_id, kind, 'add')
+        return before != after
+    with transaction.atomic():
+        added = insert_reactions(user_id, kind, [post_id])
+        shift_counters(kind, added, 1)
+    return bool(added)
+
+def remove_reaction(post_id, user_id, kind):
+    """Idempotently remove a reaction. Returns True if a row was deleted."""
+    buffer = get_buffer()
+    if buffer is not None:
+        before, after = buffer.apply(post_id, user_id, kind, 'remove')
+        return before != after
+    with transaction.atomic():
+        removed = delete_reactions(user_id, kind, [post_id])
+        shift_counters(kind, removed, -1)
+    return bool(removed)
+
+def toggle_reaction(post_id, user_id, kind):
+    """
+    Remove the reaction if present, otherwise add it.
+    Returns True if the reaction exists afterwards.
+    """
+    buffer = get_buffer()
+    if buffer is not None:
+        return buffer.apply(post_id, user_id, kind, 'toggle')[1]
+    with transaction.atomic():
+        removed = delete_reactions(user_id, kind, [post_id])
+        if removed:
+            shift_counters(kind, removed, -1)
+            return False
+        added = insert_reactions(user_id, kind, [post_id])
+        shift_counters(kind, added, 1)
+        return True
+
+def apply_reaction_batch(user_id, operations):
+    """
+    Apply a list of ``{'post_id', 'kind', 'action'}`` operations for one user,
+    where ``action`` is 'add', 'remove' or 'toggle'. Operations are replayed in
+    order against the user's current reactions; only the net change per
+    (post, kind) is written, as one bulk insert and one bulk delete per kind,
+    inside a single transaction.
+    Returns (per-operation results, {str(post_id): counters}).
+    """
+    buffer = get_buffer()
+    if buffer is not None:
+        return _buffer_reaction_batch(buffer, user_id, operations)
+
+    post_ids = {op['post_id'] for op in operations}
+    kinds = {op['kind'] for op in operations}
+    existing_posts = set(Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True))
+    initial = set(
+        Reaction.objects.filter(user_id=user_id, post_id__in=existing_posts, kind__in=kinds)
+        .values_list('post_id', 'kind')
+    )
+
+    state = {}
+    results = []
+    for op in operations:
+        key = (op['post_id'], op['kind'])
+        result = {'post_id': op['post_id'], 'kind': NAME_BY_KIND[op['kind']], 'action': op['action']}
+        if op['post_id'] not in existing_posts:
+            result['status'] = 'not_found'
+            results.append(result)
+            continue
+        before = state.get(key, key in initial)
+        if op['action'] == 'add':
+            after = True
+        elif op['action'] == 'remove':
+            after = False
+        else:
+            after = not before
+        state[key] = after
+        if after == before:
+            result['status'] = 'unchanged'
+        else:
+            result['status'] = 'added' if after else 'removed'
+        result['reacted'] = after
+        results.append(result)
+
+    to_add = {}
+    to_remove = {}
+    for (post_id, kind), reacted in state.items():
+        if reacted != ((post_id, kind) in initial):
+            target = to_add if reacted else to_remove
+            target.setdefault(kind, []).append(post_id)
+
+    with transaction.atomic():
+        for kind, ids in to_remove.items():
+            shift_counters(kind, delete_reactions(user_id, kind, ids), -1)
+        for kind, ids in to_add.items():
+            shift_counters(kind, insert_reactions(user_id, kind, ids), 1)
+        counts = {
+            str(row.pop('pk')): row
+            for row in Post.objects.filter(pk__in=existing_posts).values('pk', *COUNT_FIELDS)
+        }
+
+    return results, counts
+
+def _buffer_reaction_batch(buffer, user_id, operations):
+    existing_posts = set(
+        Post.objects.filter(pk__in={op['post_id'] for op in operations}).values_list('pk', flat=True)
+    )
+    results = []
+    for op in operations:
+        result = {'post_id': op['post_id'], 'kind': NAME_BY_KIND[op['kind']], 'action': op['action']}
+        try:
+            if op['post_id'] not in existing_posts:
+                raise Post.DoesNotExist()
+            before, after = buffer.apply(op['post_id'], user_id, op['kind'], op['action'])
+        except Post.DoesNotExist:
+            result['status'] = 'not_found'
+            results.append(result)
+            continue
+        if after == before:
+            result['status'] = 'unchanged'
+        else:
+            result['status'] = 'added' if after else 'removed'
+        result['reacted'] = after
+        results.append(result)
+
+    counts = {
+        row.pop('pk'): row
+        for row in Post.objects.filter(pk__in=existing_posts).values('pk', *COUNT_FIELDS)
+    }
+    overlay_pending(counts)
+    return results, {str(post_id): row for post_id, row in counts.items()}
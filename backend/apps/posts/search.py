@@ -0,0 +1,221 @@
+"""
+Full-text search over posts.
+
+Every post has one row in ``posts_post_search`` with its title, content and
+tag names, written in the same transaction as the post by the Post signals
+and the tag helpers, and rebuilt by the rebuild_search_index command:
+
+* On SQLite it is an FTS5 table (porter stemming, diacritics folded) ranked
+  with bm25(), weighting title, tags and content 10:5:1. Its rowid is derived
+  from the post's UUID so a post's row is found without a scan.
+* On PostgreSQL it holds a weighted tsvector (title A, tags B, content C)
+  behind a GIN index, ranked with ts_rank().
+
+Other databases have no index and fall back to icontains filters, as does
+input without any word characters.
+
+User input is never passed through as query syntax: it is split into words
+and each word is matched as a prefix, so "fail sta" finds "failed startup"
+while the user is still typing.
+"""
+
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, TextField, Value
+from django.db.models.fields import Field
+from django.utils.html import escape
+
+TABLE = 'posts_post_search'
+MAX_TERMS = 8
+# bm25() takes one weight per column: post_id, title, content, tags
+BM25_WEIGHTS = '0.0, 10.0, 1.0, 5.0'
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+SNIPPET_WORDS = 24
+
+_WORD = re.compile(r'\w+')
+
+def supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+def terms(text):
+    """The words of ``text`` to search for, lowercased and capped at MAX_TERMS."""
+    return _WORD.findall((text or '').lower())[:MAX_TERMS]
+
+def fts_query(words):
+    """An FTS5 query matching every word as a prefix, e.g. '"fail"* "sta"*'."""
+    return ' '.join(f'"{word}"*' for word in words)
+
+def tsquery(words):
+    """A to_tsquery() input matching every word as a prefix, e.g. 'fail:* & sta:*'."""
+    return ' & '.join(f'{word}:*' for word in words)
+
+def _rowid(post_id):
+    # The low 63 bits of a UUID4 are random apart from its two variant bits
+    return uuid.UUID(str(post_id)).int & (2 ** 63 - 1)
+
+def index_rows(rows, using=None):
+    """
+    Write the index rows for ``rows`` of (post_id, title, content, tag_names),
+    replacing any the posts already have.
+    """
+    conn = using or connection
+    rows = [(post_id, title, content, ' '.join(tags)) for post_id, title, content, tags in rows]
+    if not rows:
+        return
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(_rowid(row[0]),) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, post_id, title, content, tags) VALUES (%s, %s, %s, %s, %s)',
+                [(_rowid(post_id), uuid.UUID(str(post_id)).hex, title, content, tags)
+                 for post_id, title, content, tags in rows]
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (post_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('english', %s), 'A') || "
+                f"setweight(to_tsvector('english', %s), 'B') || "
+                f"setweight(to_tsvector('english', %s), 'C')) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [(str(post_id), title, tags, content) for post_id, title, content, tags in rows]
+            )
+
+def index_post(post, tag_names=None):
+    """(Re)index one post; its tag names are read unless given."""
+    if not supported():
+        return
+    if tag_names is None:
+        tag_names = list(post.tags.values_list('name', flat=True))
+    index_rows([(post.pk, post.title, post.content, tag_names)])
+
+def index_all(post_model, chunk_size=1000, using=None):
+    """
+    Index every post of ``post_model`` (a historical model in migrations),
+    ``chunk_size`` posts per round trip. Returns the number indexed.
+    """
+    post_tags = post_model.tags.through
+    indexed = 0
+    last_pk = None
+    while True:
+        posts = post_model.objects.order_by('pk').only('pk', 'title', 'content')
+        if last_pk is not None:
+            posts = posts.filter(pk__gt=last_pk)
+        posts = list(posts[:chunk_size])
+        if not posts:
+            return indexed
+        last_pk = posts[-1].pk
+        tags = {}
+        for post_id, name in post_tags.objects.filter(post__in=posts).values_list('post_id', 'tag__name'):
+            tags.setdefault(post_id, []).append(name)
+        index_rows([(post.pk, post.title, post.content, tags.get(post.pk, [])) for post in posts], using=using)
+        indexed += len(posts)
+
+def remove_post(post_id):
+    # On PostgreSQL the row goes with the post through ON DELETE CASCADE
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(post_id)])
+
+def prune():
+    """Delete index rows whose post no longer exists. Returns the number deleted."""
+    if not supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE post_id NOT IN (SELECT id FROM posts_post)')
+        return cursor.rowcount
+
+class SearchDocumentField(Field):
+    """
+    The searchable document of PostSearchEntry: a tsvector column on
+    PostgreSQL, the FTS5 table itself on SQLite.
+    """
+
+    def db_type(self, connection):
+        return 'tsvector' if connection.vendor == 'postgresql' else None
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        raise NotImplementedError('Full-text search needs SQLite or PostgreSQL')
+
+    def as_sqlite(self, compiler, connection):
+        return f'{compiler.quote_name_unless_alias(self.lhs.alias)} MATCH %s', [fts_query(self.rhs)]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, params = compiler.compile(self.lhs)
+        return f"{lhs} @@ to_tsquery('english', %s)", [*params, tsquery(self.rhs)]
+
+class SearchRank(Func):
+    """Relevance of a matched post, higher is better on both databases."""
+    output_field = FloatField()
+
+    def __init__(self, document, words, **extra):
+        super().__init__(document, **extra)
+        self.words = words
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        alias = compiler.quote_name_unless_alias(self.source_expressions[0].alias)
+        # bm25() scores better matches lower
+        return f'-bm25({alias}, {BM25_WEIGHTS})', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        document, params = compiler.compile(self.source_expressions[0])
+        return f"ts_rank({document}, to_tsquery('english', %s))", [*params, tsquery(self.words)]
+
+class SearchSnippet(Func):
+    """A fragment of the content around the matches, delimited by SNIPPET_START/END."""
+    output_field = TextField()
+
+    def __init__(self, document, content, words, **extra):
+        super().__init__(document, content, **extra)
+        self.words = words
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        alias = compiler.quote_name_unless_alias(self.source_expressions[0].alias)
+        return f"snippet({alias}, 2, %s, %s, '…', {SNIPPET_WORDS})", [SNIPPET_START, SNIPPET_END]
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        content, params = compiler.compile(self.source_expressions[1])
+        options = (
+            f'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, '
+            f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=1'
+        )
+        return (
+            f"ts_headline('english', {content}, to_tsquery('english', %s), %s)",
+            [*params, tsquery(self.words), options]
+        )
+
+def search_posts(queryset, text, snippets=False):
+    """
+    Filter a Post queryset to the posts matching ``text`` and annotate
+    ``search_rank`` (and ``search_snippet`` when asked); order by
+    '-search_rank' for relevance.
+    """
+    words = terms(text)
+    if not words or not supported():
+        # Input without word characters, e.g. an emoji, is looked up as typed
+        words = words or (text or '').split()[:MAX_TERMS]
+        if not words:
+            queryset = queryset.none()
+        matches = Q()
+        for word in words:
+            matches &= Q(title__icontains=word) | Q(content__icontains=word) | Q(tags__name__icontains=word)
+        return queryset.filter(matches).distinct().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    document = F('search_entry__document')
+    queryset = queryset.filter(search_entry__document__match=words).annotate(
+        search_rank=SearchRank(document, words)
+    )
+    if snippets:
+        queryset = queryset.annotate(search_snippet=SearchSnippet(document, F('content'), words))
+    return queryset
+
+def highlight(snippet):
+    """HTML-escape a snippet and wrap its matches in <mark> elements."""
+    return escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
@@ -1,7 +1,16 @@
 from rest_framework import serializers
+from django.core.files.storage import default_storage
 from django.core.validators import MinLengthValidator, MaxLengthValidator
-from django.utils.text import slugify
-from .models import Post, Tag, TrendingTag, EmojiReaction, Comment, PostMedia
+from django.db import models, transaction
+from .models import Post, Tag, TrendingTag, Comment, PostMedia, UploadSession
+from .reaction_buffer import get_buffer
+from .reactions import KIND_BY_NAME
+from .search import highlight
+from .tags import add_post_tags, resolve_tags, set_post_tags
+from .threads import MAX_DEPTH, attach_replies
+from .uploads import get_config as get_upload_config
+from .variants import full_size
+from .viewer_state import empty_state, resolve_viewer_state
 from apps.users.serializers import UserSerializer
 import re
 
@@ -10,20 +19,128 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ['id', 'name', 'slug', 'description']
 
-class EmojiReactionSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = EmojiReaction
-        fields = ['emoji', 'user', 'created_at']
-        read_only_fields = ['user', 'created_at']
-
 class PostMediaSerializer(serializers.ModelSerializer):
+    file = serializers.SerializerMethodField()
+    width = serializers.SerializerMethodField()
+    height = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = PostMedia
-        fields = ['id', 'file', 'uploaded_at']
+        fields = ['id', 'file', 'width', 'height', 'variants', 'uploaded_at']
         read_only_fields = ['id', 'file', 'uploaded_at']
 
+    def _url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_file(self, obj):
+        """The EXIF-stripped full-size copy once rendered, else the upload itself."""
+        full = full_size(obj.blob) if obj.blob else None
+        if full:
+            return self._url(full['name'])
+        return self._url(obj.file.name) if obj.file else None
+
+    def get_width(self, obj):
+        return obj.blob.width if obj.blob else None
+
+    def get_height(self, obj):
+        return obj.blob.height if obj.blob else None
+
+    def get_variants(self, obj):
+        """
+        Downscaled copies keyed by width, e.g. {'320': {'url', 'width', 'height',
+        'formats': {'webp': url}}}. The plain URLs negotiate WebP/AVIF by
+        Accept; 'formats' lists them explicitly for <picture> sources.
+        Empty until rendering finishes, and for videos and legacy media.
+        """
+        if not obj.blob or not obj.blob.variants:
+            return {}
+        return {
+            width: {
+                'url': self._url(variant['name']),
+                'width': variant['width'],
+                'height': variant['height'],
+                'formats': {
+                    format: self._url(alternate['name'])
+                    for format, alternate in variant.get('formats', {}).items()
+                },
+            }
+            for width, variant in obj.blob.variants.items()
+        }
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'size', 'offset', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'status', 'created_at', 'updated_at']
+
+    def validate_content_type(self, value):
+        if value not in PostMedia.ALLOWED_TYPES:
+            raise serializers.ValidationError('Unsupported file type.')
+        return value
+
+    def validate_size(self, value):
+        max_size = get_upload_config()['MAX_SIZE']
+        if value < 1:
+            raise serializers.ValidationError('File is empty.')
+        if value > max_size:
+            raise serializers.ValidationError(f'File too large (max {max_size // (1024 * 1024)}MB).')
+        return value
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    post_id = serializers.UUIDField()
+
+class ReactionOperationSerializer(serializers.Serializer):
+    post_id = serializers.UUIDField()
+    kind = serializers.ChoiceField(choices=list(KIND_BY_NAME))
+    action = serializers.ChoiceField(choices=['add', 'remove', 'toggle'])
+
+    def validate_kind(self, value):
+        return KIND_BY_NAME[value]
+
+class ReactionBatchSerializer(serializers.Serializer):
+    """A batch of queued reaction operations replayed by an offline client."""
+    MAX_OPERATIONS = 300
+
+    operations = serializers.ListField(
+        child=ReactionOperationSerializer(),
+        allow_empty=False,
+        max_length=MAX_OPERATIONS
+    )
+
+class CommentBatchSerializer(serializers.Serializer):
+    """Posts to load the first page of comments for, e.g. every card in a feed page."""
+    MAX_POSTS = 50
+
+    post_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=MAX_POSTS
+    )
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=50)
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Resolves the viewer's reactions for every post on the page in a handful of
+    queries and shares them with the child serializer through its context,
+    together with any buffered counter changes not yet flushed.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        post_ids = [post.pk for post in posts]
+        request = self.context.get('request')
+        if request is not None:
+            self.context['viewer_state'] = resolve_viewer_state(request.user, post_ids)
+        buffer = get_buffer()
+        if buffer is not None:
+            self.context['pending_counts'] = buffer.pending_deltas(post_ids)
+        return super().to_representation(posts)
+
 class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = UserSerializer(read_only=True, avatar_size=96)
     tags = TagSerializer(many=True, read_only=True)
     tag_names = serializers.ListField(
         child=serializers.CharField(),
@@ -49,11 +166,12 @@ class PostSerializer(serializers.ModelSerializer):
             'like_count', 'hug_count', 'relate_count',
             'laugh_count', 'fire_count', 'check_count',
             'is_liked', 'is_hugged', 'is_related',
-            'user_emoji_reactions',
+            'user_emoji_reactions', 'comment_count',
             'created_at', 'updated_at',
             'media',
         ]
-        read_only_fields = ['author', 'created_at', 'updated_at', 'media']
+        read_only_fields = ['author', 'comment_count', 'created_at', 'updated_at', 'media']
+        list_serializer_class = PostListSerializer
 
     def validate_title(self, value):
         """Validate post title"""
@@ -96,75 +214,69 @@ class PostSerializer(serializers.ModelSerializer):
         
         return validated_tags
 
-    def get_is_liked(self, obj):
+    def _viewer_state(self, obj):
+        """
+        Return the requesting user's reactions on ``obj``. List rendering
+        resolves these for the whole page up front (see PostListSerializer);
+        single posts are resolved on first access.
+        """
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
+        if not request or not request.user.is_authenticated:
+            return empty_state()
+        state = self.context.get('viewer_state')
+        if state is None or obj.pk not in state:
+            state = self.context.setdefault('viewer_state', {})
+            state.update(resolve_viewer_state(request.user, [obj.pk]))
+        return state[obj.pk]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        buffer = get_buffer()
+        if buffer is not None:
+            pending = self.context.get('pending_counts')
+            if pending is None or instance.pk not in pending:
+                pending = buffer.pending_deltas([instance.pk])
+            for field, delta in pending.get(instance.pk, {}).items():
+                if field in data:
+                    data[field] += delta
+        # Set by search_posts() when the feed asks for snippets
+        snippet = getattr(instance, 'search_snippet', None)
+        if snippet is not None:
+            data['search_snippet'] = highlight(snippet)
+        return data
+
+    def get_is_liked(self, obj):
+        return self._viewer_state(obj)['is_liked']
 
     def get_is_hugged(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.hugs.filter(id=request.user.id).exists()
-        return False
+        return self._viewer_state(obj)['is_hugged']
 
     def get_is_related(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.relates.filter(id=request.user.id).exists()
-        return False
+        return self._viewer_state(obj)['is_related']
 
     def get_user_emoji_reactions(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return list(obj.emoji_reactions.filter(user=request.user).values_list('emoji', flat=True))
-        return []
+        return self._viewer_state(obj)['emojis']
 
     def create(self, validated_data):
         tag_names = validated_data.pop('tag_names', [])
-        post = Post.objects.create(**validated_data)
-        
-        # Create or get tags
-        for tag_name in tag_names:
-            tag, created = Tag.objects.get_or_create(
-                name=tag_name,
-                defaults={'slug': slugify(tag_name)}
-            )
-            post.tags.add(tag)
-            
-            # Update trending tag stats
-            trending_tag, created = TrendingTag.objects.get_or_create(tag=tag)
-            trending_tag.post_count += 1
-            trending_tag.save()
-        
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+            add_post_tags(post, [tag.pk for tag in resolve_tags(tag_names)])
         return post
 
     def update(self, instance, validated_data):
         """Update post and handle tag changes."""
         tag_names = validated_data.pop('tag_names', None)
         
-        # Update basic fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Handle tag updates if provided
-        if tag_names is not None:
-            # Clear existing tags
-            instance.tags.clear()
-            
-            # Add new tags
-            for tag_name in tag_names:
-                tag, created = Tag.objects.get_or_create(
-                    name=tag_name,
-                    defaults={'slug': slugify(tag_name)}
-                )
-                instance.tags.add(tag)
-                
-                # Update trending tag stats
-                trending_tag, created = TrendingTag.objects.get_or_create(tag=tag)
-                trending_tag.post_count += 1
-                trending_tag.save()
+        with transaction.atomic():
+            # Update basic fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Only the tags that were added or removed are written
+            if tag_names is not None:
+                set_post_tags(instance, tag_names)
         
         return instance
 
@@ -176,15 +288,15 @@ class TrendingTagSerializer(serializers.ModelSerializer):
         fields = ['tag', 'post_count', 'last_updated']
 
 class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+    user = UserSerializer(read_only=True, avatar_size=48)
     replies = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
         fields = [
-            'id', 'user', 'content', 'parent', 'created_at', 'updated_at', 'replies'
+            'id', 'user', 'content', 'parent', 'reply_count', 'created_at', 'updated_at', 'replies'
         ]
-        read_only_fields = ['user', 'created_at', 'updated_at', 'replies']
+        read_only_fields = ['user', 'reply_count', 'created_at', 'updated_at', 'replies']
 
     def validate_content(self, value):
         """Validate comment content"""
@@ -195,14 +307,23 @@ class CommentSerializer(serializers.ModelSerializer):
         return value.strip()
 
     def get_replies(self, obj):
-        # Only return replies if any exist
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True, context=self.context).data
-        return []
+        replies = getattr(obj, 'thread_replies', None)
+        if replies is None:
+            # Not assembled by the view (e.g. a single comment): load its subtree in one query
+            attach_replies([obj], Comment.objects.select_related('user'))
+            replies = obj.thread_replies
+        return CommentSerializer(replies, many=True, context=self.context).data
 
     def validate(self, data):
         parent = data.get('parent')
         post = self.context.get('post')
         if parent and parent.post != post:
             raise serializers.ValidationError('Parent comment must belong to the same post.')
-        return data 
\ No newline at end of file
+        if parent and parent.depth >= MAX_DEPTH:
+            raise serializers.ValidationError(f'Replies cannot be nested more than {MAX_DEPTH} levels deep.')
+        return data
+
+    def create(self, validated_data):
+        comment = super().create(validated_data)
+        comment.thread_replies = []
+        return comment 
\ No newline at end of file
@@ -0,0 +1,47 @@
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from . import search
+from .models import Post, PostMedia, PostTag
+from .storage import release_blobs
+
+@receiver(post_delete, sender=PostMedia)
+def release_media_blob(sender, instance, **kwargs):
+    """Drop the blob reference of deleted media, including cascades from Post."""
+    if instance.blob_id:
+        release_blobs([instance.blob_id])
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the search index row in step with the title and content."""
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    # A new post has no tags yet; the tag helpers reindex it once they are added
+    search.index_post(instance, tag_names=[] if created else None)
+
+@receiver(m2m_changed, sender=PostTag)
+def date_added_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Give tags added through post.tags or tag.posts their post's created_at."""
+    if action != 'post_add' or not pk_set:
+        return
+    if not reverse:
+        PostTag.objects.filter(post=instance, tag_id__in=pk_set).update(created_at=instance.created_at)
+    else:
+        PostTag.objects.filter(tag=instance, post_id__in=pk_set).update(
+            created_at=Subquery(Post.objects.filter(pk=OuterRef('post_id')).values('created_at')[:1])
+        )
+
+@receiver(m2m_changed, sender=PostTag)
+def index_retagged_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex posts whose tags changed through post.tags or tag.posts."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_post(instance)
+    elif pk_set:
+        for post in Post.objects.filter(pk__in=pk_set):
+            search.index_post(post)
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
@@ -0,0 +1,159 @@
+"""
+Content-addressed storage for post media.
+
+Uploads are written to a temporary file in chunks while being hashed, so the
+bytes are read exactly once. The file is then stored as
+``post_media/<h[:2]>/<h[2:4]>/<sha256><ext>``, the extension following the
+content type rather than the client's filename; if a blob with the same hash
+already exists the temporary file is dropped and only its reference count
+grows, so re-uploading identical bytes costs a metadata insert. Blobs whose
+count reaches zero are removed by the ``gc_media_blobs`` command; both sides
+lock the blob row, and GC re-checks the count under that lock, so a blob is
+never deleted while an upload is taking a reference to it.
+
+Images are stripped of EXIF/XMP metadata (GPS positions included) before
+they are hashed and stored, see imaging.strip_metadata.
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from . import imaging
+from .models import MediaBlob, PostMedia
+
+BLOB_PREFIX = 'post_media'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class HashedTempFile(File):
+    """A temporary file; storages that support it move it into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+def blob_name(digest, extension):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+def _extension(content_type):
+    # Only from an allowed media type: the client's filename could say .html
+    if content_type not in PostMedia.ALLOWED_TYPES:
+        return ''
+    return mimetypes.guess_extension(content_type) or ''
+
+def hash_to_tempfile(uploaded_file):
+    """Copy ``uploaded_file`` to a temporary file, returning (tempfile, sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    temp = tempfile.NamedTemporaryFile(
+        suffix='.upload', dir=getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None), delete=False
+    )
+    try:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            temp.write(chunk)
+            size += len(chunk)
+        temp.flush()
+    except BaseException:
+        temp.close()
+        os.unlink(temp.name)
+        raise
+    return temp, digest.hexdigest(), size
+
+def hash_file(path):
+    """Return (sha256, size) of the local file at ``path``, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def _create_blob(file, digest, size, name, content_type):
+    content_type = content_type or mimetypes.guess_type(name)[0] or ''
+    stored_name = blob_name(digest, _extension(content_type))
+    written = False
+    if not default_storage.exists(stored_name):
+        file.seek(0)
+        stored_name = default_storage.save(stored_name, HashedTempFile(file, name=stored_name))
+        written = True
+    blob, _ = MediaBlob.objects.get_or_create(
+        sha256=digest,
+        defaults={
+            'file': stored_name,
+            'size': size,
+            'content_type': content_type,
+            'variants_status': (
+                MediaBlob.VARIANTS_PENDING if content_type.startswith('image/')
+                else MediaBlob.VARIANTS_SKIPPED
+            ),
+        }
+    )
+    if written and stored_name != blob.file.name:
+        # A concurrent upload of the same bytes created the blob first and
+        # our copy got a suffixed name no MediaBlob points to
+        default_storage.delete(stored_name)
+    return blob
+
+def _store_hashed(file, digest, size, name, content_type):
+    while True:
+        with transaction.atomic():
+            # The row lock keeps gc_media_blobs from deleting a zero-reference
+            # blob between the lookup and the increment
+            blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is None:
+                blob = _create_blob(file, digest, size, name, content_type)
+            if MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1):
+                blob.ref_count += 1
+                return blob
+        # Without row locks (SQLite) GC can still delete the blob first;
+        # store the bytes again as a new blob
+
+def _strip_image(path, name, content_type, digest, size):
+    """Strip metadata from an image at ``path``; returns its (sha256, size) afterwards."""
+    content_type = content_type or mimetypes.guess_type(name)[0] or ''
+    if content_type.startswith('image/') and imaging.strip_metadata(path):
+        return hash_file(path)
+    return digest, size
+
+def store_upload(uploaded_file):
+    """Store an upload and return its MediaBlob with the reference count incremented."""
+    temp, digest, size = hash_to_tempfile(uploaded_file)
+    content_type = getattr(uploaded_file, 'content_type', None)
+    try:
+        digest, size = _strip_image(temp.name, uploaded_file.name, content_type, digest, size)
+        return _store_hashed(temp, digest, size, uploaded_file.name, content_type)
+    finally:
+        temp.close()
+        if os.path.exists(temp.name):
+            os.unlink(temp.name)
+
+def store_path(path, name, content_type=None):
+    """
+    Store the complete local file at ``path`` (e.g. a finished resumable
+    upload) like store_upload. The file is moved into place when the storage
+    allows it, so ``path`` may be gone afterwards; otherwise the caller
+    removes it.
+    """
+    digest, size = _strip_image(path, name, content_type, *hash_file(path))
+    with open(path, 'rb') as file:
+        return _store_hashed(file, digest, size, name, content_type)
+
+def release_blobs(blob_ids):
+    """Drop one reference per entry of ``blob_ids``; zero-reference blobs are left for GC."""
+    by_amount = {}
+    for blob_id, amount in Counter(blob_id for blob_id in blob_ids if blob_id).items():
+        by_amount.setdefault(amount, []).append(blob_id)
+    with transaction.atomic():
+        for amount, ids in by_amount.items():
+            MediaBlob.objects.filter(pk__in=ids).update(
+                ref_count=Greatest(F('ref_count') - amount, 0)
+            )
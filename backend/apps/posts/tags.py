@@ -0,0 +1,104 @@
+"""
+Set-based tag resolution for post writes.
+
+A post carries up to 10 tags. Instead of a get_or_create and an add per
+tag, each step below is one statement for the whole set of tags, and the
+trending buckets are shifted with F() expressions so concurrent posts cannot
+lose increments. TrendingTag is no longer written here: it is an all-time
+snapshot for the admin, refreshed by the rebuild_trending_tags command.
+
+Users can also follow tags; their tag feed is the merge of one time-ordered
+range per followed tag, see followed_tag_sources.
+"""
+
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.text import slugify
+from . import search, trending
+from .models import Post, PostTag, Tag, TagFollow
+
+def resolve_tags(names):
+    """Return the Tag objects for ``names``, creating any that are missing."""
+    if not names:
+        return []
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slugify(name)) for name in missing],
+            ignore_conflicts=True
+        )
+        tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=missing)})
+        for name in missing:
+            if name not in tags:
+                # The slug is taken by a differently spelled tag,
+                # e.g. 'foo bar' and 'foo-bar'
+                tags[name], _ = Tag.objects.get_or_create(
+                    name=name,
+                    defaults={'slug': f'{slugify(name)[:43]}-{uuid.uuid4().hex[:6]}'}
+                )
+    return [tags[name] for name in names]
+
+def add_post_tags(post, tag_ids):
+    """Attach tags to a post and count them as trending."""
+    if not tag_ids:
+        return
+    PostTag.objects.bulk_create(
+        [PostTag(post_id=post.pk, tag_id=tag_id, created_at=post.created_at) for tag_id in tag_ids],
+        ignore_conflicts=True
+    )
+    trending.record_activity(tag_ids, posts=1, at=post.created_at)
+    # bulk_create sends no m2m_changed, so the search row is refreshed here
+    search.index_post(post)
+
+def remove_post_tags(post, tag_ids):
+    """Detach tags from a post and stop counting them as trending."""
+    if not tag_ids:
+        return
+    PostTag.objects.filter(post_id=post.pk, tag_id__in=tag_ids).delete()
+    trending.record_activity(tag_ids, posts=-1, at=post.created_at)
+    search.index_post(post)
+
+def clear_post_tags(post):
+    """Detach every tag from a post, e.g. right before it is deleted."""
+    remove_post_tags(post, list(PostTag.objects.filter(post_id=post.pk).values_list('tag_id', flat=True)))
+
+def set_post_tags(post, names):
+    """Replace the tags of a post, touching only the tags that changed."""
+    new_ids = {tag.pk for tag in resolve_tags(names)}
+    current_ids = set(PostTag.objects.filter(post_id=post.pk).values_list('tag_id', flat=True))
+
+    remove_post_tags(post, current_ids - new_ids)
+    add_post_tags(post, new_ids - current_ids)
+
+def follow_tag(user, tag):
+    """Make ``user`` follow ``tag``. Returns True if they did not already."""
+    try:
+        with transaction.atomic():
+            TagFollow.objects.create(user=user, tag=tag)
+    except IntegrityError:
+        return False
+    return True
+
+def unfollow_tag(user, tag):
+    """Stop ``user`` following ``tag``. Returns True if they did."""
+    deleted, _ = TagFollow.objects.filter(user=user, tag=tag).delete()
+    return bool(deleted)
+
+def followed_tag_sources(user):
+    """
+    One Post queryset per tag ``user`` follows, each annotated with
+    ``feed_at`` and read by the paginator as an index range on
+    (tag, created_at) of PostTag. Their merge is the user's tag feed; a post
+    with several followed tags has the same ``feed_at`` in each and is
+    served once.
+    """
+    tag_ids = list(TagFollow.objects.filter(user=user).values_list('tag_id', flat=True))
+    if not tag_ids:
+        return [Post.objects.none().annotate(feed_at=F('created_at'))]
+    return [
+        Post.objects.filter(post_tags__tag_id=tag_id).annotate(feed_at=F('post_tags__created_at'))
+        for tag_id in tag_ids
+    ]
@@ -1,10 +1,27 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Post, Tag
+from .models import Comment, MediaBlob, Post, PostMedia, Tag, TrendingTag, TagActivityBucket, Reaction, UploadSession
+from . import ranking, reactions, reaction_buffer, storage, trending, uploads
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from unittest import mock
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
 import uuid
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from PIL import Image
 
 User = get_user_model()
 
@@ -73,6 +90,34 @@ class PostAPITest(APITestCase):
         self.assertEqual(self.post.title, 'Updated Post')
         self.assertEqual(self.post.content, 'Updated Content')
 
+    def test_create_post_resolves_tags_in_bulk(self):
+        Tag.objects.create(name='existing', slug='existing')
+
+        def create(title, tag_names):
+            data = {'title': title, 'content': 'Tagged Content', 'tag_names': tag_names}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/posts/', data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return response, len(queries)
+
+        _, single_tag_queries = create('One Tag', ['solo'])
+        response, ten_tag_queries = create('Ten Tags', [f'tag{i}' for i in range(9)] + ['existing'])
+        self.assertEqual(ten_tag_queries, single_tag_queries)
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(post.tags.count(), 10)
+        self.assertEqual(TagActivityBucket.objects.filter(posts=1).count(), 11)
+        self.assertFalse(TrendingTag.objects.exists())
+
+    def test_update_post_only_touches_changed_tags(self):
+        self.client.patch(f'/api/posts/{self.post.id}/', {'tag_names': ['keep', 'drop']}, format='json')
+        response = self.client.patch(
+            f'/api/posts/{self.post.id}/', {'tag_names': ['keep', 'new']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(tag['name'] for tag in response.data['tags']), ['keep', 'new'])
+        counts = dict(TagActivityBucket.objects.values_list('tag__name', 'posts'))
+        self.assertEqual(counts, {'keep': 1, 'drop': 0, 'new': 1})
+
     def test_update_other_user_post(self):
         other_post = Post.objects.create(
             author=self.other_user,
@@ -105,7 +150,54 @@ class PostAPITest(APITestCase):
         response = self.client.post(f'/api/posts/{self.post.id}/like/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'liked')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_unlike_post_decrements_counter(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        response = self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(response.data['status'], 'unliked')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_emoji_react_updates_counter(self):
+        response = self.client.post(f'/api/posts/{self.post.id}/emoji_react/', {'emoji': '🔥'})
+        self.assertEqual(response.data['status'], 'added')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.fire_count, 1)
+
+        response = self.client.post(f'/api/posts/{self.post.id}/emoji_react/', {'emoji': '🔥'})
+        self.assertEqual(response.data['status'], 'removed')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.fire_count, 0)
+
+    def test_reconcile_reaction_counts_repairs_drift(self):
+        Reaction.objects.create(post=self.post, user=self.other_user, kind=Reaction.LIKE)
+        Reaction.objects.create(post=self.post, user=self.user, kind=Reaction.HUG)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, relate_count=3)
+
+        call_command('reconcile_reaction_counts', chunk_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
         self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.hug_count, 1)
+        self.assertEqual(self.post.relate_count, 0)
+        self.assertEqual(self.post.engagement_score, 2)
+
+    def test_engagement_score_follows_reactions_and_comments(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.client.post(f'/api/posts/{self.post.id}/emoji_react/', {'emoji': '🔥'})
+        response = self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Same here'})
+        self.client.post(
+            f'/api/posts/{self.post.id}/comments/', {'content': 'Me too', 'parent': response.data['id']}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.engagement_score, 2 + 2 * 2)
+
+        self.client.delete(f'/api/posts/{self.post.id}/comments/{response.data["id"]}/')
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.engagement_score, 1)
 
     def test_create_post_with_media(self):
         image = SimpleUploadedFile("test.jpg", b"file_content", content_type="image/jpeg")
@@ -118,5 +210,944 @@ class PostAPITest(APITestCase):
         response = self.client.post('/api/posts/', data, format='multipart')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Post.objects.count(), 2)
-        post = Post.objects.last()
-        self.assertTrue(post.media.exists()) 
\ No newline at end of file
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertTrue(post.media.exists())
+
+class ViewerStateTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='viewer',
+            email='viewer@example.com',
+            password='testpass123'
+        )
+        self.author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _create_posts(self, count):
+        return [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='Some content here')
+            for i in range(count)
+        ]
+
+    def test_list_reports_viewer_reactions(self):
+        liked, hugged, untouched = self._create_posts(3)
+        Reaction.objects.create(post=liked, user=self.user, kind=Reaction.LIKE)
+        Reaction.objects.create(post=liked, user=self.author, kind=Reaction.LIKE)
+        Reaction.objects.create(post=hugged, user=self.user, kind=Reaction.HUG)
+        Reaction.objects.create(post=hugged, user=self.user, kind=Reaction.FIRE)
+
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {item['id']: item for item in response.data['results']}
+
+        self.assertTrue(results[str(liked.id)]['is_liked'])
+        self.assertFalse(results[str(liked.id)]['is_hugged'])
+        self.assertTrue(results[str(hugged.id)]['is_hugged'])
+        self.assertEqual(results[str(hugged.id)]['user_emoji_reactions'], ['🔥'])
+        self.assertFalse(results[str(untouched.id)]['is_liked'])
+        self.assertEqual(results[str(untouched.id)]['user_emoji_reactions'], [])
+
+    def test_list_query_count_does_not_grow_with_page(self):
+        self._create_posts(2)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get('/api/posts/')
+
+        for post in self._create_posts(6):
+            Reaction.objects.create(post=post, user=self.user, kind=Reaction.LIKE)
+            Reaction.objects.create(post=post, user=self.author, kind=Reaction.LIKE)
+        with CaptureQueriesContext(connection) as large_page:
+            self.client.get('/api/posts/')
+
+        self.assertEqual(len(small_page), len(large_page))
+
+    def test_detail_reports_viewer_reactions(self):
+        post, = self._create_posts(1)
+        Reaction.objects.create(post=post, user=self.user, kind=Reaction.RELATE)
+        response = self.client.get(f'/api/posts/{post.id}/')
+        self.assertTrue(response.data['is_related'])
+        self.assertFalse(response.data['is_liked'])
+
+class ReactionEndpointTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reactor',
+            email='reactor@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, title='Test Post', content='Test Content')
+        self.url = f'/api/posts/{self.post.id}/reactions/'
+
+    def test_put_is_idempotent(self):
+        response = self.client.put(self.url + 'like/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['changed'])
+        self.assertEqual(response.data['counts']['like_count'], 1)
+
+        response = self.client.put(self.url + 'like/')
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(response.data['counts']['like_count'], 1)
+        self.assertEqual(Reaction.objects.filter(post=self.post).count(), 1)
+
+    def test_delete_is_idempotent(self):
+        self.client.put(self.url + 'fire/')
+        response = self.client.delete(self.url + 'fire/')
+        self.assertTrue(response.data['changed'])
+        self.assertEqual(response.data['counts']['fire_count'], 0)
+
+        response = self.client.delete(self.url + 'fire/')
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(response.data['counts']['fire_count'], 0)
+
+    def test_removing_from_a_drifted_counter(self):
+        self.client.put(self.url + 'fire/')
+        # e.g. a counter reconciled down to 0 while the reaction row remained
+        Post.objects.filter(pk=self.post.pk).update(fire_count=0)
+
+        response = self.client.delete(self.url + 'fire/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['changed'])
+        self.assertEqual(response.data['counts']['fire_count'], 0)
+
+    def test_invalid_kind(self):
+        response = self.client.put(self.url + 'wave/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_post(self):
+        response = self.client.put(f'/api/posts/{uuid.uuid4()}/reactions/like/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Reaction.objects.exists())
+
+class ReactionBatchTest(APITestCase):
+    url = '/api/posts/reactions/batch/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='offline',
+            email='offline@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, title='First Post', content='Test Content')
+        self.other_post = Post.objects.create(author=self.user, title='Second Post', content='Test Content')
+        Reaction.objects.create(post=self.other_post, user=self.user, kind=Reaction.HUG)
+        Post.objects.filter(pk=self.other_post.pk).update(hug_count=1)
+
+    def test_batch_applies_net_changes(self):
+        operations = [
+            {'post_id': str(self.post.id), 'kind': 'like', 'action': 'toggle'},
+            {'post_id': str(self.post.id), 'kind': 'like', 'action': 'toggle'},
+            {'post_id': str(self.post.id), 'kind': 'like', 'action': 'add'},
+            {'post_id': str(self.post.id), 'kind': 'fire', 'action': 'add'},
+            {'post_id': str(self.other_post.id), 'kind': 'hug', 'action': 'remove'},
+            {'post_id': str(self.other_post.id), 'kind': 'hug', 'action': 'remove'},
+            {'post_id': str(uuid.uuid4()), 'kind': 'like', 'action': 'add'},
+        ]
+        response = self.client.post(self.url, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(
+            statuses,
+            ['added', 'removed', 'added', 'added', 'removed', 'unchanged', 'not_found']
+        )
+        counts = response.data['counts']
+        self.assertEqual(counts[str(self.post.id)]['like_count'], 1)
+        self.assertEqual(counts[str(self.post.id)]['fire_count'], 1)
+        self.assertEqual(counts[str(self.other_post.id)]['hug_count'], 0)
+        self.assertEqual(
+            set(Reaction.objects.filter(user=self.user).values_list('post_id', 'kind')),
+            {(self.post.id, Reaction.LIKE), (self.post.id, Reaction.FIRE)}
+        )
+
+    def test_batch_rejects_oversized_payload(self):
+        operations = [
+            {'post_id': str(self.post.id), 'kind': 'like', 'action': 'toggle'}
+        ] * 301
+        response = self.client.post(self.url, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_rejects_unknown_kind(self):
+        operations = [{'post_id': str(self.post.id), 'kind': 'wave', 'action': 'add'}]
+        response = self.client.post(self.url, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ReactionBufferTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='buffered',
+            email='buffered@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, title='Test Post', content='Test Content')
+        # A long interval keeps the flusher thread idle; tests flush explicitly
+        self.buffer = reaction_buffer.ReactionBuffer(flush_interval=3600)
+        for module in ('reactions', 'serializers', 'viewer_state'):
+            patcher = mock.patch(f'apps.posts.{module}.get_buffer', return_value=self.buffer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.buffer.stop)
+
+    def test_intents_are_coalesced(self):
+        for _ in range(3):
+            reactions.toggle_reaction(self.post.id, self.user.id, Reaction.LIKE)
+        self.assertFalse(Reaction.objects.exists())
+        self.assertEqual(len(self.buffer), 1)
+        self.assertEqual(reactions.get_counts(self.post.id)['like_count'], 1)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(len(self.buffer), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.engagement_score, 1)
+        self.assertTrue(Reaction.objects.filter(post=self.post, user=self.user, kind=Reaction.LIKE).exists())
+
+    def test_cancelled_intents_write_nothing(self):
+        reactions.add_reaction(self.post.id, self.user.id, Reaction.FIRE)
+        reactions.remove_reaction(self.post.id, self.user.id, Reaction.FIRE)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.fire_count, 0)
+
+    def test_pending_state_is_visible_to_reads(self):
+        url = f'/api/posts/{self.post.id}/reactions/like/'
+        response = self.client.put(url)
+        self.assertTrue(response.data['changed'])
+        self.assertEqual(response.data['counts']['like_count'], 1)
+        self.client.put(f'/api/posts/{self.post.id}/reactions/fire/')
+
+        response = self.client.get(f'/api/posts/{self.post.id}/')
+        self.assertTrue(response.data['is_liked'])
+        self.assertEqual(response.data['like_count'], 1)
+        self.assertEqual(response.data['user_emoji_reactions'], ['🔥'])
+
+        self.buffer.flush()
+        response = self.client.get('/api/posts/')
+        post_data = response.data['results'][0]
+        self.assertTrue(post_data['is_liked'])
+        self.assertEqual(post_data['like_count'], 1)
+        self.assertEqual(post_data['fire_count'], 1)
+
+    def test_failed_flush_is_retried(self):
+        reactions.add_reaction(self.post.id, self.user.id, Reaction.LIKE)
+        with mock.patch.object(reactions, 'insert_reaction_rows', side_effect=Exception('database is locked')):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(self.buffer), 1)
+        self.assertEqual(reactions.get_counts(self.post.id)['like_count'], 1)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(reactions.get_counts(self.post.id)['like_count'], 1)
+        self.assertTrue(Reaction.objects.filter(post=self.post, user=self.user, kind=Reaction.LIKE).exists())
+
+    def test_newer_intent_survives_a_failed_flush(self):
+        reactions.add_reaction(self.post.id, self.user.id, Reaction.LIKE)
+        def fail_after_new_intent(batch):
+            # The user removes the like while the add is being written
+            reactions.remove_reaction(self.post.id, self.user.id, Reaction.LIKE)
+            reactions.add_reaction(self.post.id, self.user.id, Reaction.HUG)
+            raise Exception('database is locked')
+
+        with mock.patch.object(self.buffer, '_write', side_effect=fail_after_new_intent):
+            self.buffer.flush()
+        self.assertEqual(reactions.get_counts(self.post.id)['like_count'], 0)
+
+        self.buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.hug_count), (0, 1))
+        self.assertEqual(list(Reaction.objects.values_list('kind', flat=True)), [Reaction.HUG])
+
+    def test_missing_post_is_rejected(self):
+        response = self.client.put(f'/api/posts/{uuid.uuid4()}/reactions/like/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.buffer), 0)
+
+class TrendingTagsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='trender',
+            email='trender@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_post(self, tag_names):
+        data = {'title': 'Trending Post', 'content': 'Trending Content', 'tag_names': tag_names}
+        response = self.client.post('/api/posts/', data, format='json')
+        return Post.objects.get(pk=response.data['id'])
+
+    def test_posts_and_reactions_fill_buckets(self):
+        post = self.create_post(['python', 'django'])
+        self.create_post(['python'])
+        reactions.add_reaction(post.id, self.user.id, Reaction.LIKE)
+
+        response = self.client.get('/api/posts/trending-tags/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(entry['tag']['name'], entry['post_count'], entry['reaction_count']) for entry in response.data],
+            [('python', 2, 1), ('django', 1, 1)]
+        )
+
+    def test_deleting_and_editing_posts_decrements(self):
+        post = self.create_post(['python', 'django'])
+        self.client.patch(f'/api/posts/{post.id}/', {'tag_names': ['django']}, format='json')
+        self.assertEqual([entry['tag'].name for entry in trending.trending_tags('1h')], ['django'])
+
+        self.client.delete(f'/api/posts/{post.id}/')
+        self.assertEqual(trending.trending_tags('1h'), [])
+
+    def test_unlike_takes_reaction_back(self):
+        post = self.create_post(['python'])
+        reactions.add_reaction(post.id, self.user.id, Reaction.LIKE)
+        reactions.remove_reaction(post.id, self.user.id, Reaction.LIKE)
+        self.assertEqual(TagActivityBucket.objects.get(tag__name='python').reactions, 0)
+
+        reactions.add_reaction(post.id, self.user.id, Reaction.LIKE)
+        self.assertEqual(TagActivityBucket.objects.get(tag__name='python').reactions, 1)
+
+    def test_unlike_in_later_hour_hits_original_bucket(self):
+        post = self.create_post(['python'])
+        reactions.add_reaction(post.id, self.user.id, Reaction.LIKE)
+        earlier = timezone.now() - timedelta(hours=3)
+        Reaction.objects.update(created_at=earlier)
+        TagActivityBucket.objects.update(hour=trending.bucket_hour(earlier))
+
+        reactions.remove_reaction(post.id, self.user.id, Reaction.LIKE)
+        bucket = TagActivityBucket.objects.get(tag__name='python')
+        self.assertEqual((bucket.posts, bucket.reactions), (1, 0))
+
+    def test_older_activity_decays(self):
+        old, recent = Tag.objects.create(name='old', slug='old'), Tag.objects.create(name='recent', slug='recent')
+        now = timezone.now()
+        trending.record_activity([old.id], posts=3, at=now - timedelta(hours=20))
+        trending.record_activity([recent.id], posts=2, at=now)
+        trending.record_activity([old.id], posts=50, at=now - timedelta(days=3))
+
+        self.assertEqual([entry['tag'].name for entry in trending.trending_tags('24h')], ['recent', 'old'])
+        self.assertEqual([entry['tag'].name for entry in trending.trending_tags('7d')], ['old', 'recent'])
+        self.assertEqual(TagActivityBucket.objects.count(), 3)
+
+    def test_invalid_window(self):
+        response = self.client.get('/api/posts/trending-tags/?window=1y')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_trending_tags(self):
+        post = self.create_post(['python', 'django'])
+        TrendingTag.objects.create(tag=Tag.objects.get(name='python'), post_count=42)
+
+        out = StringIO()
+        call_command('rebuild_trending_tags', '--dry-run', stdout=out)
+        self.assertIn('python: 42 -> 1', out.getvalue())
+        self.assertIn('django: (missing) -> 1', out.getvalue())
+        self.assertEqual(TrendingTag.objects.get(tag__name='python').post_count, 42)
+
+        call_command('rebuild_trending_tags', '--since', post.created_at.date().isoformat(), stdout=StringIO())
+        self.assertEqual(
+            dict(TrendingTag.objects.values_list('tag__name', 'post_count')),
+            {'python': 1, 'django': 1}
+        )
+
+    def test_rebuild_activity_buckets(self):
+        post = self.create_post(['python', 'django'])
+        reactions.add_reaction(post.id, self.user.id, Reaction.LIKE)
+        stray = Tag.objects.create(name='stray', slug='stray')
+        trending.record_activity([stray.id], posts=3, at=timezone.now() - timedelta(hours=5))
+        TagActivityBucket.objects.filter(tag__name='python').update(posts=7)
+        TagActivityBucket.objects.filter(tag__name='django').delete()
+
+        out = StringIO()
+        call_command('rebuild_trending_tags', '--dry-run', stdout=out)
+        self.assertIn('posts 7 -> 1, reactions 1 -> 1', out.getvalue())
+        self.assertIn('(missing) -> posts 1, reactions 1', out.getvalue())
+        self.assertEqual(TagActivityBucket.objects.get(tag__name='python').posts, 7)
+
+        call_command('rebuild_trending_tags', '--since', post.created_at.isoformat(), stdout=StringIO())
+        self.assertEqual(TagActivityBucket.objects.get(tag__name='stray').posts, 3)
+
+        call_command('rebuild_trending_tags', stdout=StringIO())
+        self.assertEqual(
+            sorted(TagActivityBucket.objects.values_list('tag__name', 'posts', 'reactions')),
+            [('django', 1, 1), ('python', 1, 1), ('stray', 0, 0)]
+        )
+
+    def test_feed_stats_uses_buckets(self):
+        self.create_post(['python'])
+        response = self.client.get('/api/feed/stats/')
+        self.assertEqual(response.data['trending_tags'], [{'name': 'python', 'post_count': 1}])
+
+class MediaStorageTest(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+
+        self.user = User.objects.create_user(
+            username='uploader',
+            email='uploader@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_post(self, content=b'same meme bytes', name='meme.png', content_type='image/png'):
+        data = {
+            'title': 'Meme Post',
+            'content': 'A post with a meme.',
+            'media': [SimpleUploadedFile(name, content, content_type=content_type)],
+        }
+        response = self.client.post('/api/posts/', data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Post.objects.get(pk=response.data['id'])
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.create_post()
+        second = self.create_post(name='copy.PNG')
+        self.create_post(content=b'different bytes')
+
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        blob = first.media.get().blob
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(second.media.get().file.name, blob.file.name)
+        self.assertTrue(blob.file.name.startswith(f'post_media/{blob.sha256[:2]}/{blob.sha256[2:4]}/'))
+        self.assertTrue(blob.file.name.endswith('.png'))
+        stored = [name for _, _, names in os.walk(self.media_root) for name in names]
+        self.assertEqual(len(stored), 2)
+
+    def test_losing_a_concurrent_first_upload_leaves_no_orphan(self):
+        blob = self.create_post().media.get().blob
+        path = os.path.join(self.media_root, 'meme.png')
+        with open(path, 'wb') as file:
+            file.write(b'same meme bytes')
+
+        # As if another upload created the blob and its file between our lookup and our save
+        exists = storage.default_storage.exists
+        checks = [False]
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None), \
+                mock.patch.object(storage.default_storage, 'exists', lambda name: checks.pop() if checks else exists(name)):
+            self.assertEqual(storage.store_path(path, 'meme.png', 'image/png').pk, blob.pk)
+
+        stored = [name for _, _, names in os.walk(self.media_root) for name in names if name != 'meme.png']
+        self.assertEqual(stored, [os.path.basename(blob.file.name)])
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+
+    def test_extension_follows_the_content_type(self):
+        html = self.create_post(content=b'<script>alert(1)</script>', name='x.html', content_type='image/jpeg')
+        self.assertTrue(html.media.get().blob.file.name.endswith('.jpg'))
+
+        unknown = self.create_post(content=b'<p>hi</p>', name='page.html', content_type='text/html')
+        name = unknown.media.get().blob.file.name
+        self.assertEqual(os.path.splitext(name)[1], '')
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+
+    def test_deleting_posts_releases_blobs_for_gc(self):
+        first = self.create_post()
+        second = self.create_post()
+        blob = first.media.get().blob
+        path = blob.file.path
+
+        self.client.delete(f'/api/posts/{first.id}/')
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        self.client.delete(f'/api/posts/{second.id}/')
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_upload_racing_gc_stores_the_blob_again(self):
+        post = self.create_post()
+        stale = post.media.get().blob
+        self.client.delete(f'/api/posts/{post.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', '--min-age', '0', stdout=StringIO())
+        path = os.path.join(self.media_root, 'meme.png')
+        with open(path, 'wb') as file:
+            file.write(b'same meme bytes')
+
+        # As if GC deleted the blob between our lookup and our increment
+        first = QuerySet.first
+        lookups = [stale]
+        with mock.patch('django.db.models.query.QuerySet.first', lambda queryset: lookups.pop() if lookups else first(queryset)):
+            blob = storage.store_path(path, 'meme.png', 'image/png')
+
+        self.assertNotEqual(blob.pk, stale.pk)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(blob.file.path))
+
+    def test_gc_keeps_files_of_blobs_uploaded_again(self):
+        post = self.create_post()
+        path = post.media.get().blob.file.path
+        self.client.delete(f'/api/posts/{post.id}/')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('gc_media_blobs', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.create_post()
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(MediaBlob.objects.get().file.path, path)
+        self.assertTrue(os.path.exists(path))
+
+    @override_settings(MEDIA_VARIANTS={'WIDTHS': [320, 640, 1080], 'WORKERS': 1, 'BACKGROUND': False})
+    def test_generate_media_variants(self):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Secret Camera'
+        Image.new('RGB', (800, 400), 'red').save(buffer, 'JPEG', exif=exif)
+        post = self.create_post(content=buffer.getvalue(), name='wide.jpg', content_type='image/jpeg')
+        self.create_post(content=b'not really a video', name='clip.mp4', content_type='video/mp4')
+
+        call_command('generate_media_variants', '--workers', '1', stdout=StringIO())
+
+        blob = post.media.get().blob
+        blob.refresh_from_db()
+        self.assertEqual(blob.variants_status, MediaBlob.VARIANTS_READY)
+        self.assertEqual((blob.width, blob.height), (800, 400))
+        self.assertEqual(sorted(blob.variants, key=int), ['320', '640', '800'])
+        self.assertIn('webp', blob.variants['320']['formats'])
+        for name in [blob.variants['320']['name'], blob.variants['320']['formats']['webp']['name']]:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+        with Image.open(os.path.join(self.media_root, blob.variants['800']['name'])) as full:
+            self.assertEqual(len(full.getexif()), 0)
+        self.assertEqual(
+            MediaBlob.objects.exclude(pk=blob.pk).get().variants_status, MediaBlob.VARIANTS_SKIPPED
+        )
+
+        response = self.client.get(f'/api/posts/{post.id}/')
+        media = response.data['media'][0]
+        self.assertTrue(media['file'].endswith(blob.variants['800']['name']))
+        variants = media['variants']
+        self.assertEqual(variants['320']['width'], 320)
+        self.assertEqual(variants['320']['height'], 160)
+        self.assertTrue(variants['640']['url'].startswith('http://testserver/media/post_media/variants/'))
+        self.assertTrue(variants['640']['formats']['webp'].endswith('_640.webp'))
+
+    def test_originals_are_stored_without_metadata(self):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Secret Camera'
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        exif.get_ifd(0x8825)[2] = (52.0, 31.0, 12.0)  # GPS latitude
+        Image.new('RGB', (80, 40), 'red').save(buffer, 'JPEG', exif=exif)
+        post = self.create_post(content=buffer.getvalue(), name='holiday.jpg', content_type='image/jpeg')
+
+        blob = post.media.get().blob
+        with Image.open(blob.file.path) as stored:
+            self.assertEqual(len(stored.getexif()), 0)
+            self.assertEqual(stored.size, (40, 80))
+        with open(blob.file.path, 'rb') as stored:
+            self.assertEqual(blob.sha256, hashlib.sha256(stored.read()).hexdigest())
+
+        # The same photo again is recognised as the same blob
+        self.create_post(content=buffer.getvalue(), name='again.jpg', content_type='image/jpeg')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_gc_repairs_drifted_ref_counts(self):
+        post = self.create_post()
+        MediaBlob.objects.update(ref_count=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', '--min-age', '0', stdout=StringIO())
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(post.media.get().file.path))
+
+class CommentThreadTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='commenter',
+            email='commenter@example.com',
+            password='testpass123'
+        )
+        self.post = Post.objects.create(author=self.user, title='Thread', content='Discuss.')
+        self.url = f'/api/posts/{self.post.id}/comments/'
+        self.client.force_authenticate(user=self.user)
+
+    def comment(self, content, parent=None):
+        data = {'content': content}
+        if parent:
+            data['parent'] = str(parent)
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def build_thread(self, roots, replies):
+        for i in range(roots):
+            parent = self.comment(f'root {i}')
+            for j in range(replies):
+                parent = self.comment(f'reply {i}.{j}', parent)
+
+    def test_replies_are_assembled_depth_first(self):
+        first = self.comment('first')
+        second = self.comment('second')
+        child = self.comment('child', first)
+        self.comment('grandchild', child)
+        self.comment('second child', first)
+
+        response = self.client.get(self.url)
+        self.assertEqual([c['content'] for c in response.data['results']], ['first', 'second'])
+        replies = response.data['results'][0]['replies']
+        self.assertEqual([c['content'] for c in replies], ['child', 'second child'])
+        self.assertEqual(replies[0]['replies'][0]['content'], 'grandchild')
+        self.assertEqual(response.data['results'][1]['replies'], [])
+
+        grandchild = Comment.objects.get(content='grandchild')
+        self.assertEqual(grandchild.depth, 2)
+        self.assertTrue(grandchild.path.startswith(Comment.objects.get(pk=child).path))
+        self.assertFalse(grandchild.path.startswith(Comment.objects.get(pk=second).path))
+
+    def test_query_count_does_not_grow_with_thread_size(self):
+        self.build_thread(roots=2, replies=1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self.build_thread(roots=5, replies=6)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertEqual(len(large), len(small))
+
+    def test_page_excludes_replies_of_other_pages(self):
+        self.build_thread(roots=12, replies=2)
+        response = self.client.get(self.client.get(self.url).data['next'])
+        results = response.data['results']
+        self.assertEqual([c['content'] for c in results], ['root 10', 'root 11'])
+        self.assertEqual(results[0]['replies'][0]['replies'][0]['content'], 'reply 10.1')
+
+    def test_counts_follow_creates_and_subtree_deletes(self):
+        root = self.comment('root')
+        child = self.comment('child', root)
+        self.comment('grandchild', child)
+        self.comment('second child', root)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 4)
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 2)
+        self.assertTrue(Comment.objects.get(pk=child).has_children)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['reply_count'], 2)
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.id}/').data['comment_count'], 4)
+
+        # Deleting a comment removes its replies from the counts too
+        Comment.objects.get(pk=child).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 1)
+
+        response = self.client.delete(f'{self.url}{root}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_comment_counts_repairs_drift(self):
+        root = self.comment('root')
+        self.comment('child', root)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=9)
+        Comment.objects.filter(pk=root).update(reply_count=0)
+
+        call_command('reconcile_comment_counts', chunk_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 1)
+
+    def test_batch_comments_returns_first_page_per_post(self):
+        self.build_thread(roots=12, replies=1)
+        other = Post.objects.create(author=self.user, title='Other', content='Quiet.')
+        empty = Post.objects.create(author=self.user, title='Empty', content='Nothing yet.')
+        Comment.objects.create(post=other, user=self.user, content='only one')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/posts/batch-comments/', {
+                'post_ids': [str(self.post.id), str(other.id), str(empty.id)],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 3)
+
+        thread = response.data[str(self.post.id)]
+        self.assertEqual(thread['count'], 24)
+        self.assertTrue(thread['has_more'])
+        self.assertEqual([c['content'] for c in thread['results']], [f'root {i}' for i in range(10)])
+        self.assertEqual(thread['results'][0]['replies'][0]['content'], 'reply 0.0')
+        self.assertEqual(response.data[str(other.id)]['count'], 1)
+        self.assertFalse(response.data[str(other.id)]['has_more'])
+        self.assertEqual(response.data[str(empty.id)], {'count': 0, 'has_more': False, 'results': []})
+
+    def test_batch_comments_limits_posts(self):
+        response = self.client.post('/api/posts/batch-comments/', {
+            'post_ids': [str(uuid.uuid4()) for _ in range(51)],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ResumableUploadTest(APITestCase):
+    VIDEO = bytes(range(256)) * 40
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        upload_dir = tempfile.mkdtemp()
+        for directory in (media_root, upload_dir):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            RESUMABLE_UPLOADS={'DIR': upload_dir, 'MAX_SIZE': 1024 * 1024, 'EXPIRY_HOURS': 24},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.upload_dir = upload_dir
+
+        self.user = User.objects.create_user(
+            username='videomaker',
+            email='videomaker@example.com',
+            password='testpass123'
+        )
+        self.post = Post.objects.create(author=self.user, title='Long Fail', content='Watch this.')
+        self.client.force_authenticate(user=self.user)
+
+    def create_session(self, data=None):
+        response = self.client.post('/api/posts/uploads/', {
+            'filename': 'fail.mp4', 'content_type': 'video/mp4', 'size': len(data or self.VIDEO),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def put_range(self, session_id, start, end, data=None, total=None):
+        data = data or self.VIDEO
+        return self.client.put(
+            f'/api/posts/uploads/{session_id}/', data[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total or len(data)}'
+        )
+
+    def test_chunks_resume_from_the_offset_and_finalize_into_post_media(self):
+        session_id = self.create_session()
+        self.assertEqual(self.put_range(session_id, 0, 4095).data['offset'], 4096)
+        self.assertEqual(os.path.getsize(uploads.part_path(session_id)), 4096)
+
+        # A retried or skipped-ahead chunk is refused with the offset to resume from
+        for start, end in ((0, 4095), (8192, 10239)):
+            response = self.put_range(session_id, start, end)
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(response.data['offset'], 4096)
+
+        response = self.client.post(f'/api/posts/uploads/{session_id}/finalize/', {'post_id': self.post.id})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(self.client.get(f'/api/posts/uploads/{session_id}/').data['offset'], 4096)
+        self.assertEqual(self.put_range(session_id, 4096, len(self.VIDEO) - 1).data['offset'], len(self.VIDEO))
+
+        response = self.client.post(f'/api/posts/uploads/{session_id}/finalize/', {'post_id': self.post.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        media = self.post.media.get()
+        with media.blob.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.VIDEO)
+        self.assertEqual(media.blob.content_type, 'video/mp4')
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+        # Finalizing again (e.g. after a lost response) returns the same media
+        response = self.client.post(f'/api/posts/uploads/{session_id}/finalize/', {'post_id': self.post.id})
+        self.assertEqual(response.data['id'], media.id)
+        self.assertEqual(self.post.media.count(), 1)
+
+    def test_identical_upload_reuses_the_blob(self):
+        for _ in range(2):
+            session_id = self.create_session()
+            self.put_range(session_id, 0, len(self.VIDEO) - 1)
+            self.client.post(f'/api/posts/uploads/{session_id}/finalize/', {'post_id': self.post.id})
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_rejects_bad_ranges_types_and_other_users(self):
+        session_id = self.create_session()
+        self.assertEqual(self.put_range(session_id, 0, 99, total=99999).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.put(f'/api/posts/uploads/{session_id}/', b'abc', content_type='application/octet-stream')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/posts/uploads/', {
+            'filename': 'evil.exe', 'content_type': 'application/x-msdownload', 'size': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/posts/uploads/', {
+            'filename': 'huge.mp4', 'content_type': 'video/mp4', 'size': 2 * 1024 * 1024,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user('other', 'other@example.com', 'testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.put_range(session_id, 0, 99).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RESUMABLE_UPLOADS={})
+    def test_default_size_limit_matches_post_media(self):
+        response = self.client.post('/api/posts/uploads/', {
+            'filename': 'long.mp4', 'content_type': 'video/mp4', 'size': PostMedia.MAX_SIZE + 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reaper_removes_stale_sessions_and_part_files(self):
+        stale_id = self.create_session()
+        self.put_range(stale_id, 0, 99)
+        fresh_id = self.create_session()
+        UploadSession.objects.filter(pk=stale_id).update(updated_at=timezone.now() - timedelta(days=2))
+        orphan = uploads.part_path(uuid.uuid4())
+        open(orphan, 'wb').close()
+        os.utime(orphan, (0, 0))
+
+        call_command('reap_upload_sessions', stdout=StringIO())
+
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [uuid.UUID(fresh_id)])
+        self.assertEqual(os.listdir(self.upload_dir), [f'{fresh_id}.part'])
+
+class HotRankingTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ranker',
+            email='ranker@example.com',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+
+    def create_post(self, title, engagement, age):
+        post = Post.objects.create(author=self.user, title=title, content='Test Content')
+        Post.objects.filter(pk=post.pk).update(engagement_score=engagement, created_at=self.now - age)
+        return post
+
+    def test_scores_decay_with_age(self):
+        now = self.now.timestamp()
+        created = [now - 3600, now - 24 * 3600, now - 3600, now - 3600]
+        fresh, day_old, busier, idle = ranking.hot_scores([10, 10, 40, 0], created, now, 1.8, 2)
+        self.assertGreater(fresh, day_old)
+        self.assertGreater(busier, fresh)
+        self.assertEqual(idle, 0)
+        # A day-old post needs far more engagement to beat a fresh one
+        self.assertLess(ranking.hot_scores([100], [now - 24 * 3600], now, 1.8, 2)[0], fresh * 10)
+
+    def test_recompute_scores_the_window_and_expires_old_posts(self):
+        fresh = self.create_post('Fresh', 5, timedelta(hours=1))
+        older = self.create_post('Older', 5, timedelta(hours=30))
+        stale = self.create_post('Stale', 500, timedelta(days=8))
+        Post.objects.filter(pk=stale.pk).update(hot_score=3.5)
+
+        scored, expired = ranking.recompute(now=self.now, batch_size=1)
+        self.assertEqual((scored, expired), (2, 1))
+        scores = dict(Post.objects.values_list('title', 'hot_score'))
+        self.assertAlmostEqual(scores['Fresh'], 5 / 3 ** 1.8)
+        self.assertGreater(scores['Fresh'], scores['Older'])
+        self.assertEqual(scores['Stale'], 0)
+
+        Post.objects.update(hot_score=0)
+        call_command('recompute_hot_scores', workers=2, batch_size=1, stdout=StringIO())
+        pooled = dict(Post.objects.values_list('title', 'hot_score'))
+        self.assertAlmostEqual(pooled['Fresh'], scores['Fresh'], places=4)
+        self.assertAlmostEqual(pooled['Older'], scores['Older'], places=4)
+
+    def test_recent_engagement_lifts_the_score(self):
+        steady = self.create_post('Steady', 3, timedelta(hours=10))
+        rising = self.create_post('Rising', 3, timedelta(hours=10))
+        Reaction.objects.create(post=steady, user=self.user, kind=Reaction.LIKE, created_at=self.now - timedelta(hours=9))
+        Reaction.objects.create(post=rising, user=self.user, kind=Reaction.LIKE, created_at=self.now - timedelta(minutes=5))
+        Comment.objects.create(post=rising, user=self.user, content='Same here')
+
+        self.assertEqual(ranking.recent_engagement([steady.pk, rising.pk], self.now - timedelta(hours=6)), {
+            steady.pk: 0, rising.pk: 3,
+        })
+        ranking.recompute(now=self.now)
+        scores = dict(Post.objects.values_list('title', 'hot_score'))
+        self.assertAlmostEqual(scores['Steady'], 3 / 12 ** 1.8)
+        # The comment also counts towards the stored engagement: 3 + 2
+        self.assertAlmostEqual(scores['Rising'], (5 + 3 * 3) / 12 ** 1.8)
+
+class ReactionConcurrencyTest(TransactionTestCase):
+    """Hammers the reaction writes from several threads at once."""
+
+    THREADS = 8
+    ROUNDS = 25
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpass123'
+        )
+        self.users = [
+            User.objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password='testpass123'
+            )
+            for i in range(self.THREADS)
+        ]
+        self.post = Post.objects.create(author=self.author, title='Hot Post', content='Everyone reacts')
+
+    def _run_threads(self, work, users=None):
+        users = users or self.users
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def target(user):
+            try:
+                barrier.wait()
+                work(user)
+            except Exception as e:  # pragma: no cover - surfaced by the assertion below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_puts_and_deletes_keep_counts_exact(self):
+        def work(user):
+            for i in range(self.ROUNDS):
+                # Every user ends with a like and without a fire reaction
+                reactions.add_reaction(self.post.pk, user.pk, Reaction.LIKE)
+                reactions.add_reaction(self.post.pk, user.pk, Reaction.FIRE)
+                reactions.remove_reaction(self.post.pk, user.pk, Reaction.FIRE)
+
+        self._run_threads(work)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, self.THREADS)
+        self.assertEqual(self.post.fire_count, 0)
+        self.assertEqual(Reaction.objects.filter(post=self.post, kind=Reaction.LIKE).count(), self.THREADS)
+
+    def test_concurrent_toggles_match_reaction_rows(self):
+        def work(user):
+            for i in range(self.ROUNDS):
+                reactions.toggle_reaction(self.post.pk, user.pk, Reaction.HUG)
+
+        self._run_threads(work)
+
+        self.post.refresh_from_db()
+        stored = Reaction.objects.filter(post=self.post, kind=Reaction.HUG).count()
+        self.assertEqual(self.post.hug_count, stored)
+
+    def test_one_user_racing_themselves_keeps_one_row(self):
+        # e.g. the same account tapping like on several devices at once
+        def work(user):
+            for i in range(self.ROUNDS):
+                reactions.add_reaction(self.post.pk, user.pk, Reaction.LIKE)
+                reactions.toggle_reaction(self.post.pk, user.pk, Reaction.LIKE)
+                reactions.remove_reaction(self.post.pk, user.pk, Reaction.LIKE)
+                reactions.toggle_reaction(self.post.pk, user.pk, Reaction.LIKE)
+            # Every thread ends with a PUT, so the last write overall is one
+            reactions.add_reaction(self.post.pk, user.pk, Reaction.LIKE)
+
+        self._run_threads(work, users=[self.users[0]] * self.THREADS)
+
+        self.post.refresh_from_db()
+        self.assertEqual(Reaction.objects.filter(post=self.post, kind=Reaction.LIKE).count(), 1)
+        self.assertEqual(self.post.like_count, 1)
@@ -0,0 +1,92 @@
+"""
+Comment threads stored as materialized paths.
+
+Every comment's ``path`` is its parent's path followed by one fixed-width
+segment of its own: the creation time in microseconds (14 hex digits) and
+the first 6 hex digits of its id. Sorting by path therefore lists a thread
+depth-first with siblings in chronological order, and a comment's whole
+subtree is the contiguous range of paths that start with its own.
+
+Top-level comments are paginated in path order, so one page of them and all
+of their replies is a single index range: from the first root's path to the
+last root's path followed by ``PATH_END``. That range is loaded in one query
+and assembled into a tree here instead of querying replies per comment.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+SEGMENT_LENGTH = 20
+PATH_MAX_LENGTH = 1000
+MAX_DEPTH = PATH_MAX_LENGTH // SEGMENT_LENGTH - 1
+# Sorts after every character a path can contain
+PATH_END = '~'
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def path_segment(comment_id, when):
+    micros = (when - _EPOCH) // _MICROSECOND
+    return f'{micros:014x}{uuid.UUID(str(comment_id)).hex[:6]}'
+
+def child_path(parent, comment_id, when):
+    """Return (path, depth) for a new comment under ``parent`` (None for top level)."""
+    segment = path_segment(comment_id, when)
+    if parent is None:
+        return segment, 0
+    return parent.path + segment, parent.depth + 1
+
+def subtree_filter(first_path, last_path=None):
+    """Lookups for the comments at or below every path from ``first_path`` to ``last_path``."""
+    return {'path__gte': first_path, 'path__lt': (last_path or first_path) + PATH_END}
+
+def attach_replies(roots, queryset):
+    """
+    Load every reply below ``roots`` with one query on ``queryset`` and set
+    ``thread_replies`` on each comment to its children, oldest first. Roots
+    should be consecutive in path order within each post (e.g. one page of
+    top-level comments per post); replies of comments that fall between them
+    are skipped.
+    """
+    roots = list(roots)
+    for root in roots:
+        root.thread_replies = []
+    if not roots:
+        return roots
+    paths_by_post = {}
+    for root in roots:
+        paths_by_post.setdefault(root.post_id, []).append(root.path)
+    ranges = Q()
+    for post_id, paths in paths_by_post.items():
+        ranges |= Q(post_id=post_id, **subtree_filter(min(paths), max(paths)))
+    descendants = queryset.filter(
+        ranges, depth__gt=min(root.depth for root in roots)
+    ).order_by('path')
+
+    nodes = {root.pk: root for root in roots}
+    for comment in descendants:
+        # Path order puts every parent before its children
+        parent = nodes.get(comment.parent_id)
+        if parent is None:
+            continue
+        comment.thread_replies = []
+        parent.thread_replies.append(comment)
+        nodes[comment.pk] = comment
+    return roots
+
+def first_comments(queryset, post_ids, limit):
+    """
+    The first ``limit`` top-level comments of each post in ``post_ids`` with
+    one ROW_NUMBER() OVER (PARTITION BY post_id) query. Returns
+    {post_id: [comments]}; a post has ``limit + 1`` comments when more exist.
+    """
+    ranked = queryset.filter(post_id__in=post_ids, depth=0).annotate(
+        row_number=Window(RowNumber(), partition_by=F('post_id'), order_by=F('path').asc())
+    ).filter(row_number__lte=limit + 1).order_by('post_id', 'path')
+    by_post = {}
+    for comment in ranked:
+        by_post.setdefault(comment.post_id, []).append(comment)
+    return by_post
@@ -0,0 +1,118 @@
+"""
+Sliding-window trending tags.
+
+Activity is recorded per tag per hour in TagActivityBucket as posts and
+reactions are written. A trending score reads only the buckets inside the
+requested window (at most ``tags x hours`` rows) and decays every bucket
+exponentially by its age, so a tag that was busy yesterday loses out to one
+that is busy right now:
+
+    score = sum((posts + REACTION_WEIGHT * reactions) * 0.5 ** (age / half_life))
+
+Post deletions and tag edits subtract from the bucket of the hour the post
+was created in, and removed reactions from the hour they were added in, so
+counts never drift upwards. Windows and weights can be
+overridden with the TRENDING_TAGS setting.
+"""
+
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Post, Tag, TagActivityBucket
+
+PostTag = Post.tags.through
+
+DEFAULTS = {
+    # window name -> (span, half life)
+    'WINDOWS': {
+        '1h': (timedelta(hours=1), timedelta(minutes=30)),
+        '24h': (timedelta(hours=24), timedelta(hours=6)),
+        '7d': (timedelta(days=7), timedelta(days=2)),
+    },
+    'DEFAULT_WINDOW': '24h',
+    'REACTION_WEIGHT': 0.2,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TRENDING_TAGS', {})}
+
+def bucket_hour(moment=None):
+    """Truncate ``moment`` (default: now) to the start of its UTC hour."""
+    moment = timezone.localtime(moment or timezone.now(), dt_timezone.utc)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def record_activity(tag_ids, posts=0, reactions=0, at=None):
+    """Add ``posts`` and ``reactions`` (may be negative) to each tag's bucket for ``at``."""
+    tag_ids = list(tag_ids)
+    if not tag_ids or not (posts or reactions):
+        return
+    hour = bucket_hour(at)
+    TagActivityBucket.objects.bulk_create(
+        [TagActivityBucket(tag_id=tag_id, hour=hour) for tag_id in tag_ids],
+        ignore_conflicts=True
+    )
+    TagActivityBucket.objects.filter(tag_id__in=tag_ids, hour=hour).update(
+        posts=Greatest(F('posts') + posts, 0),
+        reactions=Greatest(F('reactions') + reactions, 0)
+    )
+
+def record_reactions(post_ids, amount=1, at=None):
+    """
+    Count ``amount`` reactions (-1 for removed ones) per entry of
+    ``post_ids`` towards the hour of ``at`` (default: now).
+    """
+    per_post = defaultdict(int)
+    for post_id in post_ids:
+        per_post[post_id] += amount
+    if not per_post:
+        return
+    per_tag = defaultdict(int)
+    rows = PostTag.objects.filter(post_id__in=per_post).values_list('post_id', 'tag_id')
+    for post_id, tag_id in rows:
+        per_tag[tag_id] += per_post[post_id]
+    # Usually every tag gets the same increment, i.e. a single update
+    by_amount = defaultdict(list)
+    for tag_id, amount in per_tag.items():
+        by_amount[amount].append(tag_id)
+    for total, tag_ids in by_amount.items():
+        record_activity(tag_ids, reactions=total, at=at)
+
+def trending_tags(window=None, limit=10, now=None):
+    """
+    Return the top ``limit`` tags for ``window`` as dicts with 'tag', 'score',
+    'posts', 'reactions' and 'last_active', highest score first.
+    Raises KeyError for an unknown window.
+    """
+    config = get_config()
+    span, half_life = config['WINDOWS'][window or config['DEFAULT_WINDOW']]
+    weight = config['REACTION_WEIGHT']
+    now = now or timezone.now()
+    half_life_hours = half_life.total_seconds() / 3600
+
+    stats = {}
+    buckets = TagActivityBucket.objects.filter(
+        hour__gt=bucket_hour(now - span)
+    ).values_list('tag_id', 'hour', 'posts', 'reactions')
+    for tag_id, hour, posts, reactions in buckets.iterator(chunk_size=2000):
+        entry = stats.setdefault(tag_id, {'score': 0.0, 'posts': 0, 'reactions': 0, 'last_active': hour})
+        age_hours = max((now - hour).total_seconds() / 3600, 0)
+        entry['score'] += (posts + weight * reactions) * 0.5 ** (age_hours / half_life_hours)
+        entry['posts'] += posts
+        entry['reactions'] += reactions
+        entry['last_active'] = max(entry['last_active'], hour)
+
+    top = sorted(
+        ((tag_id, entry) for tag_id, entry in stats.items() if entry['score'] > 0),
+        key=lambda item: item[1]['score'],
+        reverse=True
+    )[:limit]
+    tags = Tag.objects.in_bulk([tag_id for tag_id, _ in top])
+    return [
+        {'tag': tags[tag_id], **entry}
+        for tag_id, entry in top
+        if tag_id in tags
+    ]
@@ -0,0 +1,152 @@
+"""
+Resumable uploads for large media.
+
+A client creates an upload session with the file's name, type and size,
+PUTs the bytes in ranges (``Content-Range: bytes <start>-<end>/<size>``) and
+finally attaches the finished file to a post. Each range is streamed from
+the request onto the end of a ``<session id>.part`` file in
+``RESUMABLE_UPLOADS['DIR']`` in small blocks, so neither the chunk nor the
+file is ever held in memory.
+
+The part file's length is the offset. A range must start exactly there,
+and a connection that drops mid-chunk keeps the bytes that arrived, so the
+client asks for the offset and resumes from it. Writers to one session are
+serialized by an flock on the part file rather than a row lock, so a slow
+chunk never holds a database transaction (or SQLite's write lock) open.
+
+Finalizing hashes the part file and hands it to the content-addressed blob
+store (see storage.py), which moves it into place. Sessions that stop
+receiving bytes are removed by the ``reap_upload_sessions`` command.
+"""
+
+import fcntl
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from .exceptions import UploadIncomplete, UploadInProgress, UploadOffsetMismatch
+from .models import PostMedia, UploadSession
+from .storage import store_path
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'failink-uploads'),
+    'MAX_SIZE': PostMedia.MAX_SIZE,
+    'EXPIRY_HOURS': 24,
+}
+COPY_BUFFER_SIZE = 64 * 1024
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUMABLE_UPLOADS', {})}
+
+def part_path(session_id):
+    return os.path.join(get_config()['DIR'], f'{session_id}.part')
+
+def parse_content_range(header, size):
+    """Return (start, length) for a ``bytes <start>-<end>/<size>`` header."""
+    match = CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise ValidationError({'Content-Range': 'Expected "bytes <start>-<end>/<size>".'})
+    start, end, total = (int(value) for value in match.groups())
+    if total != size:
+        raise ValidationError({'Content-Range': f'Upload size is {size} bytes, not {total}.'})
+    if end < start or end >= size:
+        raise ValidationError({'Content-Range': 'Range is outside the upload.'})
+    return start, end - start + 1
+
+def create_session(user, filename, content_type, size):
+    session = UploadSession.objects.create(
+        user=user, filename=filename, content_type=content_type, size=size
+    )
+    os.makedirs(get_config()['DIR'], exist_ok=True)
+    open(part_path(session.pk), 'xb').close()
+    return session
+
+@contextmanager
+def locked_part(session):
+    """Open the session's part file with an exclusive lock, failing fast if it is held."""
+    try:
+        part = open(part_path(session.pk), 'r+b')
+    except FileNotFoundError:
+        raise NotFound('Upload session not found.')
+    with part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadInProgress()
+        yield part
+
+def write_chunk(session, start, length, stream):
+    """
+    Append ``length`` bytes read from ``stream`` at ``start``, which must be
+    the current offset. Whatever arrives is kept even if the body is cut
+    short. Returns the new offset.
+    """
+    if session.status != UploadSession.STATUS_ACTIVE:
+        raise UploadOffsetMismatch(session.offset, 'Upload is already complete.')
+    with locked_part(session) as part:
+        offset = part.seek(0, os.SEEK_END)
+        if start != offset:
+            raise UploadOffsetMismatch(offset)
+        remaining = length
+        try:
+            while remaining and stream is not None:
+                block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                part.write(block)
+                remaining -= len(block)
+        finally:
+            part.flush()
+            session.offset = part.tell()
+            UploadSession.objects.filter(pk=session.pk).update(
+                offset=session.offset, updated_at=timezone.now()
+            )
+    if remaining:
+        raise UploadIncomplete(session.offset, f'Request body ended {remaining} bytes short of the range.')
+    return session.offset
+
+def finalize(session, post):
+    """Store the finished upload as a blob and attach it to ``post``. Idempotent."""
+    if session.status == UploadSession.STATUS_COMPLETE:
+        if session.media is None or session.media.post_id != post.pk:
+            raise UploadOffsetMismatch(session.offset, 'Upload was already attached to another post.')
+        return session.media
+    path = part_path(session.pk)
+    with locked_part(session) as part:
+        received = part.seek(0, os.SEEK_END)
+        if received != session.size:
+            raise UploadIncomplete(received)
+        with transaction.atomic():
+            blob = store_path(path, session.filename, session.content_type)
+            media = PostMedia.objects.attach_blob(post, blob)
+            session.status = UploadSession.STATUS_COMPLETE
+            session.offset = received
+            session.media = media
+            session.save(update_fields=['status', 'offset', 'media', 'updated_at'])
+    if os.path.exists(path):
+        os.unlink(path)
+    return media
+
+def discard(session):
+    """Delete an upload session and whatever bytes it received."""
+    try:
+        with locked_part(session):
+            os.unlink(part_path(session.pk))
+    except NotFound:
+        pass  # finalized, or the part file was already removed
+    session.delete()
+
+def stale_sessions(max_age=None, now=None):
+    """Sessions not written to for ``max_age`` hours (default EXPIRY_HOURS)."""
+    if max_age is None:
+        max_age = get_config()['EXPIRY_HOURS']
+    cutoff = (now or timezone.now()) - timedelta(hours=max_age)
+    return UploadSession.objects.filter(updated_at__lt=cutoff)
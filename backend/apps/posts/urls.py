@@ -16,6 +16,20 @@ posts_router.register(r'comments', views.CommentViewSet, basename='post-comments
 # Define URL patterns
 urlpatterns = [
     path('trending-tags/', views.trending_tags, name='trending-tags'),
+    path('tags/followed/', views.FollowedTagsView.as_view(), name='followed-tags'),
+    path('tags/<slug:slug>/follow/', views.TagFollowView.as_view(), name='tag-follow'),
+    # Tag and upload routes come before the post router, whose detail route would match them
+    path('uploads/', views.UploadSessionViewSet.as_view({'post': 'create'}), name='upload-list'),
+    path(
+        'uploads/<uuid:pk>/',
+        views.UploadSessionViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}),
+        name='upload-detail'
+    ),
+    path(
+        'uploads/<uuid:pk>/finalize/',
+        views.UploadSessionViewSet.as_view({'post': 'finalize'}),
+        name='upload-finalize'
+    ),
     path('', include(router.urls)),  # Include main router URLs first
     path('', include(posts_router.urls)),  # Include nested comments URLs after
 ]
@@ -0,0 +1,136 @@
+"""
+Responsive width variants for post images.
+
+Feed cards render images a few hundred pixels wide, so every image blob gets
+downscaled copies (``MEDIA_VARIANTS['WIDTHS']``) that clients can choose from
+instead of downloading the original. Rendering never happens in the request
+thread: once the upload transaction commits, the work is handed to a
+process-wide ProcessPoolExecutor. With ``MEDIA_VARIANTS['BACKGROUND']`` off,
+blobs stay pending until the ``generate_media_variants`` command (e.g. run
+from cron or as a long-lived worker with ``--loop``) picks them up.
+
+Variants belong to the blob, so deduplicated uploads share them. Besides
+the downscaled widths, a full-size copy with EXIF stripped is rendered and
+served in place of the original upload.
+"""
+
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from .imaging import render_variants
+from .models import MediaBlob
+from .storage import BLOB_PREFIX
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WIDTHS': [320, 640, 1080],
+    'WORKERS': 2,
+    'BACKGROUND': True,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'MEDIA_VARIANTS', {})}
+
+def variant_name(blob, width, extension):
+    digest = blob.sha256
+    return f'{BLOB_PREFIX}/variants/{digest[:2]}/{digest[2:4]}/{digest}_{width}{extension}'
+
+def variant_names(blob):
+    names = []
+    for variant in (blob.variants or {}).values():
+        names.append(variant['name'])
+        names.extend(alternate['name'] for alternate in variant.get('formats', {}).values())
+    return names
+
+def full_size(blob):
+    """The metadata-stripped full-size derivative of ``blob``, if rendered."""
+    if not blob.variants or not blob.width:
+        return None
+    return blob.variants.get(str(blob.width))
+
+def read_source(blob):
+    """A local path for the worker to open if the storage has one, else the bytes."""
+    try:
+        return default_storage.path(blob.file.name)
+    except NotImplementedError:
+        with default_storage.open(blob.file.name, 'rb') as source:
+            return source.read()
+
+def _save(name, data):
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(data))
+
+def save_variants(blob, result):
+    """
+    Store the output of imaging.render_variants for ``blob`` and mark it done.
+    Each variant records its base-format file and its alternates, e.g.
+    {'name': '..._320.jpg', 'width': 320, 'height': 160, 'size': 9000,
+     'formats': {'webp': {'name': '..._320.webp', 'size': 6000}}}.
+    """
+    if result is None:
+        MediaBlob.objects.filter(pk=blob.pk).update(variants_status=MediaBlob.VARIANTS_FAILED)
+        return
+    variants = {}
+    for width, height, encoded in result['variants']:
+        (base_extension, base_data), *alternates = encoded.items()
+        variants[str(width)] = {
+            'name': _save(variant_name(blob, width, base_extension), base_data),
+            'width': width,
+            'height': height,
+            'size': len(base_data),
+            'formats': {
+                extension.lstrip('.'): {
+                    'name': _save(variant_name(blob, width, extension), data),
+                    'size': len(data),
+                }
+                for extension, data in alternates
+            },
+        }
+    MediaBlob.objects.filter(pk=blob.pk).update(
+        width=result['width'],
+        height=result['height'],
+        variants=variants,
+        variants_status=MediaBlob.VARIANTS_READY
+    )
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=get_config()['WORKERS'])
+    return _executor
+
+def schedule_variants(blob):
+    """Queue variant rendering for ``blob`` to start after the current transaction commits."""
+    if blob.variants_status != MediaBlob.VARIANTS_PENDING or not get_config()['BACKGROUND']:
+        return
+    transaction.on_commit(lambda: _submit(blob))
+
+def _submit(blob):
+    try:
+        future = get_executor().submit(render_variants, read_source(blob), get_config()['WIDTHS'])
+    except Exception:
+        # The blob stays pending for generate_media_variants
+        logger.exception("Could not queue variants for media blob %s", blob.pk)
+        return
+    future.add_done_callback(lambda future: _finish(blob, future))
+
+def _finish(blob, future):
+    # Runs on the executor's result thread, which has its own DB connection
+    try:
+        save_variants(blob, future.result())
+    except Exception:
+        logger.exception("Failed to render variants for media blob %s", blob.pk)
+    finally:
+        connection.close()
@@ -0,0 +1,57 @@
+"""
+Page-level lookup of the current viewer's reactions.
+
+Instead of prefetching every reactor of every post, the viewer's own reactions
+are fetched for just the post IDs being rendered, in a single query against
+the Reaction table. Memory is bounded by the page size, not by post
+popularity. Reactions still waiting in the write-behind buffer are overlaid
+on top, so the viewer sees their own changes before they are flushed.
+"""
+
+from .models import Reaction
+from .reaction_buffer import get_buffer
+
+# Maps each non-emoji reaction kind to the serializer flag it drives.
+KIND_FLAGS = {
+    Reaction.LIKE: 'is_liked',
+    Reaction.HUG: 'is_hugged',
+    Reaction.RELATE: 'is_related',
+}
+
+def empty_state():
+    state = {flag: False for flag in KIND_FLAGS.values()}
+    state['emojis'] = []
+    return state
+
+def resolve_viewer_state(user, post_ids):
+    """
+    Return {post_id: {'is_liked', 'is_hugged', 'is_related', 'emojis'}} for
+    ``user`` over ``post_ids``.
+    """
+    state = {post_id: empty_state() for post_id in post_ids}
+    if not state or user is None or not user.is_authenticated:
+        return state
+
+    reactions = Reaction.objects.filter(
+        user_id=user.pk, post_id__in=state.keys()
+    ).order_by('created_at').values_list('post_id', 'kind')
+    for post_id, kind in reactions:
+        if kind in KIND_FLAGS:
+            state[post_id][KIND_FLAGS[kind]] = True
+        else:
+            state[post_id]['emojis'].append(Reaction.KIND_EMOJIS[kind])
+
+    buffer = get_buffer()
+    if buffer is not None:
+        for (post_id, kind), reacted in buffer.pending_for_user(user.pk, state.keys()).items():
+            if kind in KIND_FLAGS:
+                state[post_id][KIND_FLAGS[kind]] = reacted
+                continue
+            emojis = state[post_id]['emojis']
+            emoji = Reaction.KIND_EMOJIS[kind]
+            if reacted and emoji not in emojis:
+                emojis.append(emoji)
+            elif not reacted and emoji in emojis:
+                emojis.remove(emoji)
+
+    return state
@@ -1,15 +1,20 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import generics, viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.core.cache import cache
 from django.conf import settings
-from django.db import transaction
-from .models import Post, Tag, TrendingTag, EmojiReaction, Comment, PostMedia
-from .serializers import PostSerializer, TagSerializer, TrendingTagSerializer, CommentSerializer
+from django.db import IntegrityError, transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Post, Tag, TagFollow, Reaction, Comment, PostMedia, UploadSession
+from .serializers import (
+    PostSerializer, TagSerializer, CommentSerializer, ReactionBatchSerializer,
+    CommentBatchSerializer, PostMediaSerializer, UploadSessionSerializer, FinalizeUploadSerializer,
+)
 from .pagination import CommentPagination, PostPagination
-from .exceptions import InvalidEmojiException, PostNotFound
+from .exceptions import InvalidEmojiException, InvalidReactionKind, PostNotFound, UploadOffsetMismatch
+from . import reactions, threads, trending, uploads
+from .tags import clear_post_tags, follow_tag, unfollow_tag
 import logging
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.exceptions import PermissionDenied, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -21,25 +26,14 @@ class PostViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        queryset = Post.objects.all().select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates', 'media')
-        
-        # Filter by followed tags if provided
-        followed_tags = self.request.query_params.get('followed_tags', None)
-        if followed_tags:
-            try:
-                tag_ids = [int(tag_id.strip()) for tag_id in followed_tags.split(',') if tag_id.strip().isdigit()]
-                if tag_ids:
-                    queryset = queryset.filter(tags__id__in=tag_ids).distinct()
-            except (ValueError, TypeError):
-                logger.warning(f"Invalid followed_tags parameter: {followed_tags}")
-        
-        return queryset
+        # Posts of the tags a user follows are served by the feed app's TagFeedView
+        return Post.objects.all().select_related('author').prefetch_related('tags', 'media__blob')
 
     def perform_create(self, serializer):
         post = serializer.save(author=self.request.user)
         files = self.request.FILES.getlist('media')
         for file in files:
-            PostMedia.objects.create(post=post, file=file)
+            PostMedia.objects.create_from_upload(post, file)
 
     def perform_update(self, serializer):
         """Ensure only the author can update their post."""
@@ -49,23 +43,23 @@ class PostViewSet(viewsets.ModelViewSet):
         updated_post = serializer.save()
         files = self.request.FILES.getlist('media')
         for file in files:
-            PostMedia.objects.create(post=updated_post, file=file)
+            PostMedia.objects.create_from_upload(updated_post, file)
 
     def perform_destroy(self, instance):
         """Ensure only the author can delete their post."""
         if instance.author != self.request.user:
             raise PermissionDenied('You do not have permission to delete this post.')
-        instance.delete()
+        with transaction.atomic():
+            clear_post_tags(instance)
+            instance.delete()
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         try:
             post = self.get_object()
-            if request.user in post.likes.all():
-                post.likes.remove(request.user)
-                return Response({'status': 'unliked'})
-            post.likes.add(request.user)
-            return Response({'status': 'liked'})
+            if reactions.toggle_reaction(post.pk, request.user.pk, Reaction.LIKE):
+                return Response({'status': 'liked'})
+            return Response({'status': 'unliked'})
         except Exception as e:
             logger.error(f"Error in like action: {str(e)}")
             return Response(
@@ -77,11 +71,9 @@ class PostViewSet(viewsets.ModelViewSet):
     def hug(self, request, pk=None):
         try:
             post = self.get_object()
-            if request.user in post.hugs.all():
-                post.hugs.remove(request.user)
-                return Response({'status': 'unhugged'})
-            post.hugs.add(request.user)
-            return Response({'status': 'hugged'})
+            if reactions.toggle_reaction(post.pk, request.user.pk, Reaction.HUG):
+                return Response({'status': 'hugged'})
+            return Response({'status': 'unhugged'})
         except Exception as e:
             logger.error(f"Error in hug action: {str(e)}")
             return Response(
@@ -93,11 +85,9 @@ class PostViewSet(viewsets.ModelViewSet):
     def relate(self, request, pk=None):
         try:
             post = self.get_object()
-            if request.user in post.relates.all():
-                post.relates.remove(request.user)
-                return Response({'status': 'unrelated'})
-            post.relates.add(request.user)
-            return Response({'status': 'related'})
+            if reactions.toggle_reaction(post.pk, request.user.pk, Reaction.RELATE):
+                return Response({'status': 'related'})
+            return Response({'status': 'unrelated'})
         except Exception as e:
             logger.error(f"Error in relate action: {str(e)}")
             return Response(
@@ -119,33 +109,16 @@ class PostViewSet(viewsets.ModelViewSet):
                 )
                 
             # Validate emoji
-            valid_emojis = [choice[0] for choice in EmojiReaction.EMOJI_CHOICES]
+            valid_emojis = list(Reaction.EMOJI_KINDS)
             if emoji not in valid_emojis:
                 return Response(
                     {'error': f'Invalid emoji. Must be one of: {", ".join(valid_emojis)}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            with transaction.atomic():
-                # Check if user already reacted with this emoji
-                reaction = EmojiReaction.objects.filter(
-                    post=post,
-                    user=request.user,
-                    emoji=emoji
-                ).first()
-                
-                if reaction:
-                    # Remove reaction if it exists
-                    reaction.delete()
-                    return Response({'status': 'removed'})
-                
-                # Create new reaction
-                EmojiReaction.objects.create(
-                    post=post,
-                    user=request.user,
-                    emoji=emoji
-                )
+            if reactions.toggle_reaction(post.pk, request.user.pk, Reaction.EMOJI_KINDS[emoji]):
                 return Response({'status': 'added'})
+            return Response({'status': 'removed'})
                 
         except Exception as e:
             logger.error(f"Error in emoji_react action: {str(e)}")
@@ -154,19 +127,195 @@ class PostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['put', 'delete'], url_path=r'reactions/(?P<kind>[a-z]+)', url_name='reactions')
+    def react(self, request, pk=None, kind=None):
+        """
+        Idempotently add (PUT) or remove (DELETE) a reaction of the given kind.
+        Each call is a single conditional INSERT or DELETE; the post is not
+        loaded through get_object() and only its counters are read back.
+        """
+        if kind not in reactions.KIND_BY_NAME:
+            raise InvalidReactionKind(
+                f'Invalid reaction kind. Must be one of: {", ".join(reactions.KIND_BY_NAME)}'
+            )
+        reaction_kind = reactions.KIND_BY_NAME[kind]
+        try:
+            post_id = Post._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise PostNotFound()
+
+        try:
+            with transaction.atomic():
+                if request.method == 'PUT':
+                    changed = reactions.add_reaction(post_id, request.user.pk, reaction_kind)
+                else:
+                    changed = reactions.remove_reaction(post_id, request.user.pk, reaction_kind)
+                counts = reactions.get_counts(post_id)
+                if counts is None:
+                    raise PostNotFound()
+        except Post.DoesNotExist:
+            raise PostNotFound()
+        except IntegrityError:
+            # The reaction row's post was deleted meanwhile; anything else is a real error
+            if not Post.objects.filter(pk=post_id).exists():
+                raise PostNotFound()
+            raise
+
+        return Response({
+            'kind': kind,
+            'reacted': request.method == 'PUT',
+            'changed': changed,
+            'counts': counts,
+        })
+
+    @action(detail=False, methods=['post'], url_path='reactions/batch', url_name='reactions-batch')
+    def reactions_batch(self, request):
+        """
+        Apply many queued reaction operations in one request, e.g. when a
+        mobile client reconnects after being offline.
+        """
+        serializer = ReactionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, counts = reactions.apply_reaction_batch(
+            request.user.pk, serializer.validated_data['operations']
+        )
+        return Response({'results': results, 'counts': counts})
+
+    @action(
+        detail=False, methods=['post'], url_path='batch-comments', url_name='batch-comments',
+        permission_classes=[permissions.AllowAny]
+    )
+    def batch_comments(self, request):
+        """
+        The first page of top-level comments (with their replies) and the
+        comment total of up to 50 posts, keyed by post id, so a feed page
+        needs one request instead of one per card.
+        """
+        serializer = CommentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        post_ids = list(dict.fromkeys(serializer.validated_data['post_ids']))
+        page_size = serializer.validated_data.get('page_size', CommentPagination.page_size)
+
+        comments = Comment.objects.select_related('user')
+        pages = threads.first_comments(comments, post_ids, page_size)
+        roots = [comment for page in pages.values() for comment in page[:page_size]]
+        threads.attach_replies(roots, comments)
+        totals = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'comment_count'))
+
+        context = self.get_serializer_context()
+        data = {}
+        for post_id in post_ids:
+            page = pages.get(post_id, [])
+            data[str(post_id)] = {
+                'count': totals.get(post_id, 0),
+                'has_more': len(page) > page_size,
+                'results': CommentSerializer(page[:page_size], many=True, context=context).data,
+            }
+        return Response(data)
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Resumable uploads for large media: POST to create a session, PUT byte
+    ranges with a Content-Range header, GET to learn the offset to resume
+    from, then POST finalize/ with a post_id to attach the file to a post.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = uploads.create_session(request.user, **serializer.validated_data)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def update(self, request, pk=None):
+        session = self.get_object()
+        start, length = uploads.parse_content_range(request.headers.get('Content-Range'), session.size)
+        try:
+            uploads.write_chunk(session, start, length, request.stream)
+        except UploadOffsetMismatch as e:
+            return Response({'error': str(e.detail), 'offset': e.offset}, status=e.status_code)
+        return Response(self.get_serializer(session).data)
+
+    def destroy(self, request, pk=None):
+        uploads.discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        serializer = FinalizeUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            post = Post.objects.get(pk=serializer.validated_data['post_id'])
+        except Post.DoesNotExist:
+            raise PostNotFound()
+        if post.author != request.user:
+            raise PermissionDenied('You do not have permission to add media to this post.')
+        try:
+            media = uploads.finalize(session, post)
+        except UploadOffsetMismatch as e:
+            return Response({'error': str(e.detail), 'offset': e.offset}, status=e.status_code)
+        return Response(
+            PostMediaSerializer(media, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
 
+class TagFollowView(generics.GenericAPIView):
+    """Follow (POST), unfollow (DELETE) or check (GET) whether the current user follows a tag"""
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = Tag.objects.all()
+    lookup_field = 'slug'
+
+    def respond(self, following, changed=False):
+        return Response({'following': following, 'changed': changed})
+
+    def get(self, request, *args, **kwargs):
+        return self.respond(TagFollow.objects.filter(user=request.user, tag=self.get_object()).exists())
+
+    def post(self, request, *args, **kwargs):
+        return self.respond(True, follow_tag(request.user, self.get_object()))
+
+    def delete(self, request, *args, **kwargs):
+        return self.respond(False, unfollow_tag(request.user, self.get_object()))
+
+class FollowedTagsView(generics.ListAPIView):
+    """Tags the current user follows, most recently followed first"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TagSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return Tag.objects.filter(follows__user=self.request.user).order_by('-follows__created_at')
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def trending_tags(request):
     """
     Get the top 10 trending tags with caching.
+    Scores come from hourly activity buckets with time decay; pass
+    ?window=1h|24h|7d to pick the window (default 24h).
     """
-    cache_key = 'trending_tags'
+    window = request.query_params.get('window', trending.get_config()['DEFAULT_WINDOW'])
+    if window not in trending.get_config()['WINDOWS']:
+        return Response(
+            {"error": f"Invalid window. Must be one of: {', '.join(trending.get_config()['WINDOWS'])}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    cache_key = f'trending_tags:{window}'
     cached_data = cache.get(cache_key)
     
     if cached_data:
@@ -174,10 +323,18 @@ def trending_tags(request):
         return Response(cached_data)
     
     try:
-        trending_tags = TrendingTag.objects.select_related('tag').all()[:10]
-        logger.debug("Found %d trending tags", len(trending_tags))
-        serializer = TrendingTagSerializer(trending_tags, many=True)
-        data = serializer.data
+        top_tags = trending.trending_tags(window, limit=10)
+        logger.debug("Found %d trending tags", len(top_tags))
+        data = [
+            {
+                'tag': TagSerializer(entry['tag']).data,
+                'post_count': entry['posts'],
+                'reaction_count': entry['reactions'],
+                'score': round(entry['score'], 3),
+                'last_updated': entry['last_active'],
+            }
+            for entry in top_tags
+        ]
         
         # Cache for 5 minutes
         cache.set(cache_key, data, 300)
@@ -190,11 +347,6 @@ def trending_tags(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-class CommentPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 50
-
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -204,8 +356,18 @@ class CommentViewSet(viewsets.ModelViewSet):
         post_id = self.kwargs.get('post_pk') or self.kwargs.get('post_id')
         if not post_id:
             return Comment.objects.none()
-        # Only top-level comments
-        return Comment.objects.filter(post__id=post_id, parent=None).select_related('user').prefetch_related('replies')
+        # Only top-level comments, in path order so a page and its replies form one range
+        return Comment.objects.filter(post__id=post_id, depth=0).select_related('user').order_by('path')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        comments = page if page is not None else list(queryset)
+        threads.attach_replies(comments, Comment.objects.select_related('user'))
+        serializer = self.get_serializer(comments, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
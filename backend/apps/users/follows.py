@@ -0,0 +1,36 @@
+"""
+Follow and unfollow.
+
+Each is one write against Follow, and the follower/following counters on
+User are shifted only when a row actually changed, so repeated taps neither
+raise nor double count. Timelines react to the Follow rows through the feed
+app's signals, see apps.feed.timelines.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .models import Follow, User
+
+def follow(follower, followee):
+    """Make ``follower`` follow ``followee``. Returns True if they did not already."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Follow.objects.create(follower=follower, followee=followee)
+        except IntegrityError:
+            return False
+        User.objects.filter(pk=follower.pk).update(following_count=F('following_count') + 1)
+        User.objects.filter(pk=followee.pk).update(follower_count=F('follower_count') + 1)
+    return True
+
+def unfollow(follower, followee):
+    """Stop ``follower`` following ``followee``. Returns True if they did."""
+    with transaction.atomic():
+        relation = Follow.objects.filter(follower=follower, followee=followee).first()
+        if relation is None:
+            return False
+        relation.delete()
+        User.objects.filter(pk=follower.pk).update(following_count=Greatest(F('following_count') - 1, 0))
+        User.objects.filter(pk=followee.pk).update(follower_count=Greatest(F('follower_count') - 1, 0))
+    return True
@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from apps.posts.imaging import render_square_ladder
+from apps.users.profile_pictures import AVATAR_SIZES, store_ladder
+
+User = get_user_model()
+
+def read_picture(name):
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:
+        with default_storage.open(name, 'rb') as source:
+            return source.read()
+
+class Command(BaseCommand):
+    help = 'Converts existing profile pictures into the square avatar ladder, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of worker processes (default: one per core)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Number of users handed to the pool at a time'
+        )
+        parser.add_argument(
+            '--delete-originals', action='store_true',
+            help='Delete each original picture once its ladder is stored'
+        )
+
+    def handle(self, *args, **options):
+        pending = (
+            User.objects.filter(profile_picture_sizes={})
+            .exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .exclude(profile_picture__startswith='http')
+            .order_by('pk')
+        )
+        converted = failed = 0
+        start = time.perf_counter()
+        last_pk = None
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                chunk = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+                users = list(chunk.only('pk', 'profile_picture', 'profile_picture_sizes')[:options['chunk_size']])
+                if not users:
+                    break
+                last_pk = users[-1].pk
+
+                sources = []
+                for user in users:
+                    try:
+                        sources.append(read_picture(user.profile_picture.name))
+                    except OSError:
+                        sources.append(b'')
+                ladders = executor.map(render_square_ladder, sources, [AVATAR_SIZES] * len(users))
+
+                for user, ladder in zip(users, ladders):
+                    if not ladder:
+                        failed += 1
+                        self.stderr.write(f'Could not convert {user.profile_picture.name} (user {user.pk})')
+                        continue
+                    original = user.profile_picture.name
+                    store_ladder(user, ladder)
+                    user.save(update_fields=['profile_picture', 'profile_picture_sizes'])
+                    if options['delete_originals'] and default_storage.exists(original):
+                        default_storage.delete(original)
+                    converted += 1
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Converted {converted} profile pictures ({failed} failed) in {elapsed:.1f}s '
+            f'with {options["workers"]} workers'
+        ))
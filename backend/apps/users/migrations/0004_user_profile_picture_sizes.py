@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_sizes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_profile_picture_sizes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_set', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_set', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['followee', 'created_at'], name='users_follo_followe_55b87f_idx'),
+                    models.Index(fields=['follower', 'created_at'], name='users_follo_followe_229ec1_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow'),
+                    models.CheckConstraint(check=models.Q(('follower', models.F('followee')), _negated=True), name='no_self_follow'),
+                ],
+            },
+        ),
+    ]
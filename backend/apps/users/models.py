@@ -7,9 +7,15 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, db_index=True)
     username = models.CharField(max_length=150, unique=True, db_index=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Square avatar ladder, {size: file name}; profile_picture is the largest rung
+    profile_picture_sizes = models.JSONField(default=dict, blank=True)
     bio = models.TextField(max_length=500, blank=True)
     password_reset_token = models.CharField(max_length=100, null=True, blank=True, db_index=True)
     password_reset_token_created = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Maintained by apps.users.follows; authors with many followers have their
+    # posts pulled into following feeds instead of pushed (see apps.feed.timelines)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -45,4 +51,25 @@ class User(AbstractUser):
             models.Index(fields=['password_reset_token']),
             models.Index(fields=['created_at']),
             models.Index(fields=['date_joined']),
-        ] 
\ No newline at end of file
+        ] 
+
+class Follow(models.Model):
+    """``follower`` sees the posts of ``followee`` in their following feed."""
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following_set')
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follower_set')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Also the index for "who does this user follow"
+            models.UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(follower=models.F('followee')), name='no_self_follow'),
+        ]
+        indexes = [
+            # "Who follows this user", in the order they followed
+            models.Index(fields=['followee', 'created_at']),
+            models.Index(fields=['follower', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.follower} follows {self.followee}"
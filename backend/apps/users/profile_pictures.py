@@ -0,0 +1,73 @@
+"""
+Profile picture processing.
+
+Avatars are embedded once per post author on every feed page, so pictures are
+decoded once at upload, center-cropped to a square and stored as a small
+fixed ladder of sizes (``AVATAR_SIZES``). ``User.profile_picture`` holds the
+largest rung and ``User.profile_picture_sizes`` maps every size to its file.
+All rungs are re-encoded without EXIF metadata, and AVIF/WebP copies are
+stored next to them under the same stem, so the media view can hand them to
+browsers that accept them (see apps.utils.media).
+"""
+
+import os
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from apps.posts.imaging import render_square_ladder
+
+AVATAR_SIZES = (48, 96, 256)
+
+def store_ladder(user, ladder):
+    """
+    Store the output of imaging.render_square_ladder as ``user``'s picture.
+    Does not save ``user``.
+    """
+    stem = f'{user.profile_picture.field.upload_to}{uuid.uuid4().hex}'
+    sizes = {}
+    for size, encoded in ladder:
+        (extension, data), *alternates = encoded.items()
+        name = default_storage.save(f'{stem}_{size}{extension}', ContentFile(data))
+        sizes[str(size)] = name
+        name_stem = os.path.splitext(name)[0]
+        for alternate_extension, alternate_data in alternates:
+            default_storage.save(name_stem + alternate_extension, ContentFile(alternate_data))
+    user.profile_picture.name = sizes[str(max(size for size, _ in ladder))]
+    user.profile_picture_sizes = sizes
+    return sizes
+
+def ladder_names(user):
+    """Every stored file of ``user``'s avatar ladder, alternates included."""
+    names = []
+    for name in (user.profile_picture_sizes or {}).values():
+        stem = os.path.splitext(name)[0]
+        names.append(name)
+        names.extend(stem + extension for extension in ('.avif', '.webp') if not name.endswith(extension))
+    return names
+
+def delete_files(names):
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+def set_profile_picture(user, uploaded_file):
+    """
+    Replace ``user``'s picture with the avatar ladder of ``uploaded_file``.
+    Returns False if the file could not be decoded. Does not save ``user``.
+    """
+    uploaded_file.seek(0)
+    ladder = render_square_ladder(uploaded_file.read(), AVATAR_SIZES)
+    if not ladder:
+        return False
+    store_ladder(user, ladder)
+    return True
+
+def avatar_name(user, size):
+    """The stored name of the smallest rung at least ``size`` px, else the largest one."""
+    sizes = user.profile_picture_sizes
+    if not sizes:
+        return user.profile_picture.name if user.profile_picture else None
+    fitting = [int(rung) for rung in sizes if int(rung) >= size]
+    rung = min(fitting) if fitting else max(int(rung) for rung in sizes)
+    return sizes[str(rung)]
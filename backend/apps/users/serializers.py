@@ -2,22 +2,36 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from .profile_pictures import AVATAR_SIZES, avatar_name, delete_files, ladder_names, set_profile_picture
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    """
+    ``avatar_size`` (or ``context['avatar_size']``) picks the profile picture
+    rung to link, e.g. 96 where authors are shown next to posts.
+    """
     profile_picture = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ('id', 'email', 'username', 'first_name', 'last_name', 'profile_picture', 'bio', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        fields = (
+            'id', 'email', 'username', 'first_name', 'last_name', 'profile_picture', 'bio',
+            'follower_count', 'following_count', 'created_at'
+        )
+        read_only_fields = ('id', 'follower_count', 'following_count', 'created_at')
+
+    def __init__(self, *args, avatar_size=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.avatar_size = avatar_size
     
     def get_profile_picture(self, obj):
         """Return absolute URL for profile picture"""
         request = self.context.get('request')
         if obj.profile_picture:
-            url = obj.profile_picture.url
+            size = self.avatar_size or self.context.get('avatar_size') or max(AVATAR_SIZES)
+            url = default_storage.url(avatar_name(obj, size))
             if request is not None:
                 return request.build_absolute_uri(url)
             return url
@@ -54,9 +68,19 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """Update user profile"""
+        replace_picture = 'profile_picture' in validated_data
+        picture = validated_data.pop('profile_picture', None)
+        old_files = ladder_names(instance) if replace_picture else []
+
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        if replace_picture:
+            instance.profile_picture_sizes = {}
+            if not picture or not set_profile_picture(instance, picture):
+                instance.profile_picture = picture
         instance.save()
+
+        delete_files(old_files)
         return instance
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
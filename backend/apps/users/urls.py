@@ -3,7 +3,8 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     UserRegistrationView, UserProfileView, GoogleLoginView, UserLoginView,
     PasswordResetRequestView, PasswordResetConfirmView, UserPostsView, 
-    UserReactionsView, UserStatsView, UserProfileUpdateView, SuggestedUsersView, UserDetailView
+    UserReactionsView, UserStatsView, UserProfileUpdateView, SuggestedUsersView, UserDetailView,
+    FollowView, FollowersView, FollowingView
 )
 
 urlpatterns = [
@@ -22,4 +23,7 @@ urlpatterns = [
     path('<str:user_id>/posts/', UserPostsView.as_view(), name='user_posts'),
     path('<str:user_id>/reactions/', UserReactionsView.as_view(), name='user_reactions'),
     path('<str:user_id>/stats/', UserStatsView.as_view(), name='user_stats'),
+    path('<str:user_id>/follow/', FollowView.as_view(), name='user_follow'),
+    path('<str:user_id>/followers/', FollowersView.as_view(), name='user_followers'),
+    path('<str:user_id>/following/', FollowingView.as_view(), name='user_following'),
 ] 
\ No newline at end of file
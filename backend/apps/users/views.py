@@ -1,22 +1,27 @@
 from django.shortcuts import render
 from rest_framework import status, generics
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Q, Count, Sum
+from django.db.models import Count, Sum, F
+from django.db.models.functions import Coalesce
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 from allauth.socialaccount.providers.google.provider import GoogleProvider
 from allauth.socialaccount.helpers import complete_social_login
 from allauth.socialaccount.models import SocialAccount
+from .models import Follow
 from .serializers import UserSerializer, UserRegistrationSerializer, SocialAuthSerializer, UserProfileUpdateSerializer
 from apps.posts.serializers import PostSerializer
-from apps.posts.models import Post, EmojiReaction
-from apps.posts.pagination import PostPagination
+from apps.posts.models import Post, Reaction
+from apps.posts.pagination import PostPagination, UserPagination
+from . import follows
 import logging
 import requests
 from datetime import datetime, timedelta
@@ -310,7 +315,7 @@ class UserPostsView(generics.ListAPIView):
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
         if user_id:
-            return Post.objects.filter(author_id=user_id).select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
+            return Post.objects.filter(author_id=user_id).select_related('author').prefetch_related('tags', 'media__blob')
         return Post.objects.none()
 
 class UserReactionsView(generics.ListAPIView):
@@ -319,6 +324,12 @@ class UserReactionsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PostPagination
 
+    REACTION_TYPE_KINDS = {
+        'like': Reaction.LIKE,
+        'hug': Reaction.HUG,
+        'relate': Reaction.RELATE,
+    }
+
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
         reaction_type = self.request.query_params.get('type', 'all')  # like, hug, relate, emoji
@@ -326,22 +337,16 @@ class UserReactionsView(generics.ListAPIView):
         if not user_id:
             return Post.objects.none()
         
-        if reaction_type == 'like':
-            return Post.objects.filter(likes__id=user_id).select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
-        elif reaction_type == 'hug':
-            return Post.objects.filter(hugs__id=user_id).select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
-        elif reaction_type == 'relate':
-            return Post.objects.filter(relates__id=user_id).select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
-        elif reaction_type == 'emoji':
-            return Post.objects.filter(emoji_reactions__user_id=user_id).select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
-        else:
-            # Return all posts user has reacted to in any way
-            return Post.objects.filter(
-                Q(likes__id=user_id) |
-                Q(hugs__id=user_id) |
-                Q(relates__id=user_id) |
-                Q(emoji_reactions__user_id=user_id)
-            ).distinct().select_related('author').prefetch_related('tags', 'likes', 'hugs', 'relates')
+        reactions = Reaction.objects.filter(user_id=user_id)
+        if reaction_type == 'emoji':
+            reactions = reactions.filter(kind__in=Reaction.EMOJI_KINDS.values())
+        elif reaction_type in self.REACTION_TYPE_KINDS:
+            reactions = reactions.filter(kind=self.REACTION_TYPE_KINDS[reaction_type])
+        
+        # A semi-join against the unified Reaction table needs no DISTINCT
+        return Post.objects.filter(
+            id__in=reactions.values('post_id')
+        ).select_related('author').prefetch_related('tags', 'media__blob')
 
 class UserStatsView(generics.RetrieveAPIView):
     """Get user statistics for profile page"""
@@ -359,19 +364,24 @@ class UserStatsView(generics.RetrieveAPIView):
         # Get user's posts with reaction counts in a single query
         user_posts_stats = Post.objects.filter(author=user).aggregate(
             posts_count=Count('id'),
-            total_likes_received=Count('likes'),
-            total_hugs_received=Count('hugs'),
-            total_relates_received=Count('relates'),
+            total_likes_received=Coalesce(Sum('like_count'), 0),
+            total_hugs_received=Coalesce(Sum('hug_count'), 0),
+            total_relates_received=Coalesce(Sum('relate_count'), 0),
+            total_emoji_reactions_received=Coalesce(
+                Sum(F('laugh_count') + F('fire_count') + F('check_count')), 0
+            ),
         )
+        emoji_reactions_received = user_posts_stats['total_emoji_reactions_received']
         
-        # Get emoji reactions received in a single query
-        emoji_reactions_received = EmojiReaction.objects.filter(post__author=user).count()
-        
-        # Get user's reactions given in optimized queries
-        user_likes_given = Post.objects.filter(likes=user).count()
-        user_hugs_given = Post.objects.filter(hugs=user).count()
-        user_relates_given = Post.objects.filter(relates=user).count()
-        user_emoji_reactions_given = EmojiReaction.objects.filter(user=user).count()
+        # Get user's reactions given, grouped by kind in a single query
+        given = dict(
+            Reaction.objects.filter(user=user).values('kind')
+            .annotate(total=Count('id')).order_by().values_list('kind', 'total')
+        )
+        user_likes_given = given.get(Reaction.LIKE, 0)
+        user_hugs_given = given.get(Reaction.HUG, 0)
+        user_relates_given = given.get(Reaction.RELATE, 0)
+        user_emoji_reactions_given = sum(given.get(kind, 0) for kind in Reaction.EMOJI_KINDS.values())
         
         stats = {
             'posts_count': user_posts_stats['posts_count'],
@@ -472,4 +482,71 @@ class UserDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         return User.objects.all()
 
+def get_user_or_none(user_id):
+    try:
+        return User.objects.filter(id=user_id).first()
+    except ValidationError:
+        return None  # not a UUID
+
+class FollowView(generics.GenericAPIView):
+    """Follow (POST), unfollow (DELETE) or check (GET) whether the current user follows a user"""
+    permission_classes = [IsAuthenticated]
+
+    def get_followee(self):
+        followee = get_user_or_none(self.kwargs.get('user_id'))
+        if followee is None:
+            raise NotFound('User not found')
+        return followee
+
+    def respond(self, followee, following, changed=False):
+        followee.refresh_from_db(fields=['follower_count'])
+        return Response({
+            'following': following,
+            'changed': changed,
+            'follower_count': followee.follower_count,
+        })
+
+    def get(self, request, *args, **kwargs):
+        followee = self.get_followee()
+        following = Follow.objects.filter(follower=request.user, followee=followee).exists()
+        return self.respond(followee, following)
+
+    def post(self, request, *args, **kwargs):
+        followee = self.get_followee()
+        if followee.pk == request.user.pk:
+            return Response({'error': 'You cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+        return self.respond(followee, True, follows.follow(request.user, followee))
+
+    def delete(self, request, *args, **kwargs):
+        followee = self.get_followee()
+        return self.respond(followee, False, follows.unfollow(request.user, followee))
+
+class FollowersView(generics.ListAPIView):
+    """Users following a user, most recent first"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = UserSerializer
+    pagination_class = UserPagination
+
+    def get_queryset(self):
+        user = get_user_or_none(self.kwargs.get('user_id'))
+        if user is None:
+            return User.objects.none()
+        return User.objects.filter(following_set__followee=user).annotate(
+            followed_at=F('following_set__created_at')
+        ).order_by('-followed_at')
+
+class FollowingView(generics.ListAPIView):
+    """Users a user follows, most recently followed first"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = UserSerializer
+    pagination_class = UserPagination
+
+    def get_queryset(self):
+        user = get_user_or_none(self.kwargs.get('user_id'))
+        if user is None:
+            return User.objects.none()
+        return User.objects.filter(follower_set__follower=user).annotate(
+            followed_at=F('follower_set__created_at')
+        ).order_by('-followed_at')
+
 # Create your views here. 
\ No newline at end of file
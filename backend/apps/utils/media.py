@@ -0,0 +1,106 @@
+"""
+Helpers for serving stored media.
+
+Image derivatives are stored next to AVIF/WebP siblings with the same stem,
+e.g. ``..._320.jpg``, ``..._320.webp``. A request for the JPEG/PNG path is
+answered with the best sibling the client explicitly accepts, falling back
+to the requested file.
+
+Names that embed a content hash (post media blobs and their variants) or a
+fresh UUID per upload (avatar ladders) never change content, so they are
+served with long-lived immutable caching and an ETag derived from the name.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.core.files.storage import default_storage
+from apps.posts.imaging import ALTERNATE_FORMATS
+
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+NEGOTIABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+IMMUTABLE_NAMES = [
+    re.compile(r'^post_media/(variants/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(_\d+)?\.\w+$'),
+    re.compile(r'^profile_pictures/[0-9a-f]{32}_\d+\.\w+$'),
+]
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_accept(header):
+    """Return {media type: q} for an Accept header."""
+    accepted = {}
+    for item in (header or '').split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[media_type.lower()] = q
+    return accepted
+
+def is_negotiable(path):
+    return os.path.splitext(path)[1].lower() in NEGOTIABLE_EXTENSIONS
+
+def negotiate(path, accept_header, exists=default_storage.exists):
+    """
+    Return the path to serve for ``path``: an AVIF or WebP sibling when the
+    client lists that type explicitly (wildcards are not enough, as browsers
+    send image/* without decoding every format), otherwise ``path`` itself.
+    """
+    if not is_negotiable(path):
+        return path
+    accepted = parse_accept(accept_header)
+    stem = os.path.splitext(path)[0]
+    for _, extension, media_type in ALTERNATE_FORMATS:
+        if accepted.get(media_type, 0) > 0 and exists(stem + extension):
+            return stem + extension
+    return path
+
+def is_immutable(path):
+    """True for names whose content can never change, see the module docstring."""
+    return any(pattern.match(path) for pattern in IMMUTABLE_NAMES)
+
+def file_etag(path, stat):
+    """
+    A strong ETag: the name itself for immutable files, otherwise the
+    modification time and size, as nginx and most static servers do.
+    """
+    if is_immutable(path):
+        return '"%s"' % os.path.basename(path)
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single byte range in ``header``,
+    or None to send the whole file (no header, a header we do not parse, or
+    several ranges). Raises RangeNotSatisfiable when the range misses the file.
+    """
+    match = BYTE_RANGE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final ``last`` bytes
+        if int(last) == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
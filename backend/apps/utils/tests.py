@@ -2,9 +2,107 @@
 Tests for the utils app.
 """
 
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here. 
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from .media import negotiate
+from .views import serve_media
 
-def test_utils_placeholder():
-    assert True  # TODO: Replace with real tests 
\ No newline at end of file
+class MediaNegotiationTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        os.makedirs(os.path.join(self.media_root, 'pics'))
+        for name in ['pics/photo.jpg', 'pics/photo.webp', 'pics/plain.png']:
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(name.encode())
+
+    def test_negotiate_prefers_explicitly_accepted_sibling(self):
+        exists = lambda name: os.path.exists(os.path.join(self.media_root, name))
+        browser = 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'
+        self.assertEqual(negotiate('pics/photo.jpg', browser, exists), 'pics/photo.webp')
+        self.assertEqual(negotiate('pics/photo.jpg', 'image/*,*/*', exists), 'pics/photo.jpg')
+        self.assertEqual(negotiate('pics/photo.jpg', 'image/webp;q=0', exists), 'pics/photo.jpg')
+        self.assertEqual(negotiate('pics/plain.png', browser, exists), 'pics/plain.png')
+
+    def test_serve_media_varies_on_accept(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            request = RequestFactory().get('/media/pics/photo.jpg', HTTP_ACCEPT='image/webp,*/*')
+            response = serve_media(request, 'pics/photo.jpg')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(b''.join(response.streaming_content), b'pics/photo.webp')
+        self.assertIn('Accept', response['Vary'])
+
+@override_settings(MEDIA_ACCEL_REDIRECT='')
+class MediaDeliveryTest(TestCase):
+    DIGEST = 'ab' * 32
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.name = f'post_media/ab/ab/{self.DIGEST}.mp4'
+        os.makedirs(os.path.join(self.media_root, 'post_media/ab/ab'))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root, self.name), 'wb') as f:
+            f.write(self.content)
+        with open(os.path.join(self.media_root, 'legacy.mp4'), 'wb') as f:
+            f.write(self.content)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get(self, path, **headers):
+        return serve_media(RequestFactory().get(f'/media/{path}', **headers), path)
+
+    def test_full_response_is_cacheable_with_strong_etag(self):
+        response = self.get(self.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.DIGEST}.mp4"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertFalse(self.get('legacy.mp4').has_header('Cache-Control'))
+
+        response = self.get(self.name, HTTP_IF_NONE_MATCH=f'"{self.DIGEST}.mp4"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get(self.name, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.get(self.name, HTTP_RANGE='bytes=-24')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-24:])
+        response = self.get(self.name, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+
+        response = self.get(self.name, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+        # Several ranges are answered with the whole file
+        self.assertEqual(self.get(self.name, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_if_range_falls_back_to_full_file_when_stale(self):
+        etag = self.get('legacy.mp4')['ETag']
+        response = self.get('legacy.mp4', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.get('legacy.mp4', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"changed"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '1024')
+
+    def test_accel_redirect_hands_the_file_to_nginx(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.get(self.name, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_served(self):
+        with self.assertRaises(Http404):
+            self.get('../etc/passwd')
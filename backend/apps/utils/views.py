@@ -2,4 +2,126 @@
 Views for the utils app.
 """
 
-# TODO: Implement utility API views using Django REST Framework. 
\ No newline at end of file
+import mimetypes
+import os
+import posixpath
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from .media import RangeNotSatisfiable, file_etag, is_immutable, is_negotiable, negotiate, parse_range
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+class FileRange:
+    """
+    Reads at most ``length`` bytes of ``file`` from its current position.
+    Exposes fileno() so servers with sendfile support (e.g. gunicorn) still
+    send the range from the kernel, bounded by Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+def _if_range_matches(header, etag, mtime):
+    if not header:
+        return True
+    if header.startswith('W/'):
+        return False  # If-Range requires a strong validator
+    if header.startswith('"'):
+        return header == etag
+    return parse_http_date_safe(header) == int(mtime)
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT. JPEG/PNG requests get an AVIF or
+    WebP sibling instead when the Accept header allows it.
+
+    With ``MEDIA_ACCEL_REDIRECT`` set, only the file is chosen here and nginx
+    sends it through an internal location. Otherwise the file is streamed
+    with single byte-range requests, If-Range and conditional GETs honoured,
+    so video players can seek without re-downloading.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    chosen = negotiate(path, request.META.get('HTTP_ACCEPT'))
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, chosen)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        raise Http404('File not found')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('File not found')
+
+    content_type, encoding = mimetypes.guess_type(chosen)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + chosen)
+    else:
+        response = _file_response(request, full_path, chosen, stat_result, content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if is_immutable(chosen):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    if is_negotiable(path):
+        patch_vary_headers(response, ['Accept'])
+    return response
+
+def _file_response(request, full_path, name, stat_result, content_type):
+    etag = file_etag(name, stat_result)
+    last_modified = stat_result.st_mtime
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        conditional['ETag'] = etag
+        return conditional
+
+    size = stat_result.st_size
+    byte_range = None
+    if _if_range_matches(request.headers.get('If-Range'), etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from datetime import timedelta
 from corsheaders.defaults import default_headers
 
@@ -129,7 +130,14 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
         'OPTIONS': {
             'timeout': 20,  # Database timeout
-        }
+        },
+        # File-backed test database so the threaded reaction tests get real
+        # SQLite locking (busy timeout) instead of the shared-cache table locks
+        # of an in-memory database, which fail at once with "table is locked".
+        # Kept in the temp dir rather than the source tree.
+        'TEST': {
+            'NAME': os.path.join(tempfile.gettempdir(), 'failink_test_db.sqlite3'),
+        },
     }
 }
 
@@ -145,6 +153,39 @@ CACHES = {
     }
 }
 
+# Feed totals, see apps/feed/counts.py: cached per filter for TTL seconds and
+# estimated (flagged approximate) above EXACT_LIMIT matching posts.
+FEED_COUNTS = {
+    'TTL': int(os.getenv('FEED_COUNT_TTL', '60')),
+    'EXACT_LIMIT': int(os.getenv('FEED_COUNT_EXACT_LIMIT', '10000')),
+}
+
+# Hot ranking of the trending feed, see apps/posts/ranking.py. Scores are
+# recomputed by the recompute_hot_scores command, e.g. from cron.
+HOT_RANKING = {
+    'GRAVITY': float(os.getenv('HOT_RANKING_GRAVITY', '1.8')),
+    'WINDOW_HOURS': int(os.getenv('HOT_RANKING_WINDOW_HOURS', '168')),
+    'VELOCITY_HOURS': int(os.getenv('HOT_RANKING_VELOCITY_HOURS', '6')),
+}
+
+# Following-feed timelines, see apps/feed/timelines.py. Posts of authors
+# below CELEBRITY_FOLLOWERS followers are pushed to their followers' timelines
+# on a background pool; bigger authors are pulled when the feed is read.
+TIMELINES = {
+    'CELEBRITY_FOLLOWERS': int(os.getenv('TIMELINE_CELEBRITY_FOLLOWERS', '10000')),
+    'WORKERS': int(os.getenv('TIMELINE_WORKERS', '2')),
+    'BACKGROUND': os.getenv('TIMELINE_BACKGROUND', 'True') == 'True',
+}
+
+# Reaction write-behind: buffer reaction writes in-process and flush them in
+# batches instead of taking the database write lock on every tap.
+# The buffer is per worker process; see apps/posts/reaction_buffer.py.
+REACTION_WRITE_BEHIND = {
+    'ENABLED': os.getenv('REACTION_WRITE_BEHIND', 'False') == 'True',
+    'FLUSH_INTERVAL': float(os.getenv('REACTION_FLUSH_INTERVAL', '0.5')),  # seconds
+    'BATCH_SIZE': int(os.getenv('REACTION_FLUSH_BATCH_SIZE', '500')),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -193,10 +234,37 @@ if ENVIRONMENT == 'production':
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media is served by apps.utils.views.serve_media, which streams files from
+# Django (with Range support). Behind an nginx that defines an internal
+# location aliased to the media volume, e.g.
+#   location /protected-media/ { internal; alias /var/www/media/; }
+# set this to that location: Django then only picks the file (e.g. a WebP
+# sibling) and nginx sends the bytes.
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Responsive image variants, see apps/posts/variants.py. With BACKGROUND off,
+# run `manage.py generate_media_variants --loop` as a worker instead.
+MEDIA_VARIANTS = {
+    'WIDTHS': [320, 640, 1080],
+    'WORKERS': int(os.getenv('MEDIA_VARIANT_WORKERS', '2')),
+    'BACKGROUND': os.getenv('MEDIA_VARIANTS_BACKGROUND', 'True') == 'True',
+}
+
+# Resumable uploads for large media, see apps/posts/uploads.py. Part files
+# live outside MEDIA_ROOT (and the source tree) until finalized; point DIR at
+# the same filesystem as MEDIA_ROOT so finalizing is a rename rather than a
+# copy. Finalized uploads skip PostMedia.clean(), so MAX_SIZE defaults to the
+# same 10MB limit as direct uploads.
+RESUMABLE_UPLOADS = {
+    'DIR': os.getenv('RESUMABLE_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'failink-uploads')),
+    'MAX_SIZE': int(os.getenv('RESUMABLE_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024))),  # bytes
+    'EXPIRY_HOURS': int(os.getenv('RESUMABLE_UPLOAD_EXPIRY_HOURS', '24')),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -9,6 +9,7 @@ export interface Comment {
   };
   content: string;
   parent: string | null;
+  reply_count: number;
   created_at: string;
   updated_at: string;
   replies: Comment[];
@@ -16,13 +17,11 @@ export interface Comment {
 
 export interface CommentListResponse {
   results: Comment[];
-  count: number;
   next: string | null;
-  previous: string | null;
 }
 
-export async function getComments(postId: string, page = 1): Promise<CommentListResponse> {
-  return await commentsAPI.getComments(postId, page);
+export async function getComments(postId: string, cursor?: string | null): Promise<CommentListResponse> {
+  return await commentsAPI.getComments(postId, cursor);
 }
 
 export async function addComment(postId: string, content: string, parentId?: string) {
@@ -75,6 +75,16 @@ export interface UserStats {
   total_reactions_given: number
 }
 
+// A page of a cursor-paginated list; follow `next` for the following page
+export interface CursorPage<T> {
+  results: T[]
+  next: string | null
+}
+
+// The opaque cursor in a `next` link, to pass back to the list call
+export const cursorFrom = (next: string | null): string | null =>
+  next ? new URL(next, window.location.origin).searchParams.get('cursor') : null
+
 // Auth API
 export const authAPI = {
   login: (email: string, password: string, rememberMe: boolean) =>
@@ -186,9 +196,9 @@ export const postsAPI = {
 
 // Comments API
 export const commentsAPI = {
-  getComments: (postId: string, page = 1) =>
-    requestCache.get(`comments-${postId}-${page}`, () =>
-      api.get(`/posts/${postId}/comments/?page=${page}`).then(res => res.data)
+  getComments: (postId: string, cursor?: string | null) =>
+    requestCache.get(`comments-${postId}-${cursor ?? 'first'}`, () =>
+      api.get(`/posts/${postId}/comments/`, { params: cursor ? { cursor } : {} }).then(res => res.data)
     ),
   
   // Batch load comments for multiple posts
@@ -202,14 +212,14 @@ export const commentsAPI = {
     if (parentId) data.parent = parentId
     
     // Invalidate cache for this post's comments
-    requestCache.delete(`comments-${postId}-1`)
+    requestCache.delete(`comments-${postId}-first`)
     
     return api.post(`/posts/${postId}/comments/`, data)
   },
   
   deleteComment: (postId: string, commentId: string) => {
     // Invalidate cache for this post's comments
-    requestCache.delete(`comments-${postId}-1`)
+    requestCache.delete(`comments-${postId}-first`)
     
     return api.delete(`/posts/${postId}/comments/${commentId}/`)
   },
@@ -245,15 +255,15 @@ export const usersAPI = {
     }
   },
   
-  getUserPosts: (userId: string, page = 1) => requestCache.get(`user-posts-${userId}-${page}`, () =>
-    api.get<{ results: Post[], count: number, next: string | null, previous: string | null }>(
-      `/users/${userId}/posts/?page=${page}`
+  getUserPosts: (userId: string, cursor?: string | null) => requestCache.get(`user-posts-${userId}-${cursor ?? 'first'}`, () =>
+    api.get<CursorPage<Post>>(
+      `/users/${userId}/posts/`, { params: cursor ? { cursor } : {} }
     ).then(res => res.data)
   ),
   
-  getUserReactions: (userId: string, type = 'all', page = 1) => requestCache.get(`user-reactions-${userId}-${type}-${page}`, () =>
-    api.get<{ results: Post[], count: number, next: string | null, previous: string | null }>(
-      `/users/${userId}/reactions/?type=${type}&page=${page}`
+  getUserReactions: (userId: string, type = 'all', cursor?: string | null) => requestCache.get(`user-reactions-${userId}-${type}-${cursor ?? 'first'}`, () =>
+    api.get<CursorPage<Post>>(
+      `/users/${userId}/reactions/`, { params: cursor ? { type, cursor } : { type } }
     ).then(res => res.data)
   ),
   
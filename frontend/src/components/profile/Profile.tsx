@@ -2,7 +2,7 @@ import React, { useState, useEffect, useCallback } from 'react'
 import { motion } from 'framer-motion'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useAuthStore } from '../../store/authStore'
-import { usersAPI, type User, type UserStats, type Post } from '../../api'
+import { usersAPI, cursorFrom, type User, type UserStats, type Post } from '../../api'
 import { Button } from '../ui/Button'
 import PostCard from '../Feed/PostCard'
 import { EditProfile } from './EditProfile'
@@ -21,8 +21,8 @@ export const Profile: React.FC = () => {
   const [userReactions, setUserReactions] = useState<Post[]>([])
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
-  const [postsPage, setPostsPage] = useState(1)
-  const [reactionsPage, setReactionsPage] = useState(1)
+  const [postsCursor, setPostsCursor] = useState<string | null>(null)
+  const [reactionsCursor, setReactionsCursor] = useState<string | null>(null)
   const [hasMorePosts, setHasMorePosts] = useState(true)
   const [hasMoreReactions, setHasMoreReactions] = useState(true)
   const [isEditModalOpen, setIsEditModalOpen] = useState(false)
@@ -57,12 +57,12 @@ export const Profile: React.FC = () => {
     }
   }, [targetUserId])
 
-  const fetchUserPosts = useCallback(async (page = 1, append = false) => {
+  const fetchUserPosts = useCallback(async (cursor: string | null = null, append = false) => {
     if (!targetUserId) return
     
     try {
       setLoading(true)
-      const response = await usersAPI.getUserPosts(targetUserId, page)
+      const response = await usersAPI.getUserPosts(targetUserId, cursor)
       const newPosts = response.results
       
       if (append) {
@@ -72,7 +72,7 @@ export const Profile: React.FC = () => {
       }
       
       setHasMorePosts(!!response.next)
-      setPostsPage(page)
+      setPostsCursor(cursorFrom(response.next))
     } catch (err) {
       console.error('Failed to fetch user posts:', err)
       setError('Failed to load user posts')
@@ -81,12 +81,12 @@ export const Profile: React.FC = () => {
     }
   }, [targetUserId])
 
-  const fetchUserReactions = useCallback(async (page = 1, append = false) => {
+  const fetchUserReactions = useCallback(async (cursor: string | null = null, append = false) => {
     if (!targetUserId) return
     
     try {
       setLoading(true)
-      const response = await usersAPI.getUserReactions(targetUserId, 'all', page)
+      const response = await usersAPI.getUserReactions(targetUserId, 'all', cursor)
       const newReactions = response.results
       
       if (append) {
@@ -96,7 +96,7 @@ export const Profile: React.FC = () => {
       }
       
       setHasMoreReactions(!!response.next)
-      setReactionsPage(page)
+      setReactionsCursor(cursorFrom(response.next))
     } catch (err) {
       console.error('Failed to fetch user reactions:', err)
       setError('Failed to load user reactions')
@@ -139,13 +139,13 @@ export const Profile: React.FC = () => {
 
   const loadMorePosts = () => {
     if (hasMorePosts && !loading) {
-      fetchUserPosts(postsPage + 1, true)
+      fetchUserPosts(postsCursor, true)
     }
   }
 
   const loadMoreReactions = () => {
     if (hasMoreReactions && !loading) {
-      fetchUserReactions(reactionsPage + 1, true)
+      fetchUserReactions(reactionsCursor, true)
     }
   }
 
@@ -167,9 +167,9 @@ export const Profile: React.FC = () => {
 
   useEffect(() => {
     if (activeTab === 'posts') {
-      fetchUserPosts(1, false)
+      fetchUserPosts(null, false)
     } else if (activeTab === 'reactions') {
-      fetchUserReactions(1, false)
+      fetchUserReactions(null, false)
     }
   }, [activeTab, fetchUserPosts, fetchUserReactions])
 